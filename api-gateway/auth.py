@@ -0,0 +1,125 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+# Must match the signing key used by user-service
+SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey")
+ALGORITHM = "HS256"
+
+# Decoded-token cache configuration
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))  # seconds
+
+# Roles allowed for each required role (manager can access everything)
+ROLE_REQUIREMENTS = {
+    "manager": (["manager"], "Manager role required"),
+    "kitchen": (["kitchen", "manager"], "Kitchen staff or manager role required"),
+    "waiter": (["waiter", "manager"], "Waiter or manager role required"),
+}
+
+class TokenCache:
+    """Bounded LRU cache of decoded tokens, keyed by token hash"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            # Cached entry outlived the token's exp claim or the cache TTL
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        expires_at = time.time() + self.ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+
+        key = self._key(token)
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+token_cache = TokenCache()
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Decode and validate a JWT locally, using the cache when possible"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+    token_cache.set(token, payload)
+    return payload
+
+def verify_token(token: str, required_role: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verify a token and check if the user has the required role
+    (same rules as user-service /auth/verify)
+    """
+    payload = decode_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    user_role = payload.get("role")
+    if not user_role:
+        raise HTTPException(status_code=401, detail="Role information missing from token")
+
+    # If no specific role is required, just verify the token is valid
+    if required_role in ROLE_REQUIREMENTS:
+        allowed_roles, message = ROLE_REQUIREMENTS[required_role]
+        if user_role not in allowed_roles:
+            raise HTTPException(status_code=403, detail=message)
+
+    return {"valid": True, "role": user_role, "sub": payload.get("sub")}
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Get the raw token from an Authorization header value"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return authorization
@@ -0,0 +1,131 @@
+"""
+Single-flight coalescing of identical concurrent GETs to the downstream
+services.
+
+While a GET is in flight, an identical GET (same service, path, query,
+headers and auth scope) waits for its response instead of making another
+call, so upstream load follows the number of distinct requests, not the
+number of clients. Nothing is kept once the call returns.
+
+The auth scope of a request is set per downstream route:
+
+- token: only requests with the same Authorization header share a call
+  (the default for every GET).
+- role: requests whose tokens are valid and carry the same role share a
+  call; for routes whose response depends only on the caller's role
+  (tables, active orders, the kitchen queue). The token is verified
+  locally first; a request whose token fails is sent on its own.
+- off: never coalesced.
+
+GET_COALESCE_POLICIES overrides the built-in policies, as a comma
+separated list of service:path=scope, e.g.
+"order:/tables/=off,kitchen:/kitchen_orders/=token".
+"""
+import asyncio
+import os
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import HTTPException
+import httpx
+import auth
+from http_clients import get_client
+
+GET_COALESCING_ENABLED = os.getenv("GET_COALESCING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+TOKEN = "token"
+ROLE = "role"
+OFF = "off"
+
+DEFAULT_POLICY = TOKEN
+
+# (service, downstream path) -> auth scope
+COALESCE_POLICIES: Dict[Tuple[str, str], str] = {
+    ("order", "/tables/"): ROLE,
+    ("order", "/tables/available"): ROLE,
+    ("order", "/orders/active"): ROLE,
+    ("kitchen", "/kitchen_orders/"): ROLE,
+    ("kitchen", "/kitchen_orders/ready-to-serve"): ROLE,
+}
+
+def parse_policies(value: str) -> Dict[Tuple[str, str], str]:
+    policies = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, scope = item.rpartition("=")
+        service, _, path = route.partition(":")
+        if not service or not path or scope not in (TOKEN, ROLE, OFF):
+            raise ValueError(f"Invalid GET_COALESCE_POLICIES entry: {item}")
+        policies[(service, path)] = scope
+    return policies
+
+COALESCE_POLICIES.update(parse_policies(os.getenv("GET_COALESCE_POLICIES", "")))
+
+class RequestCoalescer:
+    def __init__(self, enabled: bool = GET_COALESCING_ENABLED, policies: Dict[Tuple[str, str], str] = None):
+        self.enabled = enabled
+        self.policies = COALESCE_POLICIES if policies is None else policies
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def _scope(self, service: str, path: str, authorization: Optional[str]) -> Optional[str]:
+        """Auth part of the coalescing key, or None if the request is sent on its own"""
+        policy = self.policies.get((service, path), DEFAULT_POLICY)
+        if policy == OFF:
+            return None
+        if policy == ROLE and authorization:
+            try:
+                return "role:" + auth.verify_token(auth.extract_bearer_token(authorization))["role"]
+            except HTTPException:
+                return None  # Let the downstream service reject it
+        return "token:" + (authorization or "")
+
+    def _key(self, service: str, path: str, headers: Optional[Dict[str, str]],
+             params: Optional[Dict[str, Any]]) -> Optional[str]:
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        scope = self._scope(service, path, headers.pop("authorization", None))
+        if scope is None:
+            return None
+        return "|".join((service, path, urlencode(sorted((params or {}).items())),
+                         urlencode(sorted(headers.items())), scope))
+
+    async def _call(self, service: str, path: str, headers: Optional[Dict[str, str]],
+                    params: Optional[Dict[str, Any]]) -> httpx.Response:
+        self.upstream_calls += 1
+        # Not streamed: the body is read before the response is shared
+        return await get_client(service).get(path, headers=headers, params=params)
+
+    async def get(self, service: str, path: str, headers: Optional[Dict[str, str]] = None,
+                  params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """GET path from a service, sharing the call with identical GETs in flight"""
+        self.requests += 1
+        key = self._key(service, path, headers, params) if self.enabled else None
+        if key is None:
+            return await self._call(service, path, headers, params)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._call(service, path, headers, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+        # shield: a client giving up must not cancel the call other requests wait on
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved, even if every waiter gave up
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._inflight),
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced
+        }
+
+request_coalescer = RequestCoalescer()
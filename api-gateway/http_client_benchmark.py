@@ -0,0 +1,94 @@
+"""
+Latency benchmark for the gateway's downstream HTTP clients.
+
+Starts a stub service with uvicorn on localhost (in its own thread and
+event loop, so serving does not slow the client side) and sends the same GETs
+to it two ways:
+
+- before: a new httpx.AsyncClient per call, as the forwarders did before
+  the shared pools (a TCP connection opened and closed every time)
+- after: the pooled, keep-alive client from ServiceClients
+
+and reports requests per second and latency percentiles for each:
+    python http_client_benchmark.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from fastapi import FastAPI
+import httpx
+import uvicorn
+import http_clients
+
+stub = FastAPI()
+
+@stub.get("/tables/")
+async def list_tables():
+    return [{"table_id": table_id, "table_status": "available"} for table_id in range(1, 21)]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def new_client_per_call(url: str):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url)
+        response.raise_for_status()
+
+async def pooled_client(path: str):
+    response = await http_clients.get_client("order").get(path)
+    response.raise_for_status()
+
+async def measure(name: str, call, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"{name:<7} {requests / elapsed:8.0f} req/s   latency ms: p50 {statistics.median(latencies):.2f}, "
+          f"p95 {percentile(0.95):.2f}, p99 {percentile(0.99):.2f}, max {latencies[-1]:.2f}")
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    serving = threading.Thread(target=server.run, daemon=True)
+    serving.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    http_clients.SERVICE_URLS["order"] = base_url
+    await http_clients.service_clients.startup()
+    try:
+        print(f"{args.requests} GET /tables/ per run, {args.concurrency} concurrent")
+        # Warm up both paths (imports, first pooled connections)
+        await measure("warmup", lambda: new_client_per_call(f"{base_url}/tables/"), 50, args.concurrency)
+        await measure("warmup", lambda: pooled_client("/tables/"), 50, args.concurrency)
+
+        await measure("before", lambda: new_client_per_call(f"{base_url}/tables/"), args.requests, args.concurrency)
+        await measure("after", lambda: pooled_client("/tables/"), args.requests, args.concurrency)
+    finally:
+        await http_clients.service_clients.shutdown()
+        server.should_exit = True
+        serving.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downstream HTTP client latency benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="requests in flight (keep within BULKHEAD_MAX_CONCURRENT)")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,93 @@
+import os
+from typing import Any, Dict, Optional
+import httpx
+from resilience import GuardedTransport
+
+# Downstream service base URLs
+SERVICE_URLS = {
+    "user": os.getenv("USER_SERVICE_URL", "http://user-service:8001"),
+    "order": os.getenv("ORDER_SERVICE_URL", "http://order-service:8002"),
+    "kitchen": os.getenv("KITCHEN_SERVICE_URL", "http://kitchen-service:8003"),
+}
+
+# Connection pool configuration (per downstream service)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # seconds
+
+# Timeout configuration (seconds)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+
+# HTTP/2 is opt-in (requires the h2 package)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Per-service client options
+SERVICE_OPTIONS = {
+    "kitchen": {"follow_redirects": True},
+}
+
+class ServiceClients:
+    """Registry of pooled, keep-alive HTTP clients, one per downstream service"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, GuardedTransport] = {}
+
+    def _create_client(self, service: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT
+        )
+        # Circuit breaker and bulkhead around the pooled transport
+        transport = GuardedTransport(service, httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_ENABLED))
+        self._transports[service] = transport
+        return httpx.AsyncClient(
+            base_url=SERVICE_URLS[service],
+            transport=transport,
+            timeout=timeout,
+            **SERVICE_OPTIONS.get(service, {})
+        )
+
+    async def startup(self):
+        """Open one pooled client per downstream service"""
+        for service in SERVICE_URLS:
+            if service not in self._clients:
+                self._clients[service] = self._create_client(service)
+        print(f"✅ HTTP client pools ready for: {', '.join(self._clients)}")
+
+    async def shutdown(self):
+        """Close all pooled clients and their keep-alive connections"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def get(self, service: str) -> httpx.AsyncClient:
+        """Get the pooled client for a service, creating it lazily if needed"""
+        if service not in SERVICE_URLS:
+            raise KeyError(f"Unknown downstream service: {service}")
+        client: Optional[httpx.AsyncClient] = self._clients.get(service)
+        if client is None or client.is_closed:
+            client = self._create_client(service)
+            self._clients[service] = client
+        return client
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Circuit breaker and bulkhead state per service"""
+        return {service: transport.stats() for service, transport in self._transports.items()}
+
+# Shared registry used by all forwarders
+service_clients = ServiceClients()
+
+def get_client(service: str) -> httpx.AsyncClient:
+    """Get the shared pooled client for a downstream service"""
+    return service_clients.get(service)
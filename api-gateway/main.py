@@ -3,17 +3,37 @@ from fastapi.middleware.cors import CORSMiddleware
 import httpx
 from fastapi.security import OAuth2PasswordBearer
 from routers import user_routes, order_routes, kitchen_routes, report_routes
+from http_clients import service_clients, get_client
+from resilience import ServiceUnavailable
+import auth
 import json
 import socketio
+import realtime
+from response_cache import menu_cache
+from coalescing import request_coalescer
 
 app = FastAPI(title="Restaurant API Gateway")
 
+@app.on_event("startup")
+async def startup_event():
+    # Open pooled keep-alive clients to downstream services
+    await service_clients.startup()
+    broadcaster.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await broadcaster.stop()
+    await service_clients.shutdown()
+
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins=['http://localhost:3000', 'http://localhost:4000']  # Added all development ports
 )
 
+# Room-scoped, batched fan-out of socket events
+broadcaster = realtime.EventBroadcaster(sio)
+
 # Create ASGIApp for Socket.IO
 socket_app = socketio.ASGIApp(
     socketio_server=sio,
@@ -27,14 +47,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
 
 # Socket.IO event handlers
+async def authenticate_sid(sid, token):
+    """Verify a token and put the connection in its role's rooms"""
+    if not token:
+        return None
+    try:
+        user = auth.verify_token(auth.extract_bearer_token(token))
+    except HTTPException:
+        return None
+    # A re-authenticating connection may come back with another role
+    previous_role = (await sio.get_session(sid)).get("role")
+    await sio.save_session(sid, {"role": user["role"], "sub": user["sub"]})
+    return await realtime.join_role_rooms(sio, sid, user["role"], previous_role)
+
 @sio.event
 async def connect(sid, environ, auth=None):
-    print(f"Client connected: {sid}")
+    # Token from the Socket.IO auth payload, or an Authorization header
+    token = (auth or {}).get("token") or environ.get("HTTP_AUTHORIZATION")
+    rooms = await authenticate_sid(sid, token)
+    # Unauthenticated clients stay connected but join no rooms until they
+    # send a valid token with 'authenticate'
+    print(f"Client connected: {sid} (rooms: {rooms or []})")
     return True
 
+@sio.event
+async def authenticate(sid, data):
+    rooms = await authenticate_sid(sid, (data or {}).get("token"))
+    if rooms is None:
+        return {"status": "error", "message": "Invalid or expired token"}
+    return {"status": "success", "rooms": rooms}
+
+@sio.event
+async def join_table(sid, data):
+    """Follow the events of one table (authenticated clients only)"""
+    session = await sio.get_session(sid)
+    if not session.get("role"):
+        return {"status": "error", "message": "Not authenticated"}
+    await sio.enter_room(sid, realtime.table_room(data["table_id"]))
+    return {"status": "success"}
+
+@sio.event
+async def leave_table(sid, data):
+    await sio.leave_room(sid, realtime.table_room(data["table_id"]))
+    return {"status": "success"}
+
 @sio.event
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
@@ -44,40 +104,44 @@ async def new_order(sid, data):
     # Forward the new order to kitchen service and notify all clients
     print(f"New order received: {data}")
     try:
-        async with httpx.AsyncClient() as client:
-            # Forward order to kitchen service
-            kitchen_response = await client.post(
-                "http://kitchen-service:8003/",
-                json=data,
-                headers={"Authorization": f"Bearer {data.get('token', '')}"} 
-            )
-            
-            if kitchen_response.status_code == 200:
-                # Broadcast to all connected clients including kitchen staff
-                await sio.emit('order_update', kitchen_response.json())
-                return {"status": "success", "message": "Order sent to kitchen successfully"}
-            else:
-                print(f"Error from kitchen service: {kitchen_response.text}")
-                return {"status": "error", "message": "Failed to send order to kitchen"}
+        client = get_client("kitchen")
+        # Forward order to kitchen service
+        kitchen_response = await client.post(
+            "/",
+            json=data,
+            headers={"Authorization": f"Bearer {data.get('token', '')}"} 
+        )
+        
+        if kitchen_response.status_code == 200:
+            # Notify the kitchen, managers, waiters and the table's room
+            order = kitchen_response.json()
+            await broadcaster.emit('order_update', order, realtime.order_update_rooms(
+                {"type": "new_order", "table_id": data.get("table_id"), **order}
+            ))
+            return {"status": "success", "message": "Order sent to kitchen successfully"}
+        else:
+            print(f"Error from kitchen service: {kitchen_response.text}")
+            return {"status": "error", "message": "Failed to send order to kitchen"}
     except Exception as e:
         print(f"Error forwarding order to kitchen: {str(e)}")
         return {"status": "error", "message": str(e)}
 
 @sio.event
 async def order_update(sid, data):
-    # Broadcast order update to all connected clients except sender
-    await sio.emit('order_update', data, skip_sid=sid)
+    # Send the order update to the rooms that need it, except the sender
+    await broadcaster.emit('order_update', data, realtime.order_update_rooms(data), skip_sid=sid)
 
 @sio.event
 async def table_update(sid, data):
     print(f"Table status update received: {data}")
     try:
-        # Broadcast table update to all connected clients except sender
-        await sio.emit('table_update', {
+        # Send the table update to waiters, managers and the table's room, except the sender
+        update = {
             'table_id': data['table_id'],
             'status': data['status'],
             'timestamp': data['timestamp']
-        }, skip_sid=sid)
+        }
+        await broadcaster.emit('table_update', update, realtime.table_update_rooms(update), skip_sid=sid)
         return {"status": "success", "message": "Table status updated successfully"}
     except Exception as e:
         print(f"Error broadcasting table update: {str(e)}")
@@ -85,25 +149,20 @@ async def table_update(sid, data):
 
 @sio.event
 async def menu_update(sid, data):
-    # Broadcast menu update to all connected clients except sender
-    await sio.emit('menu_update', data, skip_sid=sid)
+    # The menu changed: the cached menu responses are outdated
+    menu_cache.invalidate()
+    # Send the menu update to all staff rooms, except the sender
+    await broadcaster.emit('menu_update', data, realtime.menu_update_rooms(data), skip_sid=sid)
 
 # Authentication setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/users/login")
 
-async def verify_token(token: str):
-    """Verify token with user service"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "http://user-service:8001/auth/verify",
-                json={"token": token}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except httpx.RequestError:
-            return None
+async def verify_token(token: str, required_role: str = None):
+    """Verify token locally (HS256, shared signing key with user service)"""
+    try:
+        return auth.verify_token(token, required_role)
+    except HTTPException:
+        return None
 
 # Include routers from different services
 app.include_router(user_routes.router, prefix="/api/users", tags=["Users"])
@@ -126,30 +185,27 @@ async def health_check():
         "kitchen_service": "unknown"
     }
     
-    async with httpx.AsyncClient() as client:
-        # Check user service
+    # Check each downstream service over its pooled client
+    for service in ("user", "order", "kitchen"):
         try:
-            user_response = await client.get("http://user-service:8001/")
-            services["user_service"] = "healthy" if user_response.status_code == 200 else "unhealthy"
-        except httpx.RequestError:
-            services["user_service"] = "unhealthy"
-            
-        # Check order service
-        try:
-            order_response = await client.get("http://order-service:8002/")
-            services["order_service"] = "healthy" if order_response.status_code == 200 else "unhealthy"
-        except httpx.RequestError:
-            services["order_service"] = "unhealthy"
-            
-        # Check kitchen service
-        try:
-            kitchen_response = await client.get("http://kitchen-service:8003/")
-            services["kitchen_service"] = "healthy" if kitchen_response.status_code == 200 else "unhealthy"
-        except httpx.RequestError:
-            services["kitchen_service"] = "unhealthy"
+            response = await get_client(service).get("/")
+            services[f"{service}_service"] = "healthy" if response.status_code == 200 else "unhealthy"
+        except (httpx.RequestError, ServiceUnavailable):
+            services[f"{service}_service"] = "unhealthy"
     
     return services
 
+@app.get("/api/metrics")
+async def metrics():
+    """Runtime metrics for the API gateway"""
+    return {
+        "token_cache": auth.token_cache.stats(),
+        "socket_events": broadcaster.stats(),
+        "downstream": service_clients.resilience_stats(),
+        "menu_cache": menu_cache.stats(),
+        "get_coalescing": request_coalescer.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(socket_app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,51 @@
+from typing import Any, Dict, Optional
+from fastapi import Query, Response
+import httpx
+
+# Header carrying the cursor of the next page (set by the downstream services)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class PageQuery:
+    """
+    Pagination query parameters passed through to the downstream services
+    (use with Depends()). Validation happens downstream.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        limit: Optional[int] = Query(None, ge=1),
+        since: Optional[str] = Query(None, description="ISO datetime, only rows at or after this time"),
+        until: Optional[str] = Query(None, description="ISO datetime, only rows before this time")
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.since = since
+        self.until = until
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            name: value for name, value in
+            {"cursor": self.cursor, "limit": self.limit, "since": self.since, "until": self.until}.items()
+            if value is not None
+        }
+
+class TimeWindowQuery:
+    """?since= and ?until= of a list that is not paged (use with Depends())"""
+
+    def __init__(
+        self,
+        since: Optional[str] = Query(None, description="ISO datetime, only rows at or after this time"),
+        until: Optional[str] = Query(None, description="ISO datetime, only rows before this time")
+    ):
+        self.since = since
+        self.until = until
+
+    def params(self) -> Dict[str, Any]:
+        return {name: value for name, value in {"since": self.since, "until": self.until}.items() if value is not None}
+
+def copy_next_cursor(upstream: httpx.Response, client_response: Optional[Response]):
+    """Pass the downstream next-page cursor on to the client"""
+    next_cursor = upstream.headers.get(NEXT_CURSOR_HEADER)
+    if client_response is not None and next_cursor:
+        client_response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,186 @@
+import asyncio
+import os
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import socketio
+
+# Seconds between flushes of buffered events (0 emits every event immediately)
+SOCKET_FLUSH_INTERVAL = float(os.getenv("SOCKET_FLUSH_INTERVAL", "0.05"))
+# Send events only to the rooms that use them; false broadcasts every event
+# to every client immediately (the old behaviour, e.g. as a load test baseline)
+SOCKET_ROOMS_ENABLED = os.getenv("SOCKET_ROOMS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Rooms
+KITCHEN_ROOM = "kitchen"
+WAITERS_ROOM = "waiters"
+MANAGER_ROOM = "manager"
+
+# Rooms joined by each role after token verification
+ROLE_ROOMS = {
+    "kitchen": [KITCHEN_ROOM],
+    "waiter": [WAITERS_ROOM],
+    "manager": [MANAGER_ROOM],
+}
+
+# Order statuses waiters act on; other kitchen progress only goes to the kitchen
+WAITER_ORDER_STATUSES = {"ready_to_serve", "completed", "cancelled"}
+
+def table_room(table_id: Any) -> str:
+    return f"table:{table_id}"
+
+def order_update_rooms(data: Dict[str, Any]) -> Set[str]:
+    """Kitchen and manager see every order event; waiters see new orders and the statuses they act on"""
+    rooms = {KITCHEN_ROOM, MANAGER_ROOM}
+    if data.get("type") == "new_order" or data.get("status") in WAITER_ORDER_STATUSES:
+        rooms.add(WAITERS_ROOM)
+    if data.get("table_id") is not None:
+        rooms.add(table_room(data["table_id"]))
+    return rooms
+
+def table_update_rooms(data: Dict[str, Any]) -> Set[str]:
+    rooms = {WAITERS_ROOM, MANAGER_ROOM}
+    if data.get("table_id") is not None:
+        rooms.add(table_room(data["table_id"]))
+    return rooms
+
+def menu_update_rooms(data: Dict[str, Any]) -> Set[str]:
+    return {KITCHEN_ROOM, WAITERS_ROOM, MANAGER_ROOM}
+
+def coalesce_key(event: str, data: Any) -> Optional[Tuple[str, Any]]:
+    """
+    Key under which a later event replaces an earlier buffered one, or None
+    if every occurrence must be delivered (e.g. new orders)
+    """
+    if not isinstance(data, dict):
+        return None
+    if event == "table_update" and data.get("table_id") is not None:
+        return event, data["table_id"]
+    if event == "order_update" and data.get("type") != "new_order":
+        order_id = data.get("order_id", data.get("orderId"))
+        if order_id is not None:
+            return event, order_id
+    if event == "menu_update" and data.get("food_id") is not None:
+        return event, data["food_id"]
+    return None
+
+class EventBroadcaster:
+    """
+    Emits events to the rooms that need them. With a flush interval,
+    events are buffered and every client gets at most one 'batch' event per
+    flush: a list of {"event", "data"} in emit order, holding the buffered
+    events sent to any of its rooms, where a newer update of the same
+    order, table or menu item replaces the older one. Clients in the same
+    rooms share one encoded batch.
+    """
+
+    def __init__(self, sio: socketio.AsyncServer, flush_interval: float = SOCKET_FLUSH_INTERVAL,
+                 namespace: str = "/", rooms_enabled: bool = SOCKET_ROOMS_ENABLED):
+        self.sio = sio
+        self.rooms_enabled = rooms_enabled
+        self.flush_interval = flush_interval if rooms_enabled else 0
+        self.namespace = namespace
+        # (audience, coalesce key or unique counter) -> (event, data, audience, skip_sid)
+        self._pending: Dict[Any, Tuple[str, Any, FrozenSet[str], Optional[str]]] = {}
+        self._sequence = 0
+        self._flusher: Optional[asyncio.Task] = None
+        self.events = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    async def emit(self, event: str, data: Any, rooms: Iterable[str], skip_sid: Optional[str] = None):
+        audience = frozenset(rooms)
+        if not audience:
+            return
+        self.events += 1
+        if not self.rooms_enabled:
+            await self.sio.emit(event, data, skip_sid=skip_sid, namespace=self.namespace)
+            return
+        if self.flush_interval <= 0:
+            await self.sio.emit(event, data, room=sorted(audience), skip_sid=skip_sid, namespace=self.namespace)
+            return
+
+        key = coalesce_key(event, data)
+        if key is None:
+            self._sequence += 1
+            key = self._sequence
+        key = (audience, key)
+        if key in self._pending:
+            # Drop the older update and queue the newer one at the end
+            del self._pending[key]
+            self.coalesced += 1
+        self._pending[key] = (event, data, audience, skip_sid)
+
+    def _recipients(self, rooms: Set[str]) -> Dict[FrozenSet[str], List[str]]:
+        """Connected clients of the given rooms, grouped by which of them they are in"""
+        membership: Dict[str, Set[str]] = {}
+        for room in rooms:
+            for sid, _ in self.sio.manager.get_participants(self.namespace, room):
+                membership.setdefault(sid, set()).add(room)
+        groups: Dict[FrozenSet[str], List[str]] = {}
+        for sid, member_of in membership.items():
+            groups.setdefault(frozenset(member_of), []).append(sid)
+        return groups
+
+    async def _send(self, entries: List[Tuple[str, Any, FrozenSet[str], Optional[str]]], sids: List[str]):
+        batch = [{"event": event, "data": data} for event, data, _, _ in entries]
+        # Every client is in a room named after its sid, so this encodes the batch once
+        await self.sio.emit("batch", batch, room=sids, namespace=self.namespace)
+        self.batches += 1
+
+    async def flush(self):
+        entries = list(self._pending.values())
+        self._pending = {}
+        if not entries:
+            return
+
+        rooms = set().union(*(audience for _, _, audience, _ in entries))
+        for member_of, sids in self._recipients(rooms).items():
+            batch = [entry for entry in entries if entry[2] & member_of]
+            senders = {entry[3] for entry in batch if entry[3]}
+            others = [sid for sid in sids if sid not in senders]
+            if others:
+                await self._send(batch, others)
+            # Senders get the batch without their own events
+            for sid in senders.intersection(sids):
+                own = [entry for entry in batch if entry[3] != sid]
+                if own:
+                    await self._send(own, [sid])
+
+    def start(self):
+        """Start the periodic flush (no-op when events are emitted immediately)"""
+        if self.flush_interval <= 0 or self._flusher is not None:
+            return
+
+        async def run():
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error flushing socket events: {str(e)}")
+
+        self._flusher = asyncio.create_task(run())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rooms_enabled": self.rooms_enabled,
+            "flush_interval": self.flush_interval,
+            "events": self.events,
+            "coalesced": self.coalesced,
+            "batches": self.batches
+        }
+
+async def join_role_rooms(sio: socketio.AsyncServer, sid: str, role: str, previous_role: Optional[str] = None) -> List[str]:
+    """Put a connection in its role's rooms, leaving those of the role it had before"""
+    rooms = ROLE_ROOMS.get(role, [])
+    for room in ROLE_ROOMS.get(previous_role, []):
+        if room not in rooms:
+            await sio.leave_room(sid, room)
+    for room in rooms:
+        await sio.enter_room(sid, room)
+    return rooms
@@ -0,0 +1,203 @@
+"""
+Circuit breakers and bulkheads for calls to the downstream services.
+
+Every pooled client (http_clients.py) sends through a GuardedTransport,
+so each service has its own:
+
+- Bulkhead: at most BULKHEAD_MAX_CONCURRENT requests in flight. A
+  request waits up to BULKHEAD_MAX_WAIT seconds for a slot, then fails.
+  A stalled service can tie up its own slots, not the whole gateway.
+- Circuit breaker over the last CIRCUIT_WINDOW calls. Transport errors
+  (connect failures, timeouts) and 5xx responses count as failures.
+  Once at least CIRCUIT_MIN_CALLS were made and the failure rate reaches
+  CIRCUIT_FAILURE_RATE, the circuit opens: calls fail immediately for
+  CIRCUIT_OPEN_SECONDS. Then it is half-open: up to
+  CIRCUIT_HALF_OPEN_PROBES probe calls go through; a successful probe
+  closes it, a failed one opens it again.
+
+Rejected calls raise ServiceUnavailable, a 503 with a Retry-After header.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+import httpx
+
+BULKHEAD_MAX_CONCURRENT = int(os.getenv("BULKHEAD_MAX_CONCURRENT", "50"))
+BULKHEAD_MAX_WAIT = float(os.getenv("BULKHEAD_MAX_WAIT", "0.5"))  # seconds
+
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ServiceUnavailable(HTTPException):
+    """A call rejected by a circuit breaker or bulkhead"""
+
+    def __init__(self, service: str, reason: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{service.capitalize()} service unavailable: {reason}",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+class CircuitBreaker:
+    def __init__(self, window: int = CIRCUIT_WINDOW, min_calls: int = CIRCUIT_MIN_CALLS,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE, open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes: deque = deque(maxlen=window)  # True for a failure
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (counts it as a probe when half-open)"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def record(self, failed: bool):
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if failed:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        if self.state == OPEN:
+            return  # A call from before the circuit opened
+
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and \
+                sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def cancel_probe(self):
+        """A probe that was let through but never made its call"""
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failures": sum(self._outcomes),
+            "retry_after": round(self.retry_after(), 3) if self.state == OPEN else None,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+class Bulkhead:
+    def __init__(self, max_concurrent: int = BULKHEAD_MAX_CONCURRENT, max_wait: float = BULKHEAD_MAX_WAIT):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "max_concurrent": self.max_concurrent, "rejected": self.rejected}
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that gives the bulkhead slot back once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+class GuardedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper applying a service's bulkhead and circuit breaker"""
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport):
+        self.service = service
+        self.transport = transport
+        self.breaker = CircuitBreaker()
+        self.bulkhead = Bulkhead()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise ServiceUnavailable(self.service, "circuit open", self.breaker.retry_after())
+        if not await self.bulkhead.acquire():
+            self.breaker.cancel_probe()
+            raise ServiceUnavailable(self.service, "too many concurrent requests", 1)
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            self.bulkhead.release()
+            self.breaker.record(failed=True)
+            raise
+        except BaseException:
+            self.bulkhead.release()
+            self.breaker.cancel_probe()
+            raise
+
+        self.breaker.record(failed=response.status_code >= 500)
+        response.stream = _ReleasingStream(response.stream, self.bulkhead.release)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"circuit": self.breaker.stats(), "bulkhead": self.bulkhead.stats()}
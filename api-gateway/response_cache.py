@@ -0,0 +1,155 @@
+"""
+Response cache for public, identical-for-everyone GET routes (the menu).
+
+Entries are keyed by downstream path and query parameters and hold the
+raw response body with an ETag computed from it:
+
+- Fresh (younger than MENU_CACHE_TTL seconds): served from the cache.
+- Stale (up to MENU_CACHE_STALE_SECONDS more): served from the cache
+  while one background request refreshes the entry. The refresh sends
+  the downstream ETag, so an unchanged menu costs a 304.
+- Missing or expired: fetched; concurrent misses of the same key share
+  one downstream request (single flight).
+
+invalidate() drops everything, and fetches that started before it are
+not stored, so a menu mutation is visible on the next read.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import HTTPException
+import httpx
+from http_clients import get_client
+from pagination import NEXT_CURSOR_HEADER
+
+MENU_CACHE_TTL = float(os.getenv("MENU_CACHE_TTL", "30"))  # seconds
+MENU_CACHE_STALE_SECONDS = float(os.getenv("MENU_CACHE_STALE_SECONDS", "300"))
+MENU_CACHE_MAX_ENTRIES = int(os.getenv("MENU_CACHE_MAX_ENTRIES", "512"))
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "next_cursor", "upstream_etag", "fetched_at")
+
+    def __init__(self, body: bytes, next_cursor: Optional[str], upstream_etag: Optional[str]):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.next_cursor = next_cursor
+        self.upstream_etag = upstream_etag
+        self.fetched_at = time.monotonic()
+
+class ResponseCache:
+    def __init__(self, service: str, ttl: float = MENU_CACHE_TTL, stale_seconds: float = MENU_CACHE_STALE_SECONDS,
+                 max_entries: int = MENU_CACHE_MAX_ENTRIES):
+        self.service = service
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.not_modified = 0
+        self.fetch_errors = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return f"{path}?{urlencode(sorted(params.items()))}" if params else path
+
+    async def _fetch(self, key: str, path: str, params: Optional[Dict[str, Any]],
+                     previous: Optional[CachedResponse]) -> CachedResponse:
+        generation = self._generation
+        headers = {"If-None-Match": previous.upstream_etag} if previous and previous.upstream_etag else None
+        self.fetches += 1
+        try:
+            response = await get_client(self.service).get(path, params=params, headers=headers)
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=503, detail=f"{self.service.capitalize()} service unavailable: {str(e)}")
+
+        if response.status_code == 304 and previous is not None:
+            self.not_modified += 1
+            previous.fetched_at = time.monotonic()
+            entry = previous
+        elif response.status_code == 200:
+            entry = CachedResponse(response.content, response.headers.get(NEXT_CURSOR_HEADER),
+                                   response.headers.get("etag"))
+        else:
+            raise HTTPException(status_code=response.status_code, detail=response.json())
+
+        # An invalidation while the request was out makes its result outdated
+        if generation == self._generation:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _start_fetch(self, key: str, path: str, params: Optional[Dict[str, Any]],
+                     previous: Optional[CachedResponse]) -> asyncio.Task:
+        """The in-flight fetch of a key, starting one if there is none"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, path, params, previous))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return task
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.fetch_errors += 1
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[CachedResponse, str]:
+        """The response for a GET of path, and whether it was a HIT, STALE or MISS"""
+        key = self.key(path, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry, HIT
+            if age < self.ttl + self.stale_seconds:
+                self.stale_hits += 1
+                self._start_fetch(key, path, params, entry)
+                return entry, STALE
+
+        self.misses += 1
+        # shield: a client giving up must not cancel the fetch other requests wait on
+        return await asyncio.shield(self._start_fetch(key, path, params, entry)), MISS
+
+    def invalidate(self):
+        """Forget every entry, e.g. after the menu changed"""
+        self._generation += 1
+        self._entries.clear()
+        # Requests from now on start their own fetch instead of joining an outdated one
+        self._inflight.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "fetch_errors": self.fetch_errors,
+            "invalidations": self.invalidations
+        }
+
+menu_cache = ResponseCache("kitchen")
@@ -1,63 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
 import httpx
 from typing import Dict, Any, List, Optional
 import os
 from fastapi import File, UploadFile, Form
+from http_clients import get_client
+from coalescing import request_coalescer
+from pagination import NEXT_CURSOR_HEADER, PageQuery, TimeWindowQuery, copy_next_cursor
+from response_cache import menu_cache
 
 router = APIRouter()
 
 async def forward_request(path: str, method: str = "GET", data: dict = None, 
-                         headers: dict = None, params: dict = None, files: dict = None):
+                         headers: dict = None, params: dict = None, files: dict = None,
+                         client_response: Response = None):
     """Forward request to kitchen service"""
-    kitchen_service_url = os.getenv("KITCHEN_SERVICE_URL", "http://kitchen-service:8003")
-    url = f"{kitchen_service_url}{path}"
-    
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        try:
-            if files:
-                # Handle multipart form data
-                form_data = {}
-                if data:
-                    form_data.update(data)
-                files_dict = {
-                    'file': (files['file'].filename, files['file'].file, files['file'].content_type)
-                }
-                if method == "POST":
-                    response = await client.post(url, data=form_data, files=files_dict, headers=headers)
-                else:
-                    raise HTTPException(status_code=405, detail="Method not allowed for file upload")
+    client = get_client("kitchen")
+    
+    try:
+        if files:
+            # Handle multipart form data
+            form_data = {}
+            if data:
+                form_data.update(data)
+            files_dict = {
+                'file': (files['file'].filename, files['file'].file, files['file'].content_type)
+            }
+            if method == "POST":
+                response = await client.post(path, data=form_data, files=files_dict, headers=headers)
             else:
-                # Handle regular requests
-                if method == "GET":
-                    response = await client.get(url, headers=headers, params=params)
-                elif method == "POST":
-                    response = await client.post(url, json=data, headers=headers)
-                elif method == "PUT":
-                    response = await client.put(url, json=data, headers=headers)
-                elif method == "PATCH":
-                    response = await client.patch(url, json=data, headers=headers)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=headers)
-                else:
-                    raise HTTPException(status_code=405, detail="Method not allowed")
-                
-            return response.json(), response.status_code
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"Kitchen service unavailable: {str(e)}")
+                raise HTTPException(status_code=405, detail="Method not allowed for file upload")
+        else:
+            # Handle regular requests
+            if method == "GET":
+                response = await request_coalescer.get("kitchen", path, headers=headers, params=params)
+            elif method == "POST":
+                response = await client.post(path, json=data, headers=headers)
+            elif method == "PUT":
+                response = await client.put(path, json=data, headers=headers)
+            elif method == "PATCH":
+                response = await client.patch(path, json=data, headers=headers)
+            elif method == "DELETE":
+                response = await client.delete(path, headers=headers)
+            else:
+                raise HTTPException(status_code=405, detail="Method not allowed")
+            
+        copy_next_cursor(response, client_response)
+        return response.json(), response.status_code
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Kitchen service unavailable: {str(e)}")
+
+async def cached_menu_read(request: Request, path: str, params: dict = None) -> Response:
+    """
+    Serve a public menu read from the gateway cache; answer 304 Not Modified
+    if the client already has the cached body
+    """
+    entry, cache_status = await menu_cache.get(path, params)
+    # no-cache: clients revalidate every time, so they see invalidations at once
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": cache_status}
+    if entry.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = entry.next_cursor
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
 #<------------------------Menu routes------------------------>
 @router.get("/menu", response_model=List[Dict[str, Any]])
-async def get_menu():
+async def get_menu(request: Request, page: PageQuery = Depends()):
     """Get full menu route forwarded to kitchen service"""
-    response, status_code = await forward_request(
-        path="/menu/", 
-        method="GET"
-    )
-    
-    if status_code >= 400:
-        raise HTTPException(status_code=status_code, detail=response)
-    
-    return response
+    return await cached_menu_read(request, "/menu/", page.params())
 
 @router.post("/menu", response_model=Dict[str, str])
 async def add_food_item(food_data: Dict[str, Any], authorization: str = Header(...)):
@@ -73,6 +83,7 @@ async def add_food_item(food_data: Dict[str, Any], authorization: str = Header(.
     if status_code >= 400:
         raise HTTPException(status_code=status_code, detail=response)
     
+    menu_cache.invalidate()
     return response
 
 @router.post("/menu/upload-image")
@@ -112,33 +123,18 @@ async def delete_food_item(food_id: str, authorization: str = Header(...)):
     if status_code >= 400:
         raise HTTPException(status_code=status_code, detail=response)
     
+    menu_cache.invalidate()
     return response
 
 @router.get("/menu/available", response_model=List[Dict[str, Any]])
-async def get_available_menu():
+async def get_available_menu(request: Request):
     """Get available menu items route forwarded to kitchen service"""
-    response, status_code = await forward_request(
-        path="/menu/available", 
-        method="GET"
-    )
-    
-    if status_code >= 400:
-        raise HTTPException(status_code=status_code, detail=response)
-    
-    return response
+    return await cached_menu_read(request, "/menu/available")
 
 @router.get("/menu/category/{category}", response_model=List[Dict[str, Any]])
-async def get_menu_by_category(category: str):
+async def get_menu_by_category(category: str, request: Request):
     """Get menu by category route forwarded to kitchen service"""
-    response, status_code = await forward_request(
-        path=f"/menu/category/{category}", 
-        method="GET"
-    )
-    
-    if status_code >= 400:
-        raise HTTPException(status_code=status_code, detail=response)
-    
-    return response
+    return await cached_menu_read(request, f"/menu/category/{category}")
 
 @router.patch("/menu/{food_id}/availability")
 async def update_food_availability(food_id: str, data: Dict[str, bool], authorization: str = Header(...)):
@@ -154,30 +150,24 @@ async def update_food_availability(food_id: str, data: Dict[str, bool], authoriz
     if status_code >= 400:
         raise HTTPException(status_code=status_code, detail=response)
     
+    menu_cache.invalidate()
     return response
 
 @router.get("/menu/{food_id}")
-async def get_menu_item(food_id: str):
+async def get_menu_item(food_id: str, request: Request):
     """Get menu item by ID route forwarded to kitchen service"""
-    response, status_code = await forward_request(
-        path=f"/menu/{food_id}", 
-        method="GET"
-    )
-    
-    if status_code >= 400:
-        raise HTTPException(status_code=status_code, detail=response)
-    
-    return response
+    return await cached_menu_read(request, f"/menu/{food_id}")
 
 #<------------------------Kitchen order routes------------------------>
 @router.get("/orders")
-async def get_kitchen_orders(authorization: str = Header(...)):
+async def get_kitchen_orders(window: TimeWindowQuery = Depends(), authorization: str = Header(...)):
     """Get kitchen orders route forwarded to kitchen service"""
     headers = {"Authorization": authorization}
     response, status_code = await forward_request(
         path="/kitchen_orders/", 
         method="GET",
-        headers=headers
+        headers=headers,
+        params=window.params()
     )
     
     if status_code >= 400:
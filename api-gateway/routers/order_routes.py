@@ -1,50 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 from typing import Dict, Any, List, Optional
 import os
 import json  # Add this import
 from datetime import datetime  # Add this import
+from http_clients import get_client
+from coalescing import request_coalescer
+from pagination import PageQuery, TimeWindowQuery, copy_next_cursor
 
 router = APIRouter()
 
+# Response headers passed on to the client (version of a table, replayed idempotent request)
+PASSED_THROUGH_HEADERS = ("ETag", "Idempotent-Replayed")
+
 async def forward_request(path: str, method: str = "GET", data: dict = None, 
-                         headers: dict = None, params: dict = None):
+                         headers: dict = None, params: dict = None, client_response: Response = None):
     """Forward request to order service"""
-    order_service_url = os.getenv("ORDER_SERVICE_URL", "http://order-service:8002")
-    url = f"{order_service_url}{path}"
-    print(f"Forwarding request to: {url}")  # Debug log
+    client = get_client("order")
+    print(f"Forwarding request to: {client.base_url}{path}")  # Debug log
     
     if headers:
         print(f"Headers: {headers}")  # Debug log
         
-    async with httpx.AsyncClient() as client:
-        try:
-            if method == "GET":
-                response = await client.get(url, headers=headers, params=params)
-            elif method == "POST":
-                response = await client.post(url, json=data, headers=headers)
-            elif method == "PUT":
-                response = await client.put(url, json=data, headers=headers)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers)
-            else:
-                raise HTTPException(status_code=405, detail="Method not allowed")
-            
-            print(f"Response status: {response.status_code}")  # Debug log
-            print(f"Response body: {response.text}")  # Debug log
-            
-            if response.status_code >= 400:
-                error_detail = response.json() if response.text else {"detail": "Unknown error"}
-                raise HTTPException(status_code=response.status_code, detail=error_detail)
-                
-            return response.json(), response.status_code
+    try:
+        if method == "GET":
+            response = await request_coalescer.get("order", path, headers=headers, params=params)
+        elif method == "POST":
+            response = await client.post(path, json=data, headers=headers)
+        elif method == "PUT":
+            response = await client.put(path, json=data, headers=headers)
+        elif method == "DELETE":
+            response = await client.delete(path, headers=headers)
+        else:
+            raise HTTPException(status_code=405, detail="Method not allowed")
+        
+        print(f"Response status: {response.status_code}")  # Debug log
+        print(f"Response body: {response.text}")  # Debug log
+        
+        if response.status_code >= 400:
+            error_detail = response.json() if response.text else {"detail": "Unknown error"}
+            raise HTTPException(status_code=response.status_code, detail=error_detail)
             
-        except httpx.RequestError as e:
-            print(f"Request error: {str(e)}")  # Debug log
-            raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
-        except Exception as e:
-            print(f"Unexpected error: {str(e)}")  # Debug log
-            raise HTTPException(status_code=500, detail=str(e))
+        copy_next_cursor(response, client_response)
+        if client_response is not None:
+            for header in PASSED_THROUGH_HEADERS:
+                if header in response.headers:
+                    client_response.headers[header] = response.headers[header]
+        return response.json(), response.status_code
+        
+    except httpx.RequestError as e:
+        print(f"Request error: {str(e)}")  # Debug log
+        raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
+    except HTTPException as e:
+        # Downstream errors, and calls rejected by the circuit breaker or bulkhead
+        raise e
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")  # Debug log
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Response headers passed through from streamed downstream responses
+STREAMED_HEADERS = ("content-type", "content-disposition")
+
+async def stream_request(path: str, headers: dict = None, params: dict = None) -> StreamingResponse:
+    """
+    Forward a GET to order service and relay the response body chunk by
+    chunk as it arrives, without buffering it
+    """
+    client = get_client("order")
+    try:
+        upstream = await client.send(
+            client.build_request("GET", path, headers=headers, params=params),
+            stream=True
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
+
+    if upstream.status_code >= 400:
+        await upstream.aread()
+        await upstream.aclose()
+        error_detail = upstream.json() if upstream.text else {"detail": "Unknown error"}
+        raise HTTPException(status_code=upstream.status_code, detail=error_detail)
+
+    return StreamingResponse(
+        upstream.aiter_bytes(),
+        status_code=upstream.status_code,
+        headers={name: upstream.headers[name] for name in STREAMED_HEADERS if name in upstream.headers},
+        background=BackgroundTask(upstream.aclose)
+    )
 
 # <------------------------Table endpoints------------------------>
 @router.get("/tables")
@@ -68,14 +112,18 @@ async def get_tables(authorization: str = Header(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/tables/{table_id}")
-async def update_table_status(table_id: int, table_data: Dict[str, Any], authorization: str = Header(...)):
-    """Update table status"""
+async def update_table_status(table_id: int, table_data: Dict[str, Any], http_response: Response,
+                              authorization: str = Header(...), if_match: Optional[str] = Header(None)):
+    """Update table status (pass If-Match with the table's version to avoid overwriting a newer change)"""
     headers = {"Authorization": authorization}
+    if if_match:
+        headers["If-Match"] = if_match
     response, status_code = await forward_request(
         path=f"/tables/{table_id}",
         method="PUT",
         data=table_data,
-        headers=headers
+        headers=headers,
+        client_response=http_response
     )
     return response
 
@@ -91,167 +139,71 @@ async def initialize_tables(authorization: str = Header(...)):
     return response
 
 # <------------------------Order endpoints------------------------> 
-@router.post("/")
-async def create_order(order_data: Dict[str, Any], authorization: str = Header(...)):
-    """Create new order"""
+def idempotent_headers(authorization: str, idempotency_key: Optional[str]) -> dict:
     headers = {"Authorization": authorization}
+    if idempotency_key is not None:
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
+
+@router.post("/")
+async def create_order(order_data: Dict[str, Any], http_response: Response, authorization: str = Header(...),
+                       idempotency_key: Optional[str] = Header(None)):
+    """
+    Create new order. The Idempotency-Key is forwarded: order-service
+    answers a retry with the first response
+    """
     try:
         # Forward to order service
         response, status_code = await forward_request(
             path="/orders/",
             method="POST",
             data=order_data,
-            headers=headers
+            headers=idempotent_headers(authorization, idempotency_key),
+            client_response=http_response
         )
         
         if status_code >= 400:
             raise HTTPException(status_code=status_code, detail=response)
-        
-        # Forward to kitchen service
-        kitchen_order_data = {
-            "order_id": str(response["order_id"]),
-            "table_id": order_data["table_id"],
-            "items": order_data["items"],
-            "status": "pending",
-            "priority": "normal",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Forward to kitchen service
-        await forward_request(
-            path="/kitchen_orders/",
-            method="POST",
-            data=kitchen_order_data,
-            headers=headers
-        )
-        
+
+        # order-service delivers the order to the kitchen through its outbox
         return response
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/active")
-async def get_active_orders(authorization: str = Header(...)):
-    """Get active orders"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path="/orders/active",
-        method="GET",
-        headers=headers
-    )
-    return response
-
-@router.get("/{order_id}")
-async def get_order(order_id: int, authorization: str = Header(...)):
-    """Get order by ID"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}",
-        method="GET",
-        headers=headers
-    )
-    return response
-
-@router.put("/{order_id}")
-async def update_order(order_id: int, order_data: Dict[str, Any], authorization: str = Header(...)):
-    """Update order"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}",
-        method="PUT",
-        data=order_data,
-        headers=headers
-    )
-    return response
-
-@router.put("/{order_id}/status")
-async def update_order_status(order_id: int, status_data: Dict[str, str], authorization: str = Header(...)):
-    """Update order status"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}/status",
-        method="PUT",
-        data=status_data,
-        headers=headers
-    )
-    return response
-
-@router.post("/{order_id}/items")
-async def add_order_item(order_id: int, item_data: Dict[str, Any], authorization: str = Header(...)):
-    """Add item to order"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}/items",
-        method="POST",
-        data=item_data,
-        headers=headers
-    )
-    return response
-
-@router.put("/{order_id}/items/{item_id}")
-async def update_order_item(
-    order_id: int, 
-    item_id: int, 
-    item_data: Dict[str, Any], 
-    authorization: str = Header(...)
-):
-    """Update order item"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}/items/{item_id}",
-        method="PUT",
-        data=item_data,
-        headers=headers
-    )
-    return response
-
-@router.delete("/{order_id}/items/{item_id}")
-async def delete_order_item(order_id: int, item_id: int, authorization: str = Header(...)):
-    """Delete order item"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/{order_id}/items/{item_id}",
-        method="DELETE",
-        headers=headers
-    )
-    return response
-
-@router.get("/tables/available")
-async def get_available_tables(authorization: str = Header(...)):
-    """Get available tables"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path="/tables/available",
-        method="GET",
-        headers=headers
-    )
-    return response
-
-@router.put("/tables/{table_id}/reserve")
-async def reserve_table(table_id: int, authorization: str = Header(...)):
-    """Reserve a table"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/tables/{table_id}/reserve",
-        method="PUT",
-        headers=headers
-    )
-    return response
+@router.post("/batch")
+async def create_orders_batch(batch_data: Dict[str, Any], http_response: Response, authorization: str = Header(...),
+                              idempotency_key: Optional[str] = Header(None)):
+    """Create several orders in one transaction (Idempotency-Key as for create_order)"""
+    try:
+        # Forward to order service
+        response, status_code = await forward_request(
+            path="/orders/batch",
+            method="POST",
+            data=batch_data,
+            headers=idempotent_headers(authorization, idempotency_key),
+            client_response=http_response
+        )
 
-@router.get("/table/{table_id}")
-async def get_table_orders(table_id: int, authorization: str = Header(...)):
-    """Get all orders for a specific table"""
-    headers = {"Authorization": authorization}
-    response, status_code = await forward_request(
-        path=f"/orders/table/{table_id}",
-        method="GET",
-        headers=headers
-    )
-    return response
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
 
+        # order-service delivers the orders to the kitchen through its outbox
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 # <------------------------Payment endpoints------------------------>
 @router.post("/payments")
-async def process_payment(payment_data: Dict[str, Any], authorization: str = Header(...)):
-    """Process payment for a customer and return receipt"""
+async def process_payment(payment_data: Dict[str, Any], http_response: Response, authorization: str = Header(...),
+                          idempotency_key: Optional[str] = Header(None)):
+    """
+    Process payment for a customer and return receipt. The
+    Idempotency-Key is forwarded: order-service answers a retry with the
+    first payment, whose receipt is returned again
+    """
     headers = {"Authorization": authorization}
     try:
         # Validate required fields
@@ -265,7 +217,8 @@ async def process_payment(payment_data: Dict[str, Any], authorization: str = Hea
             path="/payments/",
             method="POST",
             data=payment_data,
-            headers=headers
+            headers=idempotent_headers(authorization, idempotency_key),
+            client_response=http_response
         )
         
         if status_code >= 400:
@@ -327,14 +280,17 @@ async def get_customer_payments(phone_number: str, authorization: str = Header(.
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/payments/history")
-async def get_paid_orders_history(authorization: str = Header(...)):
-    """Get all paid orders history"""
+async def get_paid_orders_history(http_response: Response, page: PageQuery = Depends(),
+                                  authorization: str = Header(...)):
+    """Get paid orders history, one page at a time"""
     headers = {"Authorization": authorization}
     try:
         response, status_code = await forward_request(
             path="/payments/history",
             method="GET",
-            headers=headers
+            headers=headers,
+            params=page.params(),
+            client_response=http_response
         )
         
         if status_code >= 400:
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Header
-from typing import Dict, Any, Literal
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from typing import Dict, Any, Literal, Optional
+from datetime import date
 import os
-from .order_routes import forward_request
+from .order_routes import forward_request, stream_request
+from pagination import PageQuery
 
 router = APIRouter()
 
 @router.get("/revenue/{time_range}")
-async def get_revenue(time_range: Literal["week", "month", "year"], authorization: str = Header(...)):
+async def get_revenue(time_range: Literal["day", "week", "month", "year"], authorization: str = Header(...)):
     """Get revenue data for the specified time range"""
     try:
         if not authorization:
@@ -63,8 +65,18 @@ async def get_total_sales(authorization: str = Header(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def statistics_params(start: Optional[date], end: Optional[date], exact: bool) -> Dict[str, Any]:
+    """Date range and exactness of a sketch-backed statistic"""
+    params: Dict[str, Any] = {"exact": "true"} if exact else {}
+    if start:
+        params["start"] = start.isoformat()
+    if end:
+        params["end"] = end.isoformat()
+    return params
+
 @router.get("/statistics/total-customers")
-async def get_total_customers(authorization: str = Header(...)):
+async def get_total_customers(start: Optional[date] = None, end: Optional[date] = None, exact: bool = False,
+                              authorization: str = Header(...)):
     """Get total number of unique customers based on phone numbers"""
     try:
         if not authorization:
@@ -76,7 +88,8 @@ async def get_total_customers(authorization: str = Header(...)):
         response, status_code = await forward_request(
             path=path,
             method="GET",
-            headers=headers
+            headers=headers,
+            params=statistics_params(start, end, exact)
         )
         
         if status_code >= 400:
@@ -113,6 +126,33 @@ async def get_total_orders(authorization: str = Header(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/statistics/top-foods")
+async def get_top_foods(start: Optional[date] = None, end: Optional[date] = None, exact: bool = False,
+                        authorization: str = Header(...)):
+    """Get the top 5 most ordered foods based on total quantity"""
+    try:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Authorization header is required")
+
+        headers = {"Authorization": authorization}
+        path = "/reports/statistics/top-foods"
+
+        response, status_code = await forward_request(
+            path=path,
+            method="GET",
+            headers=headers,
+            params=statistics_params(start, end, exact)
+        )
+
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
+
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/statistics/dashboard-summary")
 async def get_dashboard_summary(authorization: str = Header(...)):
     """Get complete dashboard summary including statistics and top foods"""
@@ -164,8 +204,9 @@ async def get_employee_summary(authorization: str = Header(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/payments/history")
-async def get_payment_history(authorization: str = Header(...)):
-    """Get all payment history"""
+async def get_payment_history(http_response: Response, page: PageQuery = Depends(),
+                              authorization: str = Header(...)):
+    """Get payment history, one page at a time"""
     try:
         if not authorization:
             raise HTTPException(status_code=401, detail="Authorization header is required")
@@ -176,7 +217,9 @@ async def get_payment_history(authorization: str = Header(...)):
         response, status_code = await forward_request(
             path=path,
             method="GET",
-            headers=headers
+            headers=headers,
+            params=page.params(),
+            client_response=http_response
         )
         
         if status_code >= 400:
@@ -261,4 +304,131 @@ async def get_customer_receipts(phone_number: str, authorization: str = Header(.
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/shift/{employee_id}")
+async def get_shift_receipts(employee_id: int, shift_date: Optional[date] = None,
+                             authorization: str = Header(...)):
+    """Get receipts created by an employee in their shift on a date (default today)"""
+    try:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Authorization header is required")
+
+        headers = {"Authorization": authorization}
+        path = f"/reports/receipts/shift/{employee_id}"
+
+        response, status_code = await forward_request(
+            path=path,
+            method="GET",
+            headers=headers,
+            params={"shift_date": shift_date.isoformat()} if shift_date else None
+        )
+
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
+
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/daily/{target_date}")
+async def get_daily_receipts(target_date: date, authorization: str = Header(...)):
+    """Get receipt summary for a specific date"""
+    try:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Authorization header is required")
+
+        headers = {"Authorization": authorization}
+        path = f"/reports/receipts/daily/{target_date.isoformat()}"
+
+        response, status_code = await forward_request(
+            path=path,
+            method="GET",
+            headers=headers
+        )
+
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
+
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/monthly/{year}/{month}")
+async def get_monthly_receipts(year: int, month: int, authorization: str = Header(...)):
+    """Get receipt summary for a specific month"""
+    try:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Authorization header is required")
+
+        headers = {"Authorization": authorization}
+        path = f"/reports/receipts/monthly/{year}/{month}"
+
+        response, status_code = await forward_request(
+            path=path,
+            method="GET",
+            headers=headers
+        )
+
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
+
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/yearly/{year}")
+async def get_yearly_receipts(year: int, authorization: str = Header(...)):
+    """Get receipt summary for a specific year"""
+    try:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Authorization header is required")
+
+        headers = {"Authorization": authorization}
+        path = f"/reports/receipts/yearly/{year}"
+
+        response, status_code = await forward_request(
+            path=path,
+            method="GET",
+            headers=headers
+        )
+
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=response)
+
+        return response
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/exports/{dataset}")
+async def export_dataset(
+    dataset: Literal["payments", "completed-orders", "completed-order-items"],
+    format: Literal["csv", "ndjson"] = "csv",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    authorization: str = Header(...)
+):
+    """Stream the completed order history as CSV or NDJSON"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header is required")
+
+    headers = {"Authorization": authorization}
+    params = {"format": format}
+    if since:
+        params["since"] = since
+    if until:
+        params["until"] = until
+
+    return await stream_request(
+        path=f"/exports/{dataset}",
+        headers=headers,
+        params=params
+    )
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 import httpx
 from typing import Optional, Dict, Any, List
 import os
 from pydantic import BaseModel
+from http_clients import get_client
+from coalescing import request_coalescer
+from pagination import PageQuery, copy_next_cursor
 
 router = APIRouter()
 
@@ -25,26 +28,25 @@ class UserCreate(BaseModel):
     shifts: str
 
 async def forward_request(path: str, method: str = "GET", data: dict = None, 
-                         headers: dict = None, params: dict = None):
+                         headers: dict = None, params: dict = None, client_response: Response = None):
     """Forward request to user service"""
-    user_service_url = os.getenv("USER_SERVICE_URL", "http://user-service:8001")
-    url = f"{user_service_url}{path}"
-    async with httpx.AsyncClient() as client:
-        try:
-            if method == "GET":
-                response = await client.get(url, headers=headers, params=params)
-            elif method == "POST":
-                response = await client.post(url, json=data, headers=headers)
-            elif method == "PUT":
-                response = await client.put(url, json=data, headers=headers)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers)
-            else:
-                raise HTTPException(status_code=405, detail="Method not allowed")
-                
-            return response.json(), response.status_code
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"User service unavailable: {str(e)}")
+    client = get_client("user")
+    try:
+        if method == "GET":
+            response = await request_coalescer.get("user", path, headers=headers, params=params)
+        elif method == "POST":
+            response = await client.post(path, json=data, headers=headers)
+        elif method == "PUT":
+            response = await client.put(path, json=data, headers=headers)
+        elif method == "DELETE":
+            response = await client.delete(path, headers=headers)
+        else:
+            raise HTTPException(status_code=405, detail="Method not allowed")
+            
+        copy_next_cursor(response, client_response)
+        return response.json(), response.status_code
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"User service unavailable: {str(e)}")
 
 @router.post("/login")
 async def login(login_data: LoginRequest):
@@ -91,13 +93,16 @@ async def register_user(user_data: UserCreate):
     return response
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_all_users(authorization: str = Header(...)):
-    """Get all users route forwarded to user service"""
+async def get_all_users(http_response: Response, page: PageQuery = Depends(),
+                        authorization: str = Header(...)):
+    """Get users route forwarded to user service, one page at a time"""
     headers = {"Authorization": authorization}
     response, status_code = await forward_request(
         path="/auth/users", 
         method="GET",
-        headers=headers
+        headers=headers,
+        params=page.params(),
+        client_response=http_response
     )
     
     if status_code >= 400:
@@ -0,0 +1,179 @@
+"""
+Socket.IO fan-out load test for the API gateway.
+
+Connects simulated clients (kitchen, waiters following a table, managers)
+with signed tokens, has one client emit order and table updates at a
+fixed rate, and reports how long deliveries took and how many payload
+bytes the gateway sent.
+
+Needs the asyncio client extra (pip install "python-socketio[asyncio_client]")
+and a gateway running with the same JWT_SECRET:
+    python socket_load_test.py --url http://localhost:8000 --clients 500
+
+With --compare it starts the gateway itself (uvicorn main:socket_app on --port)
+once per mode in GATEWAY_MODES and prints the figures side by side:
+    python socket_load_test.py --compare --clients 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+import httpx
+from jose import jwt
+import socketio
+import auth
+
+# Share of clients per role; waiters also follow one table each
+ROLE_MIX = [("kitchen", 0.1), ("manager", 0.05), ("waiter", 0.85)]
+
+# Order statuses emitted by the kitchen, in order
+ORDER_STATUSES = ["preparing", "ready_to_serve", "completed"]
+
+# Gateway settings compared by --compare: the old broadcast to every
+# client, role/table rooms emitted immediately, and rooms with batching
+GATEWAY_MODES = [
+    ("broadcast", {"SOCKET_ROOMS_ENABLED": "false"}),
+    ("rooms", {"SOCKET_ROOMS_ENABLED": "true", "SOCKET_FLUSH_INTERVAL": "0"}),
+    ("rooms+batches", {"SOCKET_ROOMS_ENABLED": "true", "SOCKET_FLUSH_INTERVAL": "0.05"}),
+]
+
+def make_token(role: str, index: int) -> str:
+    payload = {"sub": f"load-{role}-{index}", "role": role, "exp": datetime.utcnow() + timedelta(hours=1)}
+    return jwt.encode(payload, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.deliveries = 0
+        self.batches = 0
+        self.payload_bytes = 0
+
+    def received(self, event: str, data):
+        self.payload_bytes += len(json.dumps([event, data]))
+        if isinstance(data, dict) and "sent_at" in data:
+            self.latencies.append((time.time() - data["sent_at"]) * 1000)
+        self.deliveries += 1
+
+async def connect_client(url: str, role: str, index: int, tables: int, stats: Stats) -> socketio.AsyncClient:
+    client = socketio.AsyncClient(reconnection=False)
+
+    for event in ("order_update", "table_update"):
+        client.on(event, lambda data, event=event: stats.received(event, data))
+
+    @client.on("batch")
+    def batch(events):
+        stats.batches += 1
+        for item in events:
+            stats.received(item["event"], item["data"])
+
+    await client.connect(url, auth={"token": make_token(role, index)}, transports=["websocket"])
+    if role == "waiter":
+        await client.call("join_table", {"table_id": index % tables + 1})
+    return client
+
+async def run(args) -> dict:
+    stats = Stats()
+    roles = [role for role, share in ROLE_MIX for _ in range(round(args.clients * share))]
+    semaphore = asyncio.Semaphore(50)
+
+    async def connect(index, role):
+        async with semaphore:
+            return await connect_client(args.url, role, index, args.tables, stats)
+
+    started = time.perf_counter()
+    clients = await asyncio.gather(*(connect(i, role) for i, role in enumerate(roles)))
+    print(f"Connected {len(clients)} clients in {time.perf_counter() - started:.1f}s")
+
+    # A separate kitchen client emits, so every listener counts
+    emitter = socketio.AsyncClient(reconnection=False)
+    await emitter.connect(args.url, auth={"token": make_token("kitchen", -1)}, transports=["websocket"])
+
+    interval = 1 / args.rate
+    started = time.perf_counter()
+    for i in range(args.events):
+        table_id = i % args.tables + 1
+        if i % 2:
+            await emitter.emit("table_update", {
+                "table_id": table_id, "status": "occupied",
+                "timestamp": datetime.now().isoformat(), "sent_at": time.time()
+            })
+        else:
+            await emitter.emit("order_update", {
+                "order_id": i // 2 % (args.tables * 3), "table_id": table_id,
+                "status": ORDER_STATUSES[i // 2 % len(ORDER_STATUSES)], "sent_at": time.time()
+            })
+        await asyncio.sleep(interval)
+    elapsed = time.perf_counter() - started
+
+    # Let the last flushes arrive
+    await asyncio.sleep(1)
+    for client in clients + [emitter]:
+        await client.disconnect()
+
+    latencies = sorted(stats.latencies) or [0.0]
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"Emitted {args.events} events in {elapsed:.1f}s to {len(clients)} clients")
+    print(f"Deliveries: {stats.deliveries} in {stats.batches} batches "
+          f"({stats.deliveries / args.events:.1f} clients per event)")
+    print(f"Latency ms: p50 {statistics.median(latencies):.1f}, p95 {percentile(0.95):.1f}, "
+          f"p99 {percentile(0.99):.1f}, max {latencies[-1]:.1f}")
+    print(f"Payload bytes sent: {stats.payload_bytes} ({stats.payload_bytes / args.events:.0f} per event emitted)")
+    return {
+        "deliveries_per_event": stats.deliveries / args.events, "messages": stats.batches or stats.deliveries,
+        "payload_mb": stats.payload_bytes / 1e6, "p50": statistics.median(latencies),
+        "p99": percentile(0.99), "emit_seconds": elapsed
+    }
+
+async def start_gateway(port: int, settings: dict) -> subprocess.Popen:
+    """Run the gateway from this directory with the given environment, once it answers"""
+    gateway = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:socket_app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, **settings},
+        stdout=subprocess.DEVNULL
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(f"http://localhost:{port}/api/metrics")
+                return gateway
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    gateway.terminate()
+    raise RuntimeError("Gateway did not start")
+
+async def compare(args):
+    args.url = f"http://localhost:{args.port}"
+    results = []
+    for mode, settings in GATEWAY_MODES:
+        print(f"--- {mode}: {settings}")
+        gateway = await start_gateway(args.port, settings)
+        try:
+            results.append((mode, await run(args)))
+        finally:
+            gateway.terminate()
+            gateway.wait()
+
+    print(f"\n{args.clients} clients, {args.events} events at {args.rate:g}/s")
+    print(f"{'mode':<14} {'deliv/event':>11} {'messages':>9} {'payload MB':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'emit s':>7}")
+    for mode, result in results:
+        print(f"{mode:<14} {result['deliveries_per_event']:>11.1f} {result['messages']:>9} "
+              f"{result['payload_mb']:>10.1f} {result['p50']:>8.0f} {result['p99']:>8.0f} "
+              f"{result['emit_seconds']:>7.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Socket.IO fan-out load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=100, help="events emitted per second")
+    parser.add_argument("--compare", action="store_true", help="start the gateway in each of GATEWAY_MODES")
+    parser.add_argument("--port", type=int, default=8765, help="gateway port with --compare")
+    args = parser.parse_args()
+    asyncio.run(compare(args) if args.compare else run(args))
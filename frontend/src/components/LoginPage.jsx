@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, Link, useLocation } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../services/pagination';
 import '../styles/LoginPage.css';
 
 const LoginPage = () => {
@@ -31,7 +32,7 @@ const LoginPage = () => {
             
             // Check if user exists first
             try {
-                const checkUserResponse = await axios.get('/api/users/users');
+                const checkUserResponse = await getAllPages('/api/users/users');
                 const userExists = checkUserResponse.data.some(user => user.mail === loginData.mail);
                 if (!userExists) {
                     setError('Account does not exist. Please contact manager.');
@@ -46,7 +47,7 @@ const LoginPage = () => {
             const { access_token } = response.data;
             
             // Get user info with the new token
-            const userInfoResponse = await axios.get('/api/users/users', {
+            const userInfoResponse = await getAllPages('/api/users/users', {
                 headers: {
                     'Authorization': `Bearer ${access_token}`
                 }
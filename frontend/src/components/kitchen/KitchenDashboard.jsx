@@ -4,6 +4,7 @@ import { socketService } from '../../services/socketService';
 import MenuManagement from './MenuManagement';
 import OrderQueue from './OrderQueue';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import { useNavigate } from 'react-router-dom';
 import '../../styles/KitchenStyles.css'; // Updated path to styles folder
 
@@ -63,7 +64,7 @@ const KitchenDashboard = () => {
     const fetchMenu = async () => {
         try {
             const token = sessionStorage.getItem('token');
-            const response = await axios.get('/api/kitchen/menu', {
+            const response = await getAllPages('/api/kitchen/menu', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
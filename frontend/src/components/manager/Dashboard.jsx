@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Container, Row, Col, Card, ButtonGroup, Button, Table, Form, InputGroup, Modal } from 'react-bootstrap';
 import { Line, Pie } from 'react-chartjs-2';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import { API_ENDPOINTS, STORAGE_KEYS } from '../../constants';
 import { FaChartLine, FaUsers, FaShoppingCart, FaUserTie, FaHistory, FaSearch, FaSort, FaReceipt } from 'react-icons/fa';
 import {
@@ -37,7 +38,7 @@ let userDataCache = new Map();
 const fetchMenuItems = async () => {
     try {
         const token = sessionStorage.getItem(STORAGE_KEYS.TOKEN);
-        const response = await axios.get(`/api/kitchen/menu`, {
+        const response = await getAllPages(`/api/kitchen/menu`, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -194,7 +195,7 @@ const Dashboard = () => {
                 throw new Error('No authentication token found');
             }
 
-            const response = await axios.get('/api/users/users', {
+            const response = await getAllPages('/api/users/users', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
@@ -238,7 +239,7 @@ const Dashboard = () => {
                 ? `${API_ENDPOINTS.REPORTS}/payments/customer/${phoneNumber}`
                 : `${API_ENDPOINTS.REPORTS}/payments/history`;
 
-            const response = await axios.get(endpoint, {
+            const response = await getAllPages(endpoint, {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
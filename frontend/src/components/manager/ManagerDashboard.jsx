@@ -6,6 +6,7 @@ import ActiveOrders from '../waiter/ActiveOrders';
 import Dashboard from './Dashboard';
 import AddFoodForm from './AddFoodForm';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import styles from '../../styles/ManagerDashboard.module.css'; // 
 import { FaUsers, FaHome, FaChartBar, FaClipboardList, FaSignOutAlt, FaTools, FaUtensils, FaPlusCircle } from 'react-icons/fa';
 import '../../styles/UserList.css';
@@ -72,7 +73,7 @@ const ManagerDashboard = () => {
                 return;
             }
 
-            const response = await axios.get('/api/users/users', {
+            const response = await getAllPages('/api/users/users', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
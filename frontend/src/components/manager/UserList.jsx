@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { Table, Container, Button, Modal, Form, Alert, Badge } from 'react-bootstrap';
 import { FaUserPlus, FaEdit, FaTrash, FaUser, FaClock, FaEnvelope } from 'react-icons/fa';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import '../../styles/UserList.css';
 
 const ROLES = ['waiter', 'kitchen', 'manager'];
@@ -103,7 +104,7 @@ const UserList = () => {
                 return;
             }
 
-            const response = await axios.get('/api/users/users', {
+            const response = await getAllPages('/api/users/users', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
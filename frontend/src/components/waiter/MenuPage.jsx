@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Container, Row, Col, Card, Button, ListGroup, Modal, Badge, Form, Nav } from 'react-bootstrap';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import { BsCart3 } from 'react-icons/bs';
 import { socketService } from '../../services/socketService';
 import '../../styles/MenuPage.css';
@@ -43,7 +44,7 @@ const MenuPage = () => {
     const fetchMenuItems = async () => {
         try {
             const token = sessionStorage.getItem('token');
-            const response = await axios.get('/api/kitchen/menu', {
+            const response = await getAllPages('/api/kitchen/menu', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
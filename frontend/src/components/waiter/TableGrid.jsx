@@ -4,6 +4,7 @@ import '../../styles/TableGrid.css';
 import { Card, Button, Badge, Modal, Form, ListGroup } from 'react-bootstrap';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../../services/pagination';
 import { useState, useEffect } from 'react';
 
 const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) => {
@@ -21,7 +22,7 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
     const fetchMenuItems = async () => {
         try {
             const token = sessionStorage.getItem('token');
-            const response = await axios.get('/api/kitchen/menu', {
+            const response = await getAllPages('/api/kitchen/menu', {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
@@ -40,7 +41,7 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
             const token = sessionStorage.getItem('token');
             console.log('Fetching orders for table:', tableId);
             
-            const response = await axios.get(`/api/orders/table/${tableId}`, {
+            const response = await getAllPages(`/api/orders/table/${tableId}`, {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
@@ -153,6 +154,8 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
         phone: ''
     });
     const [receipt, setReceipt] = useState(null);
+    // One key per payment attempt, reused when the waiter retries it
+    const [paymentKey, setPaymentKey] = useState(null);
 
     const getStatusBadge = (status) => {
         const variants = {
@@ -190,6 +193,7 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
     };
 
     const handleMakePayment = () => {
+        setPaymentKey(crypto.randomUUID());
         setShowModal(false);
         setShowPaymentModal(true);
     };
@@ -208,7 +212,8 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
                 {
                     headers: {
                         'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': paymentKey
                     }
                 }
             );
@@ -237,7 +242,7 @@ const TableGrid = ({ tables, onTableSelect, onTableStatusChange, userName }) =>
             const token = sessionStorage.getItem('token');
             
             // Get current orders for the table
-            const response = await axios.get(`/api/orders/table/${selectedTable.id}`, {
+            const response = await getAllPages(`/api/orders/table/${selectedTable.id}`, {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
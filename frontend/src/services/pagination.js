@@ -0,0 +1,19 @@
+import axios from 'axios';
+
+// Header carrying the cursor of the next page of a paginated list
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+
+// GET a paginated list endpoint and follow the X-Next-Cursor header until
+// the last page. Resolves to the first page's response with the rows of
+// every page in response.data, so callers can use it like axios.get
+export const getAllPages = async (url, config = {}) => {
+    const first = await axios.get(url, config);
+    let rows = first.data;
+    let cursor = first.headers[NEXT_CURSOR_HEADER];
+    while (cursor) {
+        const page = await axios.get(url, { ...config, params: { ...config.params, cursor } });
+        rows = rows.concat(page.data);
+        cursor = page.headers[NEXT_CURSOR_HEADER];
+    }
+    return { ...first, data: rows };
+};
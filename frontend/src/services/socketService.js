@@ -23,9 +23,9 @@ const getSocketUrl = () => {
 };
 
 const socket = io(getSocketUrl(), {
-    auth: {
-        token: getToken()
-    },
+    // Read the token on every (re)connect; the gateway puts the connection
+    // in its role's rooms (kitchen, waiters, manager) after verifying it
+    auth: (cb) => cb({ token: getToken() }),
     path: '/socket.io',
     reconnection: true,
     reconnectionAttempts: 10,
@@ -60,10 +60,25 @@ socket.on('reconnect', (attemptNumber) => {
     console.log(`Socket.IO reconnected after ${attemptNumber} attempts`);
     socketConnected = true;
     
-    // Update auth token on reconnection
-    socket.auth = { token: getToken() };
 });
 
+// The gateway buffers events and sends them as one 'batch' per flush:
+// hand each event to the listeners of its own name
+socket.on('batch', (events) => {
+    events.forEach(({ event, data }) => {
+        socket.listeners(event).forEach((listener) => listener(data));
+    });
+});
+
+// Join the role rooms with the current token (e.g. after logging in
+// without reconnecting)
+const authenticate = () => {
+    const token = getToken();
+    if (token) {
+        socket.emit('authenticate', { token });
+    }
+};
+
 socket.on('reconnect_error', (error) => {
     console.error('Socket.IO reconnection error:', error.message);
 });
@@ -76,13 +91,25 @@ export const socketService = {
     // Reconnect socket manually
     reconnect: () => {
         if (!socketConnected) {
-            socket.auth = { token: getToken() };
             socket.connect();
         }
     },
+
+    // Join the rooms of the logged-in user's role
+    authenticate,
+
+    // Receive updates of one table (orders and status)
+    joinTable: (tableId) => {
+        socket.emit('join_table', { table_id: tableId });
+    },
+
+    leaveTable: (tableId) => {
+        socket.emit('leave_table', { table_id: tableId });
+    },
     
     // Subscribe to order updates
     subscribeToOrders: (callback) => {
+        authenticate();
         socket.on('order_update', callback);
     },
     
@@ -93,6 +120,7 @@ export const socketService = {
 
     // Subscribe to table updates
     subscribeToTableUpdates: (callback) => {
+        authenticate();
         socket.on('table_update', callback);
     },
 
@@ -103,6 +131,7 @@ export const socketService = {
     
     // Subscribe to menu updates
     subscribeToMenuUpdates: (callback) => {
+        authenticate();
         socket.on('menu_update', callback);
     },
 
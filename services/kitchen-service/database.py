@@ -1,5 +1,8 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+import asyncio
+import threading
 import time
 import os
 
@@ -11,76 +14,207 @@ DB_NAME = os.getenv("DB_NAME", "KitchenServices")
 MAX_RETRIES = 5
 RETRY_DELAY = 5  # seconds
 
+# Health monitoring configuration: the driver sends heartbeats in the background.
+# The connection is healthy while a primary or secondary answers them; a server
+# counts as gone after several consecutive failed heartbeats, and we only
+# rebuild the client once every server that could serve reads is gone
+HEARTBEAT_FREQUENCY_MS = int(os.getenv("MONGO_HEARTBEAT_FREQUENCY_MS", "10000"))
+RECONNECT_AFTER_FAILED_HEARTBEATS = int(os.getenv("MONGO_RECONNECT_AFTER_FAILED_HEARTBEATS", "3"))
+
+# Connection pool configuration
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+
 # Global variables
 client = None
 db = None
+_reconnect_lock = None
+_watchdog_task = None
 
-def init_db():
-    """Initialize database connection with retry logic"""
-    global client, db
-    
+# Connection metrics
+connection_metrics = {
+    "connects": 0,
+    "reconnects": 0,
+    "heartbeats_succeeded": 0,
+    "heartbeats_failed": 0,
+    "heartbeat_failures_by_server": {},  # consecutive failures per server
+    "readable_servers": [],
+    "last_heartbeat_at": None,
+    "last_heartbeat_error": None
+}
+
+class HeartbeatMonitor(monitoring.ServerHeartbeatListener):
+    """
+    Track the driver's background server heartbeats. The driver runs one
+    monitor per server, so each server has its own consecutive failure
+    count, and whether it last answered as a readable member (primary or
+    secondary). One unreachable secondary does not make the connection
+    unhealthy while the primary answers
+    """
+
+    def __init__(self):
+        self.consecutive_failures = {}
+        self.readable = {}
+        # Heartbeats are reported from the driver's monitor threads
+        self._lock = threading.Lock()
+
+    def _readable_servers(self):
+        return sorted(
+            server for server, readable in self.readable.items()
+            if readable and self.consecutive_failures[server] < RECONNECT_AFTER_FAILED_HEARTBEATS
+        )
+
+    def _update(self, event, readable=None):
+        """Record a heartbeat: readable is None for a failure, else what the server answered"""
+        server = "%s:%s" % event.connection_id
+        with self._lock:
+            if readable is None:
+                self.consecutive_failures[server] = self.consecutive_failures.get(server, 0) + 1
+                self.readable.setdefault(server, False)
+            else:
+                self.consecutive_failures[server] = 0
+                self.readable[server] = readable
+            connection_metrics["heartbeat_failures_by_server"] = dict(self.consecutive_failures)
+            connection_metrics["readable_servers"] = self._readable_servers()
+
+    def has_readable_server(self) -> bool:
+        """Whether a primary or secondary is reachable (true before the first heartbeat)"""
+        with self._lock:
+            return not self.readable or bool(self._readable_servers())
+
+    def reset(self):
+        """Forget the servers of a replaced client"""
+        with self._lock:
+            self.consecutive_failures.clear()
+            self.readable.clear()
+            connection_metrics["heartbeat_failures_by_server"] = {}
+            connection_metrics["readable_servers"] = []
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        connection_metrics["heartbeats_succeeded"] += 1
+        connection_metrics["last_heartbeat_at"] = time.time()
+        self._update(event, readable=event.reply.is_readable)
+
+    def failed(self, event):
+        connection_metrics["heartbeats_failed"] += 1
+        connection_metrics["last_heartbeat_error"] = str(event.reply)
+        self._update(event)
+
+heartbeat_monitor = HeartbeatMonitor()
+
+async def connect():
+    """Open a new client with retry logic; returns (client, db) without replacing the current ones"""
     retries = 0
     while retries < MAX_RETRIES:
+        new_client = None
         try:
             print(f"Attempting to connect to MongoDB Atlas (attempt {retries + 1}/{MAX_RETRIES})...")
             print(f"Using connection string: {MONGODB_URL}")
             print(f"Database name: {DB_NAME}")
-            
-            # Create a MongoDB client
-            client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=5000)
-            
+
+            # Create an async MongoDB client (pooled, monitored by background heartbeats)
+            new_client = AsyncIOMotorClient(
+                MONGODB_URL,
+                serverSelectionTimeoutMS=5000,
+                heartbeatFrequencyMS=HEARTBEAT_FREQUENCY_MS,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                event_listeners=[heartbeat_monitor]
+            )
+
             # Test the connection by sending a ping
-            client.admin.command('ping')
+            await new_client.admin.command('ping')
             print("✅ Successfully pinged MongoDB Atlas")
-            
+
             # Connect to the specific database
-            db = client[DB_NAME]
+            new_db = new_client[DB_NAME]
             print(f"✅ Successfully connected to database: {DB_NAME}")
-            
+
             # Verify the database connection by accessing a collection
-            collections = db.list_collection_names()
+            collections = await new_db.list_collection_names()
             print(f"✅ Available collections: {collections}")
-            
-            return True
-        
+
+            connection_metrics["connects"] += 1
+            return new_client, new_db
+
         except Exception as e:
+            if new_client is not None:
+                new_client.close()
             retries += 1
             remaining = MAX_RETRIES - retries
-            
+
             if remaining > 0:
                 print(f"❌ MongoDB connection attempt {retries} failed: {str(e)}")
                 print(f"Retrying in {RETRY_DELAY} seconds... ({remaining} attempts remaining)")
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
             else:
                 print(f"❌ Failed to connect to MongoDB after {MAX_RETRIES} attempts")
                 print(f"Error: {str(e)}")
                 raise Exception(f"Failed to connect to MongoDB: {str(e)}")
 
+def _swap(new_client, new_db):
+    """Switch requests to the new client, then close the old one"""
+    global client, db
+    old_client = client
+    client, db = new_client, new_db
+    heartbeat_monitor.reset()
+    if old_client is not None:
+        old_client.close()
+
+async def init_db():
+    """Initialize database connection with retry logic"""
+    _swap(*await connect())
+    return True
+
 def get_connection_status():
-    """Check if the MongoDB connection is active"""
+    """Check if the MongoDB connection is healthy: a primary or secondary answers heartbeats"""
     if client is None or db is None:
         return False
-    
-    try:
-        # Test the connection by sending a ping
-        client.admin.command('ping')
-        return True
-    except Exception as e:
-        print(f"Connection check failed: {str(e)}")
-        return False
+    return heartbeat_monitor.has_readable_server()
 
-def ensure_db_connection():
-    """Ensure database connection is active, reconnect if necessary"""
-    if not get_connection_status():
+async def ping_database():
+    """Send an explicit ping (for health checks only, not per operation)"""
+    await client.admin.command('ping')
+
+async def reconnect():
+    """Replace the client once no server that can serve reads answers heartbeats"""
+    global _reconnect_lock
+    if _reconnect_lock is None:
+        _reconnect_lock = asyncio.Lock()
+    async with _reconnect_lock:
+        # Another task may have already reconnected
+        if get_connection_status():
+            return
         print("⚠️ Database connection lost, attempting to reconnect...")
-        init_db()
-    
+        # The current client keeps serving (and may recover) until the new one is ready
+        _swap(*await connect())
+        connection_metrics["reconnects"] += 1
+
+async def ensure_db_connection():
+    """Ensure a database client exists, reconnecting only on actual failure"""
+    if client is None or db is None or not get_connection_status():
+        await reconnect()
+
     if db is None:
         raise Exception("Database connection is not initialized")
 
-# Initialize the database connection when the module is imported
-try:
-    init_db()
-except Exception as e:
-    print(f"❌ Failed to initialize database during module import: {str(e)}")
-    raise
+async def _watchdog(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await ensure_db_connection()
+        except Exception as e:
+            print(f"❌ Database reconnect failed: {str(e)}")
+
+def start_connection_watchdog():
+    """Check heartbeat state in the background and reconnect on failure"""
+    global _watchdog_task
+    if _watchdog_task is None:
+        _watchdog_task = asyncio.create_task(_watchdog(HEARTBEAT_FREQUENCY_MS / 1000))
+
+def get_database():
+    """Get the active database handle (no network round trip)"""
+    if db is None:
+        raise Exception("Database connection is not initialized")
+    return db
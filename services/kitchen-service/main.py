@@ -1,8 +1,11 @@
 import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_db, get_connection_status, ensure_db_connection
+from database import init_db, get_connection_status, ensure_db_connection, ping_database, connection_metrics, start_connection_watchdog
 from routers import menu, kitchen
+from services.menu_cache import menu_cache
+from services.order_client import order_client
+from services.kitchen_service import KitchenService
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,21 +27,37 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     try:
-        ensure_db_connection()
+        await init_db()
         print("✅ Database connection initialized successfully")
+        start_connection_watchdog()
+        await KitchenService.ensure_indexes()
+        menu_cache.start_change_stream()
     except Exception as e:
         print(f"❌ Failed to initialize database: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await order_client.close()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     try:
-        ensure_db_connection()
+        await ensure_db_connection()
+        await ping_database()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Database connection is not available: {str(e)}")
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "menu_cache": menu_cache.stats(),
+        "database": {**connection_metrics, "healthy": get_connection_status()},
+        "order_service": order_client.stats()
+    }
+
 # Đăng ký routers
 app.include_router(menu.router, prefix="/menu", tags=["Menu"])
 app.include_router(kitchen.router, prefix="/kitchen_orders", tags=["Kitchen Orders"])
@@ -1,6 +1,6 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
-from database import db, ensure_db_connection
+import database
 from enum import Enum
 
 # === Food Menu Models ===
@@ -51,6 +51,24 @@ class KitchenOrder(BaseModel):
     priority: Optional[str] = "normal"
     status: OrderStatus = OrderStatus.PENDING
 
+class DeliveredOrderItem(BaseModel):
+    item_id: str
+    quantity: int
+    notes: Optional[str] = None
+
+class OrderCreatedEvent(BaseModel):
+    """Đơn hàng mới do order-service gửi qua outbox"""
+    idempotency_key: str
+    order_id: str
+    table_id: Optional[str] = None
+    items: List[DeliveredOrderItem]
+    priority: Optional[str] = "normal"
+    status: OrderStatus = OrderStatus.PENDING
+    created_at: Optional[str] = None
+
+class OrderCreatedBatch(BaseModel):
+    events: List[OrderCreatedEvent]
+
 class OrderStatusUpdate(BaseModel):
     status: OrderStatus
 
@@ -60,20 +78,14 @@ class OrderServeUpdate(BaseModel):
 # Functions to get database collections
 def get_food_menu():
     try:
-        ensure_db_connection()
-        if db is None:
-            raise Exception("Database connection is not initialized")
-        return db["food_menu"]
+        return database.get_database()["food_menu"]
     except Exception as e:
         print(f"Error accessing food_menu collection: {str(e)}")
         raise
 
 def get_kitchen_orders():
     try:
-        ensure_db_connection()
-        if db is None:
-            raise Exception("Database connection is not initialized")
-        return db["kitchen_orders"]
+        return database.get_database()["kitchen_orders"]
     except Exception as e:
         print(f"Error accessing kitchen_orders collection: {str(e)}")
         raise
@@ -0,0 +1,137 @@
+"""
+Concurrency benchmark for kitchen-service's MongoDB access.
+
+Has --clients concurrent clients call the PATCH /menu/{food_id}/availability
+handler on one event loop, as uvicorn would, for --seconds, twice:
+
+- before: the route as it was before the motor client, an async def
+  handler running the synchronous pymongo calls (find_one, update_one),
+  which block the event loop for every round trip
+- after: the current route, MenuService awaiting motor
+
+and reports requests per second and latency percentiles for each.
+
+The database is mongomock (an in-memory MongoDB); each operation first
+waits --latency-ms to stand in for the round trip to Atlas, with
+time.sleep for the synchronous driver and asyncio.sleep for motor:
+    pip install -r requirements-test.txt
+    python mongo_benchmark.py --clients 200 --latency-ms 10
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict
+from fastapi import HTTPException
+import mongomock
+from mongomock_motor import AsyncMongoMockClient
+import database
+from models import FoodStatusUpdate
+from routers import menu
+from services.menu_cache import menu_cache
+
+FOODS = 50
+
+# menu_service turns on DEBUG logging; per-request log lines would dominate the timings
+logging.getLogger().setLevel(logging.WARNING)
+
+class BlockingCollection:
+    """A synchronous collection whose operations take one round trip"""
+
+    def __init__(self, collection, latency: float):
+        self.collection = collection
+        self.latency = latency
+
+    def find_one(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.find_one(*args, **kwargs)
+
+    def update_one(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.update_one(*args, **kwargs)
+
+class AwaitingCollection:
+    """An async (motor) collection whose operations take one round trip"""
+
+    def __init__(self, collection, latency: float):
+        self.collection = collection
+        self.latency = latency
+
+    async def find_one(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await self.collection.find_one(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await self.collection.update_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+class AwaitingDatabase:
+    def __init__(self, db, latency: float):
+        self.db = db
+        self.latency = latency
+
+    def __getitem__(self, name):
+        return AwaitingCollection(self.db[name], self.latency)
+
+def food(n: int) -> Dict:
+    return {"food_id": f"food-{n}", "name": f"Food {n}", "quantity": 10, "availability": True,
+            "image": "", "note": "", "category": "Meat", "price": 50000}
+
+def blocking_handler(food_menu: BlockingCollection):
+    """The availability route before the motor client"""
+    async def change_menu_availability(food_id: str, update_data: FoodStatusUpdate):
+        food = food_menu.find_one({"food_id": food_id})
+        if not food:
+            raise HTTPException(status_code=404, detail=f"Không tìm thấy món ăn với food_id: {food_id}")
+        food_menu.update_one({"food_id": food_id}, {"$set": {"availability": update_data.availability}})
+        menu_cache.invalidate()
+        status = "có sẵn" if update_data.availability else "hết hàng"
+        return {"message": f"Đã cập nhật món ăn {food['name']} thành {status}"}
+
+    return change_menu_availability
+
+async def measure(name: str, handler, clients: int, seconds: float):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def one_client(index: int):
+        n = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            # A new request waits for the event loop like one arriving at the server
+            await asyncio.sleep(0)
+            await handler(f"food-{(index + n) % FOODS}", FoodStatusUpdate(availability=n % 2 == 0))
+            latencies.append((time.perf_counter() - started) * 1000)
+            n += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"{name:<7} {len(latencies) / elapsed:8.0f} req/s   latency ms: p50 {statistics.median(latencies):.1f}, "
+          f"p95 {percentile(0.95):.1f}, p99 {percentile(0.99):.1f}, max {latencies[-1]:.1f}")
+
+async def run(args):
+    latency = args.latency_ms / 1000
+    sync_menu = mongomock.MongoClient()[database.DB_NAME]["food_menu"]
+    sync_menu.insert_many([food(n) for n in range(FOODS)])
+    async_db = AsyncMongoMockClient()[database.DB_NAME]
+    await async_db["food_menu"].insert_many([food(n) for n in range(FOODS)])
+    database.db = AwaitingDatabase(async_db, latency)
+
+    print(f"{args.clients} clients for {args.seconds:g}s each, {args.latency_ms:g} ms per MongoDB round trip")
+    await measure("before", blocking_handler(BlockingCollection(sync_menu, latency)), args.clients, args.seconds)
+    await measure("after", menu.change_menu_availability, args.clients, args.seconds)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kitchen-service MongoDB concurrency benchmark")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, default=10, help="simulated MongoDB round trip")
+    asyncio.run(run(parser.parse_args()))
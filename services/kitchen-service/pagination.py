@@ -0,0 +1,64 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Query, Response
+
+# Menu lists are small and cached in memory, so pages can be large
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
+class PageParams:
+    """
+    Tham số phân trang (dùng với Depends()). Khi còn trang tiếp theo,
+    header X-Next-Cursor chứa cursor cần truyền lại qua ?cursor=
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+    def as_params(self) -> Dict[str, Any]:
+        params = {"limit": self.limit}
+        if self.cursor:
+            params["cursor"] = self.cursor
+        return params
+
+def paginate_items(items: List[Dict[str, Any]], page: PageParams,
+                   key: Callable[[Dict[str, Any]], Tuple]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Slice an in-memory list already sorted by `key` (ascending). Returns the
+    page and the cursor of the next page
+    """
+    start = 0
+    if page.cursor:
+        last = tuple(decode_cursor(page.cursor))
+        start = next((i for i, item in enumerate(items) if key(item) > last), len(items))
+
+    rows = items[start:start + page.limit]
+    next_cursor = None
+    if start + page.limit < len(items):
+        next_cursor = encode_cursor(list(key(rows[-1])))
+    return rows, next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
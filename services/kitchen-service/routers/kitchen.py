@@ -1,24 +1,27 @@
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-import requests
-import os
+from typing import Dict, Any, List, Optional
+import httpx
 from datetime import datetime
+from services.order_client import order_client
+from services.kitchen_service import KitchenService
+from models import OrderCreatedBatch
 
 router = APIRouter()
 
-# Order service URL from environment variable or default
-ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://order-service:8002")
-
 @router.get("/", response_model=List[Dict[str, Any]])
-async def get_all_kitchen_orders():
+async def get_all_kitchen_orders(
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
     """
-    Proxy endpoint to get all orders from order service
+    Proxy endpoint to get active orders from order service (all of them;
+    since and until are passed through)
     """
+    params = {name: value for name, value in {"since": since, "until": until}.items() if value is not None}
     try:
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders/active")
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        upstream = await order_client.get("/api/orders/active", route="/api/orders/active", params=params)
+        return upstream.json()
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
 @router.post("/", response_model=Dict[str, Any])
@@ -27,11 +30,11 @@ async def create_kitchen_order(order: Dict[str, Any]):
     Proxy endpoint to forward new orders to order service
     """
     try:
-        response = requests.post(
-            f"{ORDER_SERVICE_URL}/api/orders",
+        response = await order_client.post(
+            "/api/orders",
+            route="/api/orders",
             json=order
         )
-        response.raise_for_status()
         
         # Add real-time notification information
         result = response.json()
@@ -42,22 +45,30 @@ async def create_kitchen_order(order: Dict[str, Any]):
         }
         
         return result
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
+@router.post("/batch", response_model=Dict[str, int])
+async def receive_order_batch(batch: OrderCreatedBatch):
+    """
+    New orders delivered by the order-service outbox. Safe to retry:
+    orders whose idempotency_key was already received are skipped
+    """
+    return await KitchenService.add_delivered_orders(batch.events)
+
 @router.put("/{order_id}", response_model=Dict[str, str])
 async def update_order_status(order_id: str, update_data: Dict[str, str]):
     """
     Proxy endpoint to forward order status updates to order service
     """
     try:
-        response = requests.put(
-            f"{ORDER_SERVICE_URL}/api/orders/{order_id}/status",
+        response = await order_client.put(
+            f"/api/orders/{order_id}/status",
+            route="/api/orders/{order_id}/status",
             json=update_data
         )
-        response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
 @router.patch("/{order_id}/serve", response_model=Dict[str, Any])
@@ -66,13 +77,13 @@ async def mark_items_served(order_id: str, update_data: Dict[str, Any]):
     Proxy endpoint to forward serve updates to order service
     """
     try:
-        response = requests.patch(
-            f"{ORDER_SERVICE_URL}/api/orders/{order_id}/serve",
+        response = await order_client.patch(
+            f"/api/orders/{order_id}/serve",
+            route="/api/orders/{order_id}/serve",
             json=update_data
         )
-        response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
 
@@ -82,10 +93,9 @@ async def get_ready_to_serve_orders():
     Proxy endpoint to get ready-to-serve orders from order service
     """
     try:
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders/ready-to-serve")
-        response.raise_for_status()
+        response = await order_client.get("/api/orders/ready-to-serve", route="/api/orders/ready-to-serve")
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
 @router.get("/partially-served", response_model=List[Dict[str, Any]])
@@ -94,10 +104,9 @@ async def get_partially_served_orders():
     Proxy endpoint to get partially served orders from order service
     """
     try:
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders/partially-served")
-        response.raise_for_status()
+        response = await order_client.get("/api/orders/partially-served", route="/api/orders/partially-served")
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}")
 
 @router.get("/{order_id}", response_model=Dict[str, Any])
@@ -106,8 +115,7 @@ async def get_kitchen_order(order_id: str):
     Proxy endpoint to get specific order from order service
     """
     try:
-        response = requests.get(f"{ORDER_SERVICE_URL}/api/orders/{order_id}")
-        response.raise_for_status()
+        response = await order_client.get(f"/api/orders/{order_id}", route="/api/orders/{order_id}")
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=503, detail=f"Order service unavailable: {str(e)}") 
\ No newline at end of file
@@ -1,60 +1,80 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request, Response
 from typing import Dict, Any, List
 from models import FoodItem, FoodStatusUpdate, BatchFoodStatusUpdate
 from services.menu_service import MenuService
+from services.menu_cache import menu_cache, menu_sort_key
+from pagination import PageParams, paginate_items, set_next_cursor
 from fastapi import File, UploadFile, Form
 
 router = APIRouter()
 
+async def cached_read(request: Request, response: Response, read):
+    """
+    Serve a menu read from the cache with an ETag of the menu version;
+    answer 304 Not Modified if the client already has that version.
+    The ETag and the body come from the same snapshot
+    """
+    snapshot = await menu_cache.snapshot()
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers={"ETag": snapshot.etag})
+    response.headers["ETag"] = snapshot.etag
+    return await read(snapshot)
+
+async def paged(items, page: PageParams, response: Response):
+    """Return one page of a menu list (ordered by category, food_id)"""
+    rows, next_cursor = paginate_items(await items, page, key=menu_sort_key)
+    set_next_cursor(response, next_cursor)
+    return rows
+
 @router.get("/", response_model=List[Dict[str, Any]])
-def view_menu():
+async def view_menu(request: Request, response: Response, page: PageParams = Depends()):
     """
     Lấy danh sách tất cả các món ăn trong menu
     """
-    return MenuService.view_menu()
+    return await cached_read(request, response, lambda snapshot: paged(MenuService.view_menu(snapshot), page, response))
 
 @router.get("/available", response_model=List[Dict[str, Any]])
-def view_available_menu():
+async def view_available_menu(request: Request, response: Response):
     """
     Lấy danh sách các món ăn hiện có sẵn (availability = true)
     """
-    return MenuService.view_menu_by_availability(True)
+    return await cached_read(request, response, lambda snapshot: MenuService.view_menu_by_availability(True, snapshot))
 
 @router.get("/unavailable", response_model=List[Dict[str, Any]])
-def view_unavailable_menu():
+async def view_unavailable_menu(request: Request, response: Response):
     """
     Lấy danh sách các món ăn hiện không có sẵn (availability = false)
     """
-    return MenuService.view_menu_by_availability(False)
+    return await cached_read(request, response, lambda snapshot: MenuService.view_menu_by_availability(False, snapshot))
 
 @router.get("/category/{category}", response_model=List[Dict[str, Any]])
-def view_menu_by_category(category: str):
+async def view_menu_by_category(category: str, request: Request, response: Response):
     """
     Lấy danh sách món ăn theo category
     Các category có sẵn: SoupBase, SignatureFood, SideDish, Meat, Beverages&Desserts
     """
-    return MenuService.view_menu_by_category(category)
+    return await cached_read(request, response, lambda snapshot: MenuService.view_menu_by_category(category, snapshot))
 
 @router.get("/{food_id}", response_model=Dict[str, Any])
-def view_food_by_id(food_id: str):
+async def view_food_by_id(food_id: str, request: Request, response: Response):
     """
     Lấy thông tin chi tiết của một món ăn cụ thể
     """
-    return MenuService.view_food_by_id(food_id)
+    return await cached_read(request, response, lambda snapshot: MenuService.view_food_by_id(food_id, snapshot))
 
 @router.post("/", response_model=Dict[str, str])
 async def add_food(item: FoodItem):
     """
     Thêm món ăn mới vào menu
     """
-    return MenuService.add_food(item)
+    return await MenuService.add_food(item)
 
 @router.patch("/{food_id}/availability", response_model=Dict[str, str])
 async def change_menu_availability(food_id: str, update_data: FoodStatusUpdate):
     """
     Cập nhật trạng thái availability của món ăn (true/false)
     """
-    return MenuService.change_menu_availability(food_id, update_data)
+    return await MenuService.change_menu_availability(food_id, update_data)
 
 @router.patch("/batch-update", response_model=Dict[str, Any])
 async def batch_update_availability(update_data: BatchFoodStatusUpdate):
@@ -62,14 +82,14 @@ async def batch_update_availability(update_data: BatchFoodStatusUpdate):
     Cập nhật trạng thái availability cho nhiều món ăn cùng lúc
     Body JSON format: {"food_ids": ["id1", "id2", ...], "availability": true/false}
     """
-    return MenuService.batch_update_availability(update_data)
+    return await MenuService.batch_update_availability(update_data)
 
 @router.delete("/{food_id}", response_model=Dict[str, str])
 async def delete_food(food_id: str):
     """
     Xóa món ăn khỏi menu
     """
-    return MenuService.delete_food(food_id)
+    return await MenuService.delete_food(food_id)
 
 @router.post("/upload-image", response_model=Dict[str, str])
 async def upload_food_image(
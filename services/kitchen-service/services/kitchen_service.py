@@ -1,11 +1,53 @@
 from typing import Dict, Any, List
 from datetime import datetime
 from fastapi import HTTPException
-from models import KitchenOrder, OrderStatus, OrderServeUpdate, OrderStatusUpdate, get_kitchen_orders
+from pymongo import UpdateOne
+from models import KitchenOrder, OrderCreatedEvent, OrderStatus, OrderServeUpdate, OrderStatusUpdate, get_kitchen_orders
+from services.menu_cache import menu_cache
 
 class KitchenService:
     @staticmethod
-    def add_kitchen_order(order: KitchenOrder) -> Dict[str, str]:
+    async def ensure_indexes():
+        """
+        Tạo unique index cho idempotency_key để bỏ qua đơn hàng gửi lại
+        """
+        await get_kitchen_orders().create_index("idempotency_key", unique=True, sparse=True)
+
+    @staticmethod
+    async def add_delivered_orders(events: List[OrderCreatedEvent]) -> Dict[str, int]:
+        """
+        Thêm các đơn hàng mới từ outbox của order-service. Mỗi đơn có
+        idempotency_key: đơn đã nhận rồi thì bỏ qua, nên order-service có
+        thể gửi lại cả lô khi lỗi
+        """
+        if not events:
+            return {"received": 0, "inserted": 0}
+
+        # Lấy tên món từ menu cache
+        menu = (await menu_cache.snapshot()).by_id
+        operations = []
+        for event in events:
+            order_data = event.dict(exclude={"idempotency_key", "items", "created_at"})
+            order_data["items"] = [{
+                "item_id": item.item_id,
+                "name": menu.get(item.item_id, {}).get("name", item.item_id),
+                "quantity": item.quantity,
+                "notes": item.notes,
+                "is_served": False
+            } for item in event.items]
+            order_data["idempotency_key"] = event.idempotency_key
+            order_data["created_at"] = event.created_at or datetime.now().isoformat()
+            operations.append(UpdateOne(
+                {"idempotency_key": event.idempotency_key},
+                {"$setOnInsert": order_data},
+                upsert=True
+            ))
+
+        result = await get_kitchen_orders().bulk_write(operations, ordered=False)
+        return {"received": len(events), "inserted": result.upserted_count}
+
+    @staticmethod
+    async def add_kitchen_order(order: KitchenOrder) -> Dict[str, str]:
         """
         Thêm đơn hàng mới vào danh sách đơn hàng của bếp
         """
@@ -13,25 +55,25 @@ class KitchenService:
         order_data = order.dict()
         
         # Kiểm tra xem đơn hàng đã tồn tại chưa
-        if kitchen_orders.find_one({"order_id": order_data["order_id"]}):
+        if await kitchen_orders.find_one({"order_id": order_data["order_id"]}):
             raise HTTPException(status_code=400, detail="Đơn hàng đã tồn tại")
         
-        kitchen_orders.insert_one(order_data)
+        await kitchen_orders.insert_one(order_data)
         return {"message": "Đã thêm đơn hàng mới vào danh sách bếp"}
 
     @staticmethod
-    def update_order_status(order_id: str, update_data: OrderStatusUpdate) -> Dict[str, str]:
+    async def update_order_status(order_id: str, update_data: OrderStatusUpdate) -> Dict[str, str]:
         """
         Cập nhật trạng thái của đơn hàng
         """
         kitchen_orders = get_kitchen_orders()
         # Kiểm tra đơn hàng có tồn tại không
-        order = kitchen_orders.find_one({"order_id": order_id})
+        order = await kitchen_orders.find_one({"order_id": order_id})
         if not order:
             raise HTTPException(status_code=404, detail="Không tìm thấy đơn hàng")
 
         # Cập nhật trạng thái
-        result = kitchen_orders.update_one(
+        result = await kitchen_orders.update_one(
             {"order_id": order_id},
             {"$set": {"status": update_data.status}}
         )
@@ -39,13 +81,13 @@ class KitchenService:
         return {"message": f"Đã cập nhật trạng thái đơn hàng thành {update_data.status}"}
 
     @staticmethod
-    def mark_items_served(order_id: str, update_data: OrderServeUpdate) -> Dict[str, Any]:
+    async def mark_items_served(order_id: str, update_data: OrderServeUpdate) -> Dict[str, Any]:
         """
         Đánh dấu các món ăn đã được phục vụ trong đơn hàng
         """
         kitchen_orders = get_kitchen_orders()
         # Kiểm tra đơn hàng có tồn tại không
-        order = kitchen_orders.find_one({"order_id": order_id})
+        order = await kitchen_orders.find_one({"order_id": order_id})
         if not order:
             raise HTTPException(status_code=404, detail="Không tìm thấy đơn hàng")
 
@@ -59,19 +101,19 @@ class KitchenService:
             update_fields[f"items.{idx}.is_served"] = True
 
         # Cập nhật trong database
-        kitchen_orders.update_one(
+        await kitchen_orders.update_one(
             {"order_id": order_id},
             {"$set": update_fields}
         )
 
         # Kiểm tra xem tất cả các món đã được phục vụ chưa
-        updated_order = kitchen_orders.find_one({"order_id": order_id})
+        updated_order = await kitchen_orders.find_one({"order_id": order_id})
         all_served = all(item["is_served"] for item in updated_order["items"])
 
         # Nếu tất cả món đã được phục vụ, cập nhật trạng thái đơn hàng thành COMPLETED
         if all_served:
             update_fields["status"] = OrderStatus.COMPLETED
-            kitchen_orders.update_one(
+            await kitchen_orders.update_one(
                 {"order_id": order_id},
                 {"$set": {"status": OrderStatus.COMPLETED}}
             )
@@ -85,26 +127,26 @@ class KitchenService:
         }
 
     @staticmethod
-    def get_all_kitchen_orders() -> List[Dict[str, Any]]:
+    async def get_all_kitchen_orders() -> List[Dict[str, Any]]:
         """
         Lấy danh sách tất cả các đơn hàng
         """
         kitchen_orders = get_kitchen_orders()
-        return list(kitchen_orders.find({}, {"_id": 0}))
+        return await kitchen_orders.find({}, {"_id": 0}).to_list(None)
 
     @staticmethod
-    def get_kitchen_order(order_id: str) -> Dict[str, Any]:
+    async def get_kitchen_order(order_id: str) -> Dict[str, Any]:
         """
         Lấy thông tin chi tiết của một đơn hàng cụ thể
         """
         kitchen_orders = get_kitchen_orders()
-        order = kitchen_orders.find_one({"order_id": order_id}, {"_id": 0})
+        order = await kitchen_orders.find_one({"order_id": order_id}, {"_id": 0})
         if not order:
             raise HTTPException(status_code=404, detail="Không tìm thấy đơn hàng")
         return order
     
     @staticmethod
-    def get_ready_to_serve_orders() -> List[Dict[str, Any]]:
+    async def get_ready_to_serve_orders() -> List[Dict[str, Any]]:
         """
         Lấy danh sách các đơn hàng đã sẵn sàng để phục vụ (status = ready)
         nhưng chưa được đánh dấu là đã phục vụ hoàn toàn
@@ -114,14 +156,15 @@ class KitchenService:
             "status": OrderStatus.READY.value,
             "items": {"$elemMatch": {"is_served": False}}
         }
-        return list(kitchen_orders.find(query, {"_id": 0}))
+        return await kitchen_orders.find(query, {"_id": 0}).to_list(None)
     
     @staticmethod
-    def get_partially_served_orders() -> List[Dict[str, Any]]:
+    async def get_partially_served_orders() -> List[Dict[str, Any]]:
         """
         Lấy danh sách các đơn hàng đã được phục vụ một phần
         (có ít nhất một món đã phục vụ và ít nhất một món chưa phục vụ)
         """
+        kitchen_orders = get_kitchen_orders()
         pipeline = [
             {
                 "$match": {
@@ -155,4 +198,4 @@ class KitchenService:
             }
         ]
         
-        return list(kitchen_orders.aggregate(pipeline))
+        return await kitchen_orders.aggregate(pipeline).to_list(None)
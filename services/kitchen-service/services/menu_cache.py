@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+from models import get_food_menu
+
+logger = logging.getLogger(__name__)
+
+# Seconds a snapshot may be served before it is reloaded from MongoDB
+MENU_CACHE_MAX_STALENESS = float(os.getenv("MENU_CACHE_MAX_STALENESS", "30"))
+# Watch the food_menu change stream to invalidate on writes from other replicas
+MENU_CHANGE_STREAM_ENABLED = os.getenv("MENU_CHANGE_STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def menu_sort_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    """Stable menu order (category, food_id), also used as the pagination key"""
+    return str(item.get("category") or ""), str(item.get("food_id") or "")
+
+class MenuSnapshot:
+    """Immutable copy of the menu, indexed by food_id, category and availability"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        items = sorted(items, key=menu_sort_key)
+        self.items = items
+        self.by_id = {item["food_id"]: item for item in items if "food_id" in item}
+        self.by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_availability: Dict[bool, List[Dict[str, Any]]] = {True: [], False: []}
+        for item in items:
+            self.by_category.setdefault(item.get("category"), []).append(item)
+            self.by_availability[bool(item.get("availability"))].append(item)
+
+        # Content-based version, identical across replicas for the same menu
+        digest = hashlib.sha1(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()
+        self.etag = f'"{digest}"'
+        self.loaded_at = time.monotonic()
+
+class MenuCache:
+    """
+    In-process menu cache. Reads are served from the current snapshot, which
+    is reloaded once it is older than max_staleness or has been invalidated
+    by a menu write.
+    """
+
+    def __init__(self, max_staleness: float = MENU_CACHE_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._generation = 0
+        self.hits = 0
+        self.reloads = 0
+        self.invalidations = 0
+
+    def _is_fresh(self, snapshot: Optional[MenuSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < self.max_staleness
+
+    async def snapshot(self) -> MenuSnapshot:
+        """Get the current menu snapshot, reloading it if stale"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have reloaded while we waited
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+
+            generation = self._generation
+            items = await get_food_menu().find({}, {"_id": 0}).sort("category", 1).to_list(None)
+            snapshot = MenuSnapshot(items)
+            self.reloads += 1
+            # Don't keep a snapshot that a write invalidated while it was loading
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        """Drop the current snapshot so the next read reloads it"""
+        self._snapshot = None
+        self._generation += 1
+        self.invalidations += 1
+
+    def start_change_stream(self):
+        """Invalidate on every food_menu change (requires a replica set, e.g. Atlas)"""
+        if not MENU_CHANGE_STREAM_ENABLED or self._watcher is not None:
+            return
+
+        async def watch():
+            while True:
+                try:
+                    async with get_food_menu().watch() as stream:
+                        async for _ in stream:
+                            self.invalidate()
+                except Exception as e:
+                    logger.error(f"Menu change stream error: {str(e)}")
+                    self.invalidate()
+                    await asyncio.sleep(5)
+
+        self._watcher = asyncio.create_task(watch())
+        logger.info("Menu change stream watcher started")
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "items": len(snapshot.items) if snapshot else 0,
+            "etag": snapshot.etag if snapshot else None,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 3) if snapshot else None,
+            "max_staleness": self.max_staleness,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "invalidations": self.invalidations
+        }
+
+menu_cache = MenuCache()
@@ -1,7 +1,9 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from fastapi import HTTPException, UploadFile
 from models import FoodItem, FoodStatusUpdate, BatchFoodStatusUpdate, get_food_menu
+from services.menu_cache import MenuSnapshot, menu_cache
 import os
+import asyncio
 from datetime import datetime
 import logging
 
@@ -9,30 +11,30 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+async def current(snapshot: Optional[MenuSnapshot]) -> MenuSnapshot:
+    """Snapshot đã có của request (nếu có), nếu không thì lấy từ cache"""
+    return snapshot or await menu_cache.snapshot()
+
 class MenuService:
     @staticmethod
-    def view_menu() -> List[Dict[str, Any]]:
+    async def view_menu(snapshot: Optional[MenuSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Lấy danh sách tất cả các món ăn trong menu
         """
-        food_menu = get_food_menu()
-        return list(food_menu.find({}, {"_id": 0}).sort("category", 1))
+        return (await current(snapshot)).items
 
     @staticmethod
-    def view_menu_by_availability(available: bool) -> List[Dict[str, Any]]:
+    async def view_menu_by_availability(available: bool, snapshot: Optional[MenuSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Lấy danh sách các món ăn dựa trên tình trạng availability
         """
-        food_menu = get_food_menu()
-        menu_items = list(food_menu.find({"availability": available}, {"_id": 0}).sort("category", 1))
-        return menu_items
+        return (await current(snapshot)).by_availability[available]
 
     @staticmethod
-    def view_menu_by_category(category: str) -> List[Dict[str, Any]]:
+    async def view_menu_by_category(category: str, snapshot: Optional[MenuSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Lấy danh sách món ăn theo category
         """
-        food_menu = get_food_menu()
         valid_categories = ["SoupBase", "SignatureFood", "SideDish", "Meat", "Beverages&Desserts"]
         if category not in valid_categories:
             raise HTTPException(
@@ -40,7 +42,7 @@ class MenuService:
                 detail=f"Category không hợp lệ. Các category có sẵn: {', '.join(valid_categories)}"
             )
             
-        menu_items = list(food_menu.find({"category": category}, {"_id": 0}))
+        menu_items = (await current(snapshot)).by_category.get(category, [])
         if not menu_items:
             raise HTTPException(
                 status_code=404,
@@ -49,12 +51,11 @@ class MenuService:
         return menu_items
     
     @staticmethod
-    def view_food_by_id(food_id: str) -> Dict[str, Any]:
+    async def view_food_by_id(food_id: str, snapshot: Optional[MenuSnapshot] = None) -> Dict[str, Any]:
         """
         Lấy thông tin chi tiết của một món ăn cụ thể
         """
-        food_menu = get_food_menu()
-        food_item = food_menu.find_one({"food_id": food_id}, {"_id": 0})
+        food_item = (await current(snapshot)).by_id.get(food_id)
         if not food_item:
             raise HTTPException(
                 status_code=404,
@@ -63,25 +64,26 @@ class MenuService:
         return food_item
 
     @staticmethod
-    def add_food(item: FoodItem) -> Dict[str, str]:
+    async def add_food(item: FoodItem) -> Dict[str, str]:
         """
         Thêm món ăn mới vào menu
         """
         food_menu = get_food_menu()
         food_data = item.dict()
-        if food_menu.find_one({"name": food_data["name"]}):
+        if await food_menu.find_one({"name": food_data["name"]}):
             raise HTTPException(status_code=400, detail="Món ăn đã tồn tại")
-        food_menu.insert_one(food_data)
+        await food_menu.insert_one(food_data)
+        menu_cache.invalidate()
         return {"message": "Đã thêm món ăn mới"}
 
     @staticmethod
-    def change_menu_availability(food_id: str, update_data: FoodStatusUpdate) -> Dict[str, str]:
+    async def change_menu_availability(food_id: str, update_data: FoodStatusUpdate) -> Dict[str, str]:
         """
         Cập nhật trạng thái availability của món ăn
         """
         food_menu = get_food_menu()
         # Kiểm tra món ăn có tồn tại không
-        food = food_menu.find_one({"food_id": food_id})
+        food = await food_menu.find_one({"food_id": food_id})
         if not food:
             raise HTTPException(
                 status_code=404,
@@ -89,24 +91,25 @@ class MenuService:
             )
 
         # Cập nhật trạng thái
-        result = food_menu.update_one(
+        result = await food_menu.update_one(
             {"food_id": food_id}, 
             {"$set": {"availability": update_data.availability}}
         )
+        menu_cache.invalidate()
         
         # Trả về thông báo phù hợp
         status = "có sẵn" if update_data.availability else "hết hàng"
         return {"message": f"Đã cập nhật món ăn {food['name']} thành {status}"}
 
     @staticmethod
-    def batch_update_availability(update_data: BatchFoodStatusUpdate) -> Dict[str, Any]:
+    async def batch_update_availability(update_data: BatchFoodStatusUpdate) -> Dict[str, Any]:
         """
         Cập nhật trạng thái availability cho nhiều món ăn cùng lúc
         """
         food_menu = get_food_menu()
         # Kiểm tra danh sách món ăn có tồn tại không
         food_ids = update_data.food_ids
-        existing_foods = list(food_menu.find({"food_id": {"$in": food_ids}}, {"food_id": 1, "name": 1}))
+        existing_foods = await food_menu.find({"food_id": {"$in": food_ids}}, {"food_id": 1, "name": 1}).to_list(None)
         
         if not existing_foods:
             raise HTTPException(
@@ -118,10 +121,11 @@ class MenuService:
         found_food_ids = [food["food_id"] for food in existing_foods]
         
         # Cập nhật trạng thái cho các món ăn
-        result = food_menu.update_many(
+        result = await food_menu.update_many(
             {"food_id": {"$in": found_food_ids}},
             {"$set": {"availability": update_data.availability}}
         )
+        menu_cache.invalidate()
         
         # Tính toán các food_id không tìm thấy
         not_found_food_ids = [food_id for food_id in food_ids if food_id not in found_food_ids]
@@ -137,13 +141,13 @@ class MenuService:
         }
 
     @staticmethod
-    def delete_food(food_id: str) -> Dict[str, str]:
+    async def delete_food(food_id: str) -> Dict[str, str]:
         """
         Xóa món ăn khỏi menu
         """
         food_menu = get_food_menu()
         # Kiểm tra món ăn có tồn tại không
-        food = food_menu.find_one({"food_id": food_id})
+        food = await food_menu.find_one({"food_id": food_id})
         if not food:
             raise HTTPException(
                 status_code=404,
@@ -151,9 +155,15 @@ class MenuService:
             )
         
         # Xóa món ăn
-        food_menu.delete_one({"food_id": food_id})
+        await food_menu.delete_one({"food_id": food_id})
+        menu_cache.invalidate()
         return {"message": f"Đã xóa món ăn {food['name']} thành công"}
 
+    @staticmethod
+    def _write_file(path: str, contents: bytes):
+        with open(path, 'wb') as f:
+            f.write(contents)
+
     @staticmethod
     async def upload_image(file: UploadFile, category: str) -> Dict[str, str]:
         """
@@ -199,8 +209,7 @@ class MenuService:
             
             # Lưu file
             contents = await file.read()
-            with open(save_path, 'wb') as f:
-                f.write(contents)
+            await asyncio.to_thread(MenuService._write_file, save_path, contents)
             
             logger.debug(f"File saved successfully to {save_path}")
             
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Order service URL from environment variable or default
+ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://order-service:8002")
+
+# Connection pool configuration
+ORDER_CLIENT_MAX_CONNECTIONS = int(os.getenv("ORDER_CLIENT_MAX_CONNECTIONS", "50"))
+ORDER_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ORDER_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# Timeout configuration (seconds)
+ORDER_CLIENT_CONNECT_TIMEOUT = float(os.getenv("ORDER_CLIENT_CONNECT_TIMEOUT", "2"))
+ORDER_CLIENT_READ_TIMEOUT = float(os.getenv("ORDER_CLIENT_READ_TIMEOUT", "5"))
+ORDER_CLIENT_POOL_TIMEOUT = float(os.getenv("ORDER_CLIENT_POOL_TIMEOUT", "2"))
+
+# Retry configuration
+ORDER_CLIENT_MAX_RETRIES = int(os.getenv("ORDER_CLIENT_MAX_RETRIES", "2"))
+ORDER_CLIENT_RETRY_BASE_DELAY = float(os.getenv("ORDER_CLIENT_RETRY_BASE_DELAY", "0.1"))  # seconds
+ORDER_CLIENT_RETRY_MAX_DELAY = float(os.getenv("ORDER_CLIENT_RETRY_MAX_DELAY", "1"))  # seconds
+
+# Reads are retried on any of RETRY_EXCEPTIONS or RETRY_STATUS_CODES
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+# PUT and DELETE are retried only when the request never reached order-service:
+# after a timeout or 5xx it may have been applied, and a status transition
+# retried on top of itself fails as "Invalid status transition"
+UNSENT_RETRY_METHODS = {"PUT", "DELETE"}
+UNSENT_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Latency histogram bucket upper bounds (milliseconds)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def observe(self, elapsed_ms: float, error: bool = False):
+        for i, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        if error:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "buckets": buckets
+        }
+
+class OrderServiceClient:
+    """
+    Shared pooled async client for order-service. Reads, and writes that
+    never reached the service, are retried with jittered exponential
+    backoff; every call is timed into a per-route latency histogram.
+    """
+
+    def __init__(self, base_url: str = ORDER_SERVICE_URL):
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.retries = 0
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=ORDER_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=ORDER_CLIENT_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(
+                ORDER_CLIENT_READ_TIMEOUT,
+                connect=ORDER_CLIENT_CONNECT_TIMEOUT,
+                pool=ORDER_CLIENT_POOL_TIMEOUT
+            ),
+            follow_redirects=True
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        ceiling = min(ORDER_CLIENT_RETRY_MAX_DELAY, ORDER_CLIENT_RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def request(self, method: str, path: str, route: str, **kwargs) -> httpx.Response:
+        """
+        Send a request to order-service and raise for error statuses.
+        `route` is the path template used to label the latency histogram.
+        """
+        method = method.upper()
+        safe = method in SAFE_METHODS
+        max_retries = ORDER_CLIENT_MAX_RETRIES if safe or method in UNSENT_RETRY_METHODS else 0
+        histogram = self.latency.setdefault(f"{method} {route}", LatencyHistogram())
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                histogram.observe((time.perf_counter() - started) * 1000, error=True)
+                if attempt >= max_retries or not (safe or isinstance(e, UNSENT_EXCEPTIONS)):
+                    raise
+                logger.warning(f"{method} {path} failed ({type(e).__name__}), retrying")
+            except httpx.HTTPError:
+                histogram.observe((time.perf_counter() - started) * 1000, error=True)
+                raise
+            else:
+                failed = response.status_code >= 500
+                histogram.observe((time.perf_counter() - started) * 1000, error=failed)
+                if not safe or response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    response.raise_for_status()
+                    return response
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying")
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+            self.retries += 1
+
+    async def get(self, path: str, route: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, route, **kwargs)
+
+    async def post(self, path: str, route: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, route, **kwargs)
+
+    async def put(self, path: str, route: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", path, route, **kwargs)
+
+    async def patch(self, path: str, route: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", path, route, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "latency": {route: histogram.stats() for route, histogram in self.latency.items()}
+        }
+
+order_client = OrderServiceClient()
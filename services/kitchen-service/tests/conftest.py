@@ -0,0 +1,80 @@
+"""
+Test setup: an in-memory MongoDB (mongomock-motor) with a small menu,
+and a fresh menu cache for each test.
+
+Run from services/kitchen-service:
+    pip install -r requirements-test.txt
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+import database
+from routers import menu
+from services import menu_cache as menu_cache_module, menu_service
+from services.menu_cache import MenuCache
+
+CATEGORIES = ["SoupBase", "SignatureFood", "SideDish", "Meat", "Beverages&Desserts"]
+
+def run(coro):
+    return asyncio.run(coro)
+
+def menu_items(count: int = 20) -> list:
+    return [
+        {"food_id": f"food-{n}", "name": f"Food {n}", "quantity": 10, "availability": n % 4 != 0,
+         "image": "", "note": "", "category": CATEGORIES[n % len(CATEGORIES)], "price": 50000}
+        for n in range(count)
+    ]
+
+class MenuLoads:
+    """Wraps the food_menu collection: counts find() calls and makes each load take delay seconds"""
+
+    def __init__(self, collection, delay: float):
+        self.collection = collection
+        self.delay = delay
+        self.finds = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        loads = self
+
+        class Cursor:
+            def __init__(self, cursor):
+                self.cursor = cursor
+
+            def sort(self, *args, **kwargs):
+                return Cursor(self.cursor.sort(*args, **kwargs))
+
+            async def to_list(self, length):
+                await asyncio.sleep(loads.delay)
+                return await self.cursor.to_list(length)
+
+        return Cursor(self.collection.find(*args, **kwargs))
+
+@pytest.fixture(autouse=True)
+def food_menu(monkeypatch):
+    """The menu database, plus a new MenuCache used by the menu routes and service"""
+    database.db = AsyncMongoMockClient()[database.DB_NAME]
+    run(database.db["food_menu"].insert_many(menu_items()))
+
+    cache = MenuCache()
+    monkeypatch.setattr(menu, "menu_cache", cache)
+    monkeypatch.setattr(menu_service, "menu_cache", cache)
+    monkeypatch.setattr(menu_cache_module, "menu_cache", cache)
+    yield cache
+    database.db = None
+
+@pytest.fixture
+def menu_loads(monkeypatch):
+    """Counts the menu loads from MongoDB; each one takes 50 ms"""
+    loads = MenuLoads(database.db["food_menu"], delay=0.05)
+    monkeypatch.setattr(menu_cache_module, "get_food_menu", lambda: loads)
+    return loads
@@ -0,0 +1,85 @@
+"""
+The connection is healthy while a primary or secondary answers heartbeats;
+a server is gone after RECONNECT_AFTER_FAILED_HEARTBEATS failures in a
+row. A reconnect keeps serving from the old client until the new one is
+ready.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+import database
+from conftest import run
+
+PRIMARY = ("primary.example", 27017)
+SECONDARY = ("secondary.example", 27017)
+ARBITER = ("arbiter.example", 27017)
+
+@pytest.fixture
+def heartbeats(monkeypatch):
+    """The heartbeat monitor of a connected client, with no heartbeats yet"""
+    monkeypatch.setattr(database, "client", object())
+    database.heartbeat_monitor.reset()
+    yield database.heartbeat_monitor
+    database.heartbeat_monitor.reset()
+
+def succeeded(monitor, server, readable=True):
+    monitor.succeeded(SimpleNamespace(connection_id=server, reply=SimpleNamespace(is_readable=readable)))
+
+def failed(monitor, server, times=1):
+    for _ in range(times):
+        monitor.failed(SimpleNamespace(connection_id=server, reply="timed out"))
+
+def test_unreachable_secondary_keeps_connection_healthy(heartbeats):
+    for _ in range(database.RECONNECT_AFTER_FAILED_HEARTBEATS * 3):
+        succeeded(heartbeats, PRIMARY)
+        failed(heartbeats, SECONDARY)
+
+    assert database.get_connection_status()
+    assert database.connection_metrics["readable_servers"] == ["primary.example:27017"]
+
+def test_secondary_serves_while_primary_is_gone(heartbeats):
+    succeeded(heartbeats, PRIMARY)
+    failed(heartbeats, PRIMARY, times=database.RECONNECT_AFTER_FAILED_HEARTBEATS)
+    succeeded(heartbeats, SECONDARY)
+
+    assert database.get_connection_status()
+
+def test_unhealthy_once_no_readable_server_answers(heartbeats):
+    succeeded(heartbeats, PRIMARY)
+    succeeded(heartbeats, SECONDARY)
+    succeeded(heartbeats, ARBITER, readable=False)
+    failed(heartbeats, PRIMARY, times=database.RECONNECT_AFTER_FAILED_HEARTBEATS - 1)
+    failed(heartbeats, SECONDARY, times=database.RECONNECT_AFTER_FAILED_HEARTBEATS)
+    assert database.get_connection_status()
+
+    failed(heartbeats, PRIMARY)
+    assert not database.get_connection_status()
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_reconnect_swaps_clients_once_the_new_one_is_ready(heartbeats, monkeypatch):
+    old_client = FakeClient("old")
+    monkeypatch.setattr(database, "client", old_client)
+    monkeypatch.setattr(database, "db", "old db")
+    succeeded(heartbeats, PRIMARY)
+    failed(heartbeats, PRIMARY, times=database.RECONNECT_AFTER_FAILED_HEARTBEATS)
+    seen_while_connecting = []
+
+    async def connect():
+        await asyncio.sleep(0)
+        seen_while_connecting.append((database.client, database.get_database(), old_client.closed))
+        return FakeClient("new"), "new db"
+
+    monkeypatch.setattr(database, "connect", connect)
+    run(database.reconnect())
+
+    assert seen_while_connecting == [(old_client, "old db", False)]
+    assert database.client.name == "new" and database.get_database() == "new db"
+    assert old_client.closed
+    assert database.get_connection_status()
@@ -0,0 +1,60 @@
+"""
+Menu reads are served from one cached snapshot: concurrent readers of a
+cold or invalidated cache share a single load from MongoDB, and a request
+gets its ETag and body from the same snapshot.
+"""
+import asyncio
+from fastapi import Response
+from starlette.requests import Request
+from conftest import run
+from routers import menu
+
+READERS = 200
+
+def request(headers: dict = None) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/menu/", "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    })
+
+async def read_available(count: int) -> list:
+    return await asyncio.gather(*(
+        menu.view_available_menu(request(), Response()) for _ in range(count)
+    ))
+
+def test_one_load_serves_concurrent_readers(food_menu, menu_loads):
+    results = run(read_available(READERS))
+
+    assert menu_loads.finds == 1
+    assert food_menu.reloads == 1 and food_menu.hits == READERS - 1
+    assert all(result is results[0] for result in results)
+    assert len(results[0]) == 15
+
+def test_one_load_after_invalidation(food_menu, menu_loads):
+    async def main():
+        await read_available(1)
+        food_menu.invalidate()
+        return await read_available(READERS)
+
+    results = run(main())
+
+    assert menu_loads.finds == 2
+    assert all(result is results[0] for result in results)
+
+def test_request_reads_one_snapshot(food_menu):
+    response = Response()
+    items = run(menu.view_available_menu(request(), response))
+
+    assert food_menu.reloads + food_menu.hits == 1
+    assert response.headers["ETag"] == food_menu.stats()["etag"]
+    assert len(items) == 15
+
+def test_not_modified_for_current_etag(food_menu):
+    async def main():
+        response = Response()
+        await menu.view_menu_by_category("Meat", request(), response)
+        return await menu.view_menu_by_category("Meat", request({"If-None-Match": response.headers["ETag"]}), Response())
+
+    response = run(main())
+
+    assert response.status_code == 304
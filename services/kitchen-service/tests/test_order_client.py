@@ -0,0 +1,51 @@
+"""
+Reads are retried on timeouts and 5xx; a PUT only when it never reached
+order-service, since a retried status transition fails once applied.
+"""
+import httpx
+import pytest
+from conftest import run
+from services import order_client as order_client_module
+from services.order_client import OrderServiceClient
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(order_client_module, "ORDER_CLIENT_RETRY_BASE_DELAY", 0)
+
+def client_failing(*failures):
+    """A client whose order-service answers with the given failures (an exception or status), then 200"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        failure = failures[len(calls) - 1] if len(calls) <= len(failures) else 200
+        if isinstance(failure, Exception):
+            raise failure
+        return httpx.Response(failure, json={})
+
+    client = OrderServiceClient(base_url="http://order-service")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    return client, calls
+
+def test_get_is_retried_after_read_timeout_and_503():
+    client, calls = client_failing(httpx.ReadTimeout("slow"), 503)
+
+    response = run(client.get("/api/orders/1", route="/api/orders/{order_id}"))
+
+    assert response.status_code == 200 and calls == ["GET"] * 3
+
+@pytest.mark.parametrize("failure", [httpx.ReadTimeout("slow"), 503])
+def test_put_is_not_retried_once_it_may_have_been_applied(failure):
+    client, calls = client_failing(failure)
+
+    with pytest.raises((httpx.ReadTimeout, httpx.HTTPStatusError)):
+        run(client.put("/api/orders/1/status", route="/api/orders/{order_id}/status", json={"status": "preparing"}))
+
+    assert calls == ["PUT"]
+
+def test_put_is_retried_when_it_could_not_connect():
+    client, calls = client_failing(httpx.ConnectError("refused"))
+
+    response = run(client.put("/api/orders/1/status", route="/api/orders/{order_id}/status", json={"status": "preparing"}))
+
+    assert response.status_code == 200 and calls == ["PUT", "PUT"]
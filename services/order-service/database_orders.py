@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -26,6 +27,38 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async driver for the same database (aiomysql for MySQL, aiosqlite for local SQLite)
+ASYNC_DRIVERS = {
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
+
+def to_async_url(url: str) -> str:
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return url.replace(sync_prefix, async_prefix, 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Request handlers use the asyncio engine; the sync engine above is kept
+# for migrations and offline scripts (e.g. the rollup backfill)
+# (aiosqlite has no connection pool, so the pool settings only apply to MySQL)
+ASYNC_POOL_OPTIONS = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": 20,
+    "max_overflow": 30,
+    "pool_timeout": 60,
+    "pool_recycle": 3600,
+}
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **ASYNC_POOL_OPTIONS)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    """FastAPI dependency yielding an AsyncSession per request"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
 def get_db_connection():
     try:
         db = SessionLocal()
@@ -47,60 +80,70 @@ def test_connection():
         print(f"❌ Failed to connect to the database: {str(e)}")
         return False
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+def run_migrations(revision: str = "head"):
+    """Upgrade the schema with the Alembic migrations in migrations/versions"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(MIGRATIONS_DIR), "alembic.ini"))
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+# Tables derived from orders_completed, and the command that fills them
+# from the existing history (payments only update them going forward)
+BACKFILLS = [
+    (["revenue_daily"], "Report rollups", "python -m services.rollup_service"),
+    (["stat_sketches", "stat_sketch_deltas"], "Report sketches", "python -m services.sketch_service"),
+]
+
+def warn_missing_backfills():
+    """Warn about derived tables still empty while there is payment history"""
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT 1 FROM orders_completed LIMIT 1")).first() is None:
+            return
+        for tables, name, command in BACKFILLS:
+            if all(connection.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is None
+                   for table in tables):
+                print(f"⚠️ {name} are empty, run: {command}")
+
 def init_db():
     try:
-        from models import Order, Payment, Table, OrderItem, OrderCompleted
-        
+        from models import Table
+
         connection = engine.connect()
         connection.close()
         print("✅ Successfully connected to the database!")
-        
-        # Check if tables exist
-        with engine.connect() as conn:
-            existing_tables = conn.execute(text("SHOW TABLES")).fetchall()
-            existing_tables = [t[0] for t in existing_tables]
-            
-        if not existing_tables:
-            # Only create tables if none exist
-            print("Creating database tables...")
-            Base.metadata.create_all(bind=engine)
-            
-            # Verify tables were created
-            with engine.connect() as conn:
-                tables = Base.metadata.tables.keys()
-                existing_tables = conn.execute(text("SHOW TABLES")).fetchall()
-                existing_tables = [t[0] for t in existing_tables]
-                
-                print(f"Expected tables: {', '.join(tables)}")
-                print(f"Existing tables: {', '.join(existing_tables)}")
-                
-                if set(tables) == set(existing_tables):
-                    print("✅ All tables created successfully!")
-                    
-                    # Create initial tables
-                    session = SessionLocal()
-                    try:
-                        print("Creating initial tables...")
-                        # Create 10 tables
-                        for i in range(1, 11):
-                            new_table = Table(table_id=i, table_status='available')
-                            session.add(new_table)
-                        session.commit()
-                        print("✅ Initial tables created successfully!")
-                    except Exception as e:
-                        session.rollback()
-                        print(f"❌ Failed to create initial tables: {str(e)}")
-                        raise e
-                    finally:
-                        session.close()
-                else:
-                    missing = set(tables) - set(existing_tables)
-                    if missing:
-                        print(f"❌ Missing tables: {', '.join(missing)}")
-                        raise Exception(f"Failed to create tables: {', '.join(missing)}")
-        else:
-            print("✅ Database tables already exist, skipping initialization")
-                
+
+        # Apply pending migrations (creates the schema on an empty database)
+        print("Applying database migrations...")
+        run_migrations()
+        print("✅ Database schema is up to date")
+
+        warn_missing_backfills()
+
+        # Create initial tables
+        session = SessionLocal()
+        try:
+            if session.query(Table).count() == 0:
+                print("Creating initial tables...")
+                # Create 10 tables
+                for i in range(1, 11):
+                    new_table = Table(table_id=i, table_status='available')
+                    session.add(new_table)
+                session.commit()
+                print("✅ Initial tables created successfully!")
+        except Exception as e:
+            session.rollback()
+            print(f"❌ Failed to create initial tables: {str(e)}")
+            raise e
+        finally:
+            session.close()
+
     except Exception as e:
         print(f"❌ Failed to initialize database: {str(e)}")
         raise e
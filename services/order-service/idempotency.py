@@ -0,0 +1,118 @@
+# order-service/idempotency.py
+"""
+Idempotency-Key support for POST endpoints.
+
+A client retrying a request sends the same Idempotency-Key header. The
+first request with a key runs; its result is kept for
+IDEMPOTENCY_TTL_SECONDS and repeats of the request are answered from
+it, with an Idempotent-Replayed: true header, without touching the
+database. A repeat arriving while the first request is still running
+waits for its result. Failed requests are not kept, so they can be
+retried. Reusing a key for a different request body is a 422.
+
+Keys are per caller: the stored result is found only with the same
+Authorization header (kept as a hash), so another caller reusing a key
+never sees someone else's order or payment.
+
+This is the only Idempotency-Key store: the gateway forwards the key
+and relays the Idempotent-Replayed header, so retries through any
+gateway replica end up here.
+
+Keys live in a bounded in-memory LRU (IDEMPOTENCY_MAX_KEYS per process).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException, Response
+
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def fingerprint(body: Any) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyStore:
+    """(scope, key) -> result of the first request, LRU-bounded with a TTL"""
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        # key -> (request fingerprint, future of the result, expiry)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.executed = 0
+        self.replayed = 0
+        self.conflicts = 0
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def run(self, scope: str, key: Optional[str], body: Any, call: Callable[[], Awaitable[Any]],
+                  response: Optional[Response] = None, caller: Optional[str] = None) -> Any:
+        """
+        Run call() once per (scope, caller, key) and return its result to
+        every repeat. caller is the request's Authorization header
+        """
+        if key is None:
+            return await call()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+        caller_hash = hashlib.sha256(caller.encode()).hexdigest() if caller else "anonymous"
+        key = f"{scope}:{caller_hash}:{key}"
+        request_fingerprint = fingerprint(body)
+        entry = self._lookup(key)
+        if entry is not None:
+            if entry[0] != request_fingerprint:
+                self.conflicts += 1
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            self.replayed += 1
+            # shield: a client giving up on its retry must not cancel the first request
+            result = await asyncio.shield(entry[1])
+            if response is not None:
+                response.headers[REPLAYED_HEADER] = "true"
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (request_fingerprint, future, time.monotonic() + self.ttl)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+        self.executed += 1
+        try:
+            result = await call()
+        except BaseException as e:
+            # Not kept: the client may retry a failed request with the same key
+            if self._entries.get(key, (None, None))[1] is future:
+                del self._entries[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Retrieved, whether or not a repeat was waiting
+            raise
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._entries),
+            "max_keys": self.max_keys,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts
+        }
+
+idempotency_store = IdempotencyStore()
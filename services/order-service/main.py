@@ -1,6 +1,11 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from routers import orders, payments, reports, tables
+from routers import orders, payments, reports, tables, exports
+from services import order_service
+from services.table_registry import table_registry
+from services.connection_manager import connection_manager
+from services.outbox import outbox_dispatcher
+from idempotency import idempotency_store
 from database_orders import init_db, get_db_connection, text
 import time
 import json
@@ -30,6 +35,8 @@ async def startup_event():
                 # Initialize database tables
                 init_db()
                 db.close()
+                await table_registry.load()
+                outbox_dispatcher.start()
                 print("✅ Order Service startup complete!")
                 break
         except Exception as e:
@@ -40,13 +47,13 @@ async def startup_event():
                 print("❌ Failed to initialize database after maximum retries")
                 raise e
 
-# Store active WebSocket connections
-active_connections = []
+@app.on_event("shutdown")
+async def shutdown_event():
+    await outbox_dispatcher.stop()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    active_connections.append(websocket)
+    await connection_manager.connect(websocket)
     try:
         while True:
             data = await websocket.receive_json()
@@ -56,18 +63,23 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Create order in database
                 order_data = data.get("order")
                 try:
-                    order_id = orders.create_order(order_data)
+                    # Same Idempotency-Key semantics as POST /orders, keyed to the
+                    # socket's Authorization header if it sent one
+                    order_id = await idempotency_store.run(
+                        "ws new_order", data.get("idempotency_key"), order_data,
+                        lambda: order_service.create_order(order_data),
+                        caller=websocket.headers.get("authorization")
+                    )
                     
-                    # Broadcast to all connected clients
-                    for connection in active_connections:
-                        await connection.send_json({
-                            "type": "order_update",
-                            "order_id": order_id,
-                            "status": "pending",
-                            "data": order_data
-                        })
+                    # Queue for all connected clients
+                    connection_manager.broadcast({
+                        "type": "order_update",
+                        "order_id": order_id,
+                        "status": "pending",
+                        "data": order_data
+                    })
                 except Exception as e:
-                    await websocket.send_json({
+                    connection_manager.send(websocket, {
                         "type": "error",
                         "message": str(e)
                     })
@@ -77,28 +89,30 @@ async def websocket_endpoint(websocket: WebSocket):
                 order_id = data.get("order_id")
                 new_status = data.get("status")
                 try:
-                    orders.update_order_status(order_id, new_status)
+                    await order_service.update_order_status(order_id, new_status)
                     
-                    # Broadcast status update
-                    for connection in active_connections:
-                        await connection.send_json({
-                            "type": "status_update",
-                            "order_id": order_id,
-                            "status": new_status
-                        })
+                    # Queue status update for all connected clients
+                    connection_manager.broadcast({
+                        "type": "status_update",
+                        "order_id": order_id,
+                        "status": new_status
+                    })
                 except Exception as e:
-                    await websocket.send_json({
+                    connection_manager.send(websocket, {
                         "type": "error",
                         "message": str(e)
                     })
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
+        pass
+    finally:
+        connection_manager.disconnect(websocket)
 
 # Include routers
 app.include_router(orders.router, prefix="/orders", tags=["Orders"])
 app.include_router(payments.router, prefix="/payments", tags=["Payments"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 app.include_router(tables.router, prefix="/tables", tags=["Tables"])
+app.include_router(exports.router, prefix="/exports", tags=["Exports"])
 
 @app.get("/")
 def read_root():
@@ -108,6 +122,15 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "websocket": connection_manager.stats(),
+        "table_registry": table_registry.stats(),
+        "outbox": await outbox_dispatcher.stats(),
+        "idempotency": idempotency_store.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,135 @@
+"""initial schema
+
+Baseline matching the tables init_db used to create with create_all.
+Tables that already exist (databases created before migrations were
+introduced) are left untouched, so this revision can be applied to both
+empty and existing databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-04-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _create_table(existing, name, *columns, indexes=()):
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for column in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column])
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    _create_table(
+        existing, "tables",
+        sa.Column("table_id", sa.Integer(), primary_key=True),
+        sa.Column("table_status", sa.Enum("available", "occupied", "reserved"), nullable=True),
+        indexes=["table_id"]
+    )
+    _create_table(
+        existing, "orders",
+        sa.Column("order_id", sa.Integer(), primary_key=True),
+        sa.Column("employee_id", sa.Integer(), nullable=True),
+        sa.Column("table_id", sa.Integer(), sa.ForeignKey("tables.table_id"), nullable=True),
+        sa.Column("customer_name", sa.String(100), nullable=True),
+        sa.Column("customer_phone", sa.String(20), nullable=True),
+        sa.Column("order_status", sa.Enum("pending", "preparing", "ready_to_serve", "completed", "cancelled", "paid"), nullable=True),
+        sa.Column("total_price", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        indexes=["order_id", "employee_id"]
+    )
+    _create_table(
+        existing, "orders_completed",
+        sa.Column("order_completed_id", sa.Integer(), primary_key=True),
+        sa.Column("employee_id", sa.Integer(), nullable=True),
+        sa.Column("customer_name", sa.String(100), nullable=True),
+        sa.Column("customer_phone", sa.String(20), nullable=True),
+        sa.Column("table_id", sa.Integer(), sa.ForeignKey("tables.table_id"), nullable=True),
+        sa.Column("total_price", sa.Float(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        indexes=["order_completed_id"]
+    )
+    _create_table(
+        existing, "completed_order_mappings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("completed_order_id", sa.Integer(), sa.ForeignKey("orders_completed.order_completed_id"), nullable=True),
+        sa.Column("original_order_id", sa.Integer(), nullable=True),
+        indexes=["id"]
+    )
+    _create_table(
+        existing, "completed_order_items",
+        sa.Column("completed_order_item_id", sa.Integer(), primary_key=True),
+        sa.Column("order_completed_id", sa.Integer(), sa.ForeignKey("orders_completed.order_completed_id"), nullable=True),
+        sa.Column("food_id", sa.String(10), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=True),
+        sa.Column("note", sa.Text(), nullable=True),
+        indexes=["completed_order_item_id"]
+    )
+    _create_table(
+        existing, "order_items",
+        sa.Column("order_item_id", sa.Integer(), primary_key=True),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.order_id"), nullable=True),
+        sa.Column("food_id", sa.String(10), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=True),
+        sa.Column("note", sa.Text(), nullable=True),
+        indexes=["order_item_id"]
+    )
+    _create_table(
+        existing, "payments",
+        sa.Column("payment_id", sa.Integer(), primary_key=True),
+        sa.Column("order_completed_id", sa.Integer(), sa.ForeignKey("orders_completed.order_completed_id"), nullable=True),
+        sa.Column("payment_method", sa.Enum("cash", "card", "e-wallet"), nullable=True),
+        sa.Column("payment_status", sa.Enum("pending", "completed", "failed"), nullable=True),
+        sa.Column("amount_paid", sa.Float(), nullable=True),
+        sa.Column("payment_date", sa.DateTime(), nullable=True),
+        sa.Column("transaction_id", sa.String(100), nullable=True),
+        indexes=["payment_id"]
+    )
+
+    # Pre-aggregated report rollups
+    _create_table(
+        existing, "revenue_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("revenue", sa.Float(), nullable=True),
+        sa.Column("order_count", sa.Integer(), nullable=True),
+        sa.Column("customer_count", sa.Integer(), nullable=True)
+    )
+    _create_table(
+        existing, "revenue_hourly",
+        sa.Column("hour", sa.DateTime(), primary_key=True),
+        sa.Column("revenue", sa.Float(), nullable=True),
+        sa.Column("order_count", sa.Integer(), nullable=True)
+    )
+    _create_table(
+        existing, "revenue_by_employee",
+        sa.Column("employee_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("revenue", sa.Float(), nullable=True),
+        sa.Column("order_count", sa.Integer(), nullable=True)
+    )
+    _create_table(
+        existing, "daily_customers",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("customer_phone", sa.String(20), primary_key=True)
+    )
+    _create_table(
+        existing, "customers",
+        sa.Column("customer_phone", sa.String(20), primary_key=True),
+        sa.Column("first_seen_at", sa.DateTime(), nullable=True),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=True),
+        sa.Column("order_count", sa.Integer(), nullable=True)
+    )
+
+def downgrade():
+    for name in [
+        "customers", "daily_customers", "revenue_by_employee", "revenue_hourly", "revenue_daily",
+        "payments", "order_items", "completed_order_items", "completed_order_mappings",
+        "orders_completed", "orders", "tables"
+    ]:
+        op.drop_table(name)
@@ -0,0 +1,37 @@
+"""indexes for hot order-service filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-04-20
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Payment lookup and per-table order listing: WHERE table_id = ? AND order_status IN (...)
+    ("ix_orders_table_id_order_status", "orders", ["table_id", "order_status"]),
+    # Active orders: WHERE order_status IN (...) ORDER BY created_at
+    ("ix_orders_order_status_created_at", "orders", ["order_status", "created_at"]),
+    ("ix_orders_created_at", "orders", ["created_at"]),
+    # Customer history: WHERE customer_phone = ? ORDER BY completed_at
+    ("ix_orders_completed_customer_phone_completed_at", "orders_completed", ["customer_phone", "completed_at"]),
+    ("ix_orders_completed_completed_at", "orders_completed", ["completed_at"]),
+    ("ix_payments_order_completed_id", "payments", ["order_completed_id"]),
+    ("ix_payments_payment_date", "payments", ["payment_date"]),
+    # Top foods: GROUP BY food_id over (food_id, quantity) without touching the table
+    ("ix_completed_order_items_food_id_quantity", "completed_order_items", ["food_id", "quantity"]),
+    ("ix_completed_order_items_order_completed_id", "completed_order_items", ["order_completed_id"]),
+    ("ix_completed_order_mappings_completed_order_id", "completed_order_mappings", ["completed_order_id"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
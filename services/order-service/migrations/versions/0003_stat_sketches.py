@@ -0,0 +1,26 @@
+"""stat_sketches table for approximate dashboard statistics
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-04-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "stat_sketches",
+        sa.Column("period", sa.String(10), primary_key=True),
+        sa.Column("food_quantity", sa.LargeBinary(length=2 ** 24), nullable=True),
+        sa.Column("food_orders", sa.LargeBinary(length=2 ** 24), nullable=True),
+        sa.Column("customers", sa.LargeBinary(length=2 ** 24), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table("stat_sketches")
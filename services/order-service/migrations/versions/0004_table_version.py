@@ -0,0 +1,19 @@
+"""tables.version for optimistic concurrency on table status
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-05-04
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("tables", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    op.drop_column("tables", "version")
@@ -0,0 +1,32 @@
+"""outbox table for order -> kitchen propagation
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-05-11
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("event_type", sa.String(50), nullable=False),
+        sa.Column("idempotency_key", sa.String(64), nullable=False, unique=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("dispatched_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_outbox_dispatched_at_next_attempt_at", "outbox", ["dispatched_at", "next_attempt_at"])
+
+def downgrade():
+    op.drop_index("ix_outbox_dispatched_at_next_attempt_at", table_name="outbox")
+    op.drop_table("outbox")
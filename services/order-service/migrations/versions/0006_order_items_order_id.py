@@ -0,0 +1,20 @@
+"""index order_items.order_id for loading the items of listed orders
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-05-18
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Items of listed orders: WHERE order_id IN (...). Named, so it exists on
+    # every backend (MySQL would only have its implicit foreign key index)
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+def downgrade():
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
@@ -0,0 +1,28 @@
+"""stat_sketch_deltas: per-settlement sketch additions, merged on read
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-05-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "stat_sketch_deltas",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("period", sa.String(10), nullable=False),
+        sa.Column("items", sa.Text(), nullable=False),
+        sa.Column("customer_phone", sa.String(20), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_stat_sketch_deltas_period", "stat_sketch_deltas", ["period"])
+
+def downgrade():
+    op.drop_index("ix_stat_sketch_deltas_period", table_name="stat_sketch_deltas")
+    op.drop_table("stat_sketch_deltas")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, DateTime, Date, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database_orders import Base
 from datetime import datetime
@@ -7,6 +7,7 @@ class Table(Base):
     __tablename__ = "tables"
     table_id = Column(Integer, primary_key=True, index=True)
     table_status = Column(Enum('available', 'occupied', 'reserved'), default='available')
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every status change
     orders = relationship("Order", back_populates="table")
 
 class Order(Base):
@@ -18,7 +19,13 @@ class Order(Base):
     customer_phone = Column(String(20), nullable=True)
     order_status = Column(Enum('pending', 'preparing', 'ready_to_serve', 'completed', 'cancelled', 'paid'))
     total_price = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Schema changes go through Alembic migrations (migrations/versions)
+    __table_args__ = (
+        Index("ix_orders_table_id_order_status", "table_id", "order_status"),
+        Index("ix_orders_order_status_created_at", "order_status", "created_at"),
+    )
 
     table = relationship("Table", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", foreign_keys="OrderItem.order_id", cascade="all, delete-orphan")
@@ -31,7 +38,11 @@ class OrderCompleted(Base):
     customer_phone = Column(String(20))
     table_id = Column(Integer, ForeignKey("tables.table_id"))
     total_price = Column(Float)
-    completed_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_orders_completed_customer_phone_completed_at", "customer_phone", "completed_at"),
+    )
 
     table = relationship("Table")
     items = relationship("CompletedOrderItem", back_populates="order_completed")
@@ -41,7 +52,7 @@ class OrderCompleted(Base):
 class CompletedOrderMapping(Base):
     __tablename__ = "completed_order_mappings"
     id = Column(Integer, primary_key=True, index=True)
-    completed_order_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"))
+    completed_order_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"), index=True)
     original_order_id = Column(Integer)
     
     completed_order = relationship("OrderCompleted", back_populates="original_orders")
@@ -49,17 +60,21 @@ class CompletedOrderMapping(Base):
 class CompletedOrderItem(Base):
     __tablename__ = "completed_order_items"
     completed_order_item_id = Column(Integer, primary_key=True, index=True)
-    order_completed_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"))
+    order_completed_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"), index=True)
     food_id = Column(String(10))
     quantity = Column(Integer)
     note = Column(Text)
+
+    __table_args__ = (
+        Index("ix_completed_order_items_food_id_quantity", "food_id", "quantity"),
+    )
     
     order_completed = relationship("OrderCompleted", back_populates="items")
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     order_item_id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.order_id"))  # This can reference either orders.order_id or orders_completed.order_completed_id
+    order_id = Column(Integer, ForeignKey("orders.order_id"), index=True)  # This can reference either orders.order_id or orders_completed.order_completed_id
     food_id = Column(String(10))
     quantity = Column(Integer)
     note = Column(Text)
@@ -69,11 +84,79 @@ class OrderItem(Base):
 class Payment(Base):
     __tablename__ = "payments"
     payment_id = Column(Integer, primary_key=True, index=True)
-    order_completed_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"))
+    order_completed_id = Column(Integer, ForeignKey("orders_completed.order_completed_id"), index=True)
     payment_method = Column(Enum('cash', 'card', 'e-wallet'))
     payment_status = Column(Enum('pending', 'completed', 'failed'))
     amount_paid = Column(Float)
-    payment_date = Column(DateTime, default=datetime.utcnow)
+    payment_date = Column(DateTime, default=datetime.utcnow, index=True)
     transaction_id = Column(String(100), nullable=True)  # For card/e-wallet payments
 
     order_completed = relationship("OrderCompleted", back_populates="payment")
+
+
+# === Pre-aggregated report rollups (maintained at payment time) ===
+class RevenueDaily(Base):
+    __tablename__ = "revenue_daily"
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, default=0)
+    order_count = Column(Integer, default=0)
+    customer_count = Column(Integer, default=0)  # Distinct customers on this day
+
+class RevenueHourly(Base):
+    __tablename__ = "revenue_hourly"
+    hour = Column(DateTime, primary_key=True)  # Truncated to the hour
+    revenue = Column(Float, default=0)
+    order_count = Column(Integer, default=0)
+
+class EmployeeRevenue(Base):
+    __tablename__ = "revenue_by_employee"
+    employee_id = Column(Integer, primary_key=True)
+    revenue = Column(Float, default=0)
+    order_count = Column(Integer, default=0)
+
+class DailyCustomer(Base):
+    __tablename__ = "daily_customers"
+    day = Column(Date, primary_key=True)
+    customer_phone = Column(String(20), primary_key=True)
+
+class Customer(Base):
+    __tablename__ = "customers"
+    customer_phone = Column(String(20), primary_key=True)
+    first_seen_at = Column(DateTime)
+    last_seen_at = Column(DateTime)
+    order_count = Column(Integer, default=0)
+
+# === Mergeable sketches for dashboard statistics (see sketches.py) ===
+class StatSketch(Base):
+    __tablename__ = "stat_sketches"
+    period = Column(String(10), primary_key=True)  # ISO day, or 'all' for all time
+    food_quantity = Column(LargeBinary(length=2 ** 24))  # CountMinSketch of quantity per food_id
+    food_orders = Column(LargeBinary(length=2 ** 24))  # CountMinSketch of order lines per food_id
+    customers = Column(LargeBinary(length=2 ** 24))  # HyperLogLog of customer phones
+    updated_at = Column(DateTime)
+
+class StatSketchDelta(Base):
+    """One settlement's additions to its day's sketches, until compacted into stat_sketches"""
+    __tablename__ = "stat_sketch_deltas"
+    id = Column(Integer, primary_key=True)
+    period = Column(String(10), nullable=False, index=True)  # ISO day
+    items = Column(Text, nullable=False)  # JSON [[food_id, quantity], ...]
+    customer_phone = Column(String(20), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+# === Transactional outbox (see services/outbox.py) ===
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    idempotency_key = Column(String(64), nullable=False, unique=True)  # Lets the receiver drop redeliveries
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False)
+    dispatched_at = Column(DateTime, nullable=True)  # NULL until delivered
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_dispatched_at_next_attempt_at", "dispatched_at", "next_attempt_at"),
+    )
@@ -0,0 +1,118 @@
+"""
+Throughput benchmark for order creation.
+
+Creates --orders orders (--items items each) three ways and reports
+orders per second:
+
+- before: create_order as it was before single-transaction creation,
+  committing the order, then adding its items one by one and updating
+  the table in a second commit
+- single: order_service.create_order, one transaction per order
+- batches: order_service.create_orders with --batch-size orders per
+  transaction (POST /orders/batch)
+
+Runs against DATABASE_URL, by default a new SQLite file in a temporary
+directory, which is migrated first:
+    python order_create_benchmark.py --orders 2000 --batch-size 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "orders.db")
+
+from datetime import datetime
+from database_orders import SessionLocal, async_engine, run_migrations
+from models import Order, OrderItem, Table
+from services import order_service
+
+TABLES = 10
+
+def order_data(n: int, items: int):
+    return {
+        "employee_id": 1,
+        "table_id": n % TABLES + 1,
+        "total_price": 10.0 * items,
+        "items": [{"food_id": f"food-{i}", "quantity": 1, "note": ""} for i in range(items)]
+    }
+
+def legacy_create_order(order_data):
+    """create_order before single-transaction creation"""
+    session = SessionLocal()
+    try:
+        new_order = Order(
+            employee_id=order_data["employee_id"],
+            table_id=order_data["table_id"],
+            order_status="pending",
+            total_price=order_data["total_price"],
+            created_at=datetime.now()
+        )
+        session.add(new_order)
+        session.commit()
+        session.refresh(new_order)  # Get ID after insert
+
+        for item in order_data["items"]:
+            session.add(OrderItem(
+                order_id=new_order.order_id,
+                food_id=str(item["food_id"]),
+                quantity=item["quantity"],
+                note=item.get("note", "")
+            ))
+
+        table = session.query(Table).filter_by(table_id=order_data["table_id"]).first()
+        if table:
+            table.table_status = "occupied"
+
+        session.commit()
+        return new_order.order_id
+    finally:
+        session.close()
+
+def ensure_tables():
+    session = SessionLocal()
+    try:
+        existing = {table_id for (table_id,) in session.query(Table.table_id)}
+        session.add_all([
+            Table(table_id=table_id, table_status="available")
+            for table_id in range(1, TABLES + 1) if table_id not in existing
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+def report(name: str, orders: int, elapsed: float):
+    print(f"{name:<8} {orders / elapsed:8.0f} orders/s   ({orders} orders in {elapsed:.2f}s)")
+
+async def run(args):
+    run_migrations()
+    ensure_tables()
+    print(f"{args.orders} orders of {args.items} items on {async_engine.url.get_backend_name()}")
+
+    started = time.perf_counter()
+    for n in range(args.orders):
+        legacy_create_order(order_data(n, args.items))
+    report("before", args.orders, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for n in range(args.orders):
+        await order_service.create_order(order_data(n, args.items))
+    report("single", args.orders, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for first in range(0, args.orders, args.batch_size):
+        await order_service.create_orders([
+            order_data(n, args.items) for n in range(first, min(first + args.batch_size, args.orders))
+        ])
+    report(f"batch {args.batch_size}", args.orders, time.perf_counter() - started)
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order creation throughput benchmark")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
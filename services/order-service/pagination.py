@@ -0,0 +1,102 @@
+# order-service/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered newest first by (timestamp, id). When more rows exist,
+the X-Next-Cursor response header holds an opaque cursor encoding the
+last row's key; pass it back as ?cursor= to get the next page. ?since=
+and ?until= restrict the timestamp to [since, until); lists that are
+not paged (active orders) take only those.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, default=lambda v: v.isoformat()).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class TimeWindow:
+    """?since= and ?until= of a list endpoint that is not paged (use with Depends())"""
+
+    def __init__(
+        self,
+        since: Optional[datetime] = Query(None, description="Only rows at or after this time"),
+        until: Optional[datetime] = Query(None, description="Only rows before this time")
+    ):
+        self.since = since
+        self.until = until
+
+    def apply(self, stmt: Select, time_column) -> Select:
+        if self.since is not None:
+            stmt = stmt.where(time_column >= self.since)
+        if self.until is not None:
+            stmt = stmt.where(time_column < self.until)
+        return stmt
+
+class PageParams(TimeWindow):
+    """Query parameters of a paginated list endpoint (use with Depends())"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        since: Optional[datetime] = Query(None, description="Only rows at or after this time"),
+        until: Optional[datetime] = Query(None, description="Only rows before this time")
+    ):
+        super().__init__(since, until)
+        self.cursor = cursor
+        self.limit = limit
+
+async def paginate(session: AsyncSession, stmt: Select, time_column, id_column, page: PageParams,
+                   key: Callable[[Any], Tuple[datetime, int]], scalars: bool = True) -> Tuple[list, Optional[str]]:
+    """
+    Apply the time window, cursor and limit to a select ordered by
+    (time_column, id_column) descending and run it. `key` returns the
+    (timestamp, id) of a result row; with scalars=False rows are tuples.
+    Returns the page and the cursor of the next page.
+    """
+    stmt = page.apply(stmt, time_column)
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        try:
+            last_time, last_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(or_(
+            time_column < last_time,
+            and_(time_column == last_time, id_column < last_id)
+        ))
+
+    result = await session.execute(
+        stmt.order_by(time_column.desc(), id_column.desc()).limit(page.limit)
+    )
+    # unique(): joined eager loads of collections repeat the parent row
+    rows = result.scalars().unique().all() if scalars else result.all()
+
+    next_cursor = None
+    if len(rows) == page.limit:
+        next_cursor = encode_cursor(list(key(rows[-1])))
+    return rows, next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
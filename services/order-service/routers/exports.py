@@ -0,0 +1,138 @@
+# order-service/routers/exports.py
+"""
+Streaming exports of the completed order history for accounting.
+
+Rows are read through a server-side cursor (AsyncSession.stream) in
+partitions of EXPORT_CHUNK_ROWS and written out as CSV or NDJSON while
+the query is still running, so memory use does not depend on the date
+range. ?since= and ?until= restrict the export to [since, until).
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Literal, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database_orders import AsyncSessionLocal
+from models import Payment, OrderCompleted, CompletedOrderItem
+
+router = APIRouter()
+
+# Rows fetched from the server-side cursor (and written) per chunk
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Exported columns and the timestamp each dataset is filtered on
+DATASETS = {
+    "payments": (
+        select(
+            Payment.payment_id,
+            Payment.order_completed_id,
+            Payment.amount_paid,
+            Payment.payment_method,
+            Payment.payment_status,
+            Payment.payment_date,
+            Payment.transaction_id,
+            OrderCompleted.employee_id,
+            OrderCompleted.table_id,
+            OrderCompleted.customer_name,
+            OrderCompleted.customer_phone
+        ).join(OrderCompleted, OrderCompleted.order_completed_id == Payment.order_completed_id),
+        Payment.payment_date,
+        Payment.payment_id
+    ),
+    "completed-orders": (
+        select(
+            OrderCompleted.order_completed_id,
+            OrderCompleted.employee_id,
+            OrderCompleted.table_id,
+            OrderCompleted.customer_name,
+            OrderCompleted.customer_phone,
+            OrderCompleted.total_price,
+            OrderCompleted.completed_at
+        ),
+        OrderCompleted.completed_at,
+        OrderCompleted.order_completed_id
+    ),
+    "completed-order-items": (
+        select(
+            CompletedOrderItem.completed_order_item_id,
+            CompletedOrderItem.order_completed_id,
+            CompletedOrderItem.food_id,
+            CompletedOrderItem.quantity,
+            CompletedOrderItem.note,
+            OrderCompleted.completed_at
+        ).join(OrderCompleted, OrderCompleted.order_completed_id == CompletedOrderItem.order_completed_id),
+        OrderCompleted.completed_at,
+        CompletedOrderItem.completed_order_item_id
+    ),
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _csv_chunk(rows: List[list], header: Optional[List[str]] = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+def _ndjson_chunk(columns: List[str], rows: List[list]) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+        for row in rows
+    )
+
+async def stream_rows(dataset: str, fmt: str, since: Optional[datetime],
+                      until: Optional[datetime]) -> AsyncIterator[str]:
+    """Yield the dataset, oldest first, as CSV or NDJSON text chunks"""
+    stmt, time_column, id_column = DATASETS[dataset]
+    if since is not None:
+        stmt = stmt.where(time_column >= since)
+    if until is not None:
+        stmt = stmt.where(time_column < until)
+    stmt = stmt.order_by(time_column, id_column).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+
+    # The request's session is closed before the body is sent, so the
+    # stream opens its own
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(stmt)
+        columns = list(result.keys())
+        if fmt == "csv":
+            yield _csv_chunk([], header=columns)
+        async for partition in result.partitions():
+            if fmt == "csv":
+                yield _csv_chunk(partition)
+            else:
+                yield _ndjson_chunk(columns, partition)
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: Literal["payments", "completed-orders", "completed-order-items"],
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    since: Optional[datetime] = Query(None, description="Only rows at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only rows before this time")
+):
+    """Stream a dataset of the completed order history as CSV or NDJSON"""
+    headers: Dict[str, str] = {
+        "Content-Disposition": f'attachment; filename="{dataset}.{format}"'
+    }
+    return StreamingResponse(
+        stream_rows(dataset, format, since, until),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
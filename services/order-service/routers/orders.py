@@ -1,58 +1,90 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from services import order_service
 from datetime import datetime
-from schemas import OrderCreate, OrderItem, OrderItemCreate
+from schemas import OrderCreate, OrderBatchCreate, OrderItem, OrderItemCreate
+from pagination import PageParams, TimeWindow, set_next_cursor
+from idempotency import idempotency_store
 
 router = APIRouter()
 
 @router.get("/active")
-def get_active_orders():
+async def get_active_orders(window: TimeWindow = Depends()):
     try:
-        orders = order_service.get_active_orders()
-        return orders
+        return await order_service.get_active_orders(window)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/")
-def create_order(order: OrderCreate):
-    try:
-        # 1. Log received order
-        print("Received order data:", order.dict())
-        
-        # 2. Validate order data
-        if not order.items:
+# Maximum number of orders accepted by POST /orders/batch
+MAX_BATCH_ORDERS = 50
+
+def validate_order(order: OrderCreate, prefix: str = ""):
+    """Raise a 422 HTTPException if the order is not valid"""
+    if not order.items:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{prefix}Order must contain at least one item"
+        )
+
+    # Check for duplicate items
+    food_ids = [item.food_id for item in order.items]
+    duplicates = set([x for x in food_ids if food_ids.count(x) > 1])
+    if duplicates:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{prefix}Duplicate food items found: {', '.join(duplicates)}"
+        )
+
+    # Validate individual items
+    for idx, item in enumerate(order.items):
+        if not item.food_id:
             raise HTTPException(
                 status_code=422,
-                detail="Order must contain at least one item"
+                detail=f"{prefix}Item at position {idx} has no food_id"
             )
-            
-        # 3. Check for duplicate items
-        food_ids = [item.food_id for item in order.items]
-        duplicates = set([x for x in food_ids if food_ids.count(x) > 1])
-        if duplicates:
+        if item.quantity <= 0:
             raise HTTPException(
                 status_code=422,
-                detail=f"Duplicate food items found: {', '.join(duplicates)}"
+                detail=f"{prefix}Item {item.food_id} must have quantity greater than 0"
             )
-            
-        # 4. Validate individual items
-        for idx, item in enumerate(order.items):
-            if not item.food_id:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Item at position {idx} has no food_id"
-                )
-            if item.quantity <= 0:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Item {item.food_id} must have quantity greater than 0"
-                )
+
+def order_details(order: OrderCreate) -> dict:
+    return {
+        "employee_id": order.employee_id,
+        "table_id": order.table_id,
+        "status": order.order_status,
+        "total_price": order.total_price,
+        "items": [
+            {
+                "food_id": item.food_id,
+                "quantity": item.quantity,
+                "note": item.note or ""
+            } for item in order.items
+        ]
+    }
+
+@router.post("/")
+async def create_order(order: OrderCreate, response: Response, idempotency_key: Optional[str] = Header(None),
+                       authorization: Optional[str] = Header(None)):
+    """Create an order; a retry with the same Idempotency-Key gets the first response"""
+    return await idempotency_store.run(
+        "POST /orders", idempotency_key, order.dict(), lambda: _create_order(order), response, authorization
+    )
+
+async def _create_order(order: OrderCreate):
+    try:
+        # 1. Log received order
+        print("Received order data:", order.dict())
+        
+        # 2. Validate order data
+        validate_order(order)
                 
-        # 5. Create order in database
+        # 3. Create order in database
         try:
-            order_id = order_service.create_order(order.dict())
+            order_id = await order_service.create_order(order.dict())
         except Exception as e:
             print(f"Database error: {str(e)}")
             raise HTTPException(
@@ -60,23 +92,11 @@ def create_order(order: OrderCreate):
                 detail=f"Failed to create order: {str(e)}"
             )
             
-        # 6. Prepare response
+        # 4. Prepare response
         response_data = {
             "message": "Order created successfully",
             "order_id": order_id,
-            "order_details": {
-                "employee_id": order.employee_id,
-                "table_id": order.table_id,
-                "status": order.order_status,
-                "total_price": order.total_price,
-                "items": [
-                    {
-                        "food_id": item.food_id,
-                        "quantity": item.quantity,
-                        "note": item.note or ""
-                    } for item in order.items
-                ]
-            }
+            "order_details": order_details(order)
         }
         
         print("Order created successfully:", response_data)
@@ -94,9 +114,63 @@ def create_order(order: OrderCreate):
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.post("/batch")
+async def create_orders_batch(batch: OrderBatchCreate, response: Response, idempotency_key: Optional[str] = Header(None),
+                              authorization: Optional[str] = Header(None)):
+    """
+    Create several orders (e.g. a whole party's rounds) in one transaction:
+    either all orders are created or none are. A retry with the same
+    Idempotency-Key gets the first response
+    """
+    return await idempotency_store.run(
+        "POST /orders/batch", idempotency_key, batch.dict(), lambda: _create_orders_batch(batch), response,
+        authorization
+    )
+
+async def _create_orders_batch(batch: OrderBatchCreate):
+    try:
+        if not batch.orders:
+            raise HTTPException(status_code=422, detail="Batch must contain at least one order")
+        if len(batch.orders) > MAX_BATCH_ORDERS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Batch cannot contain more than {MAX_BATCH_ORDERS} orders"
+            )
+
+        for idx, order in enumerate(batch.orders):
+            validate_order(order, prefix=f"Order at position {idx}: ")
+
+        try:
+            order_ids = await order_service.create_orders([order.dict() for order in batch.orders])
+        except Exception as e:
+            print(f"Database error: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to create orders: {str(e)}"
+            )
+
+        return {
+            "message": f"{len(order_ids)} orders created successfully",
+            "order_ids": order_ids,
+            "orders": [
+                {"order_id": order_id, "order_details": order_details(order)}
+                for order_id, order in zip(order_ids, batch.orders)
+            ]
+        }
+
+    except HTTPException as e:
+        print(f"Validation error: {e.detail}")
+        raise e
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
 @router.get("/{order_id}")
-def get_order(order_id: int):
-    order = order_service.get_order_details(order_id)
+async def get_order(order_id: int):
+    order = await order_service.get_order_details(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -105,8 +179,8 @@ class OrderStatusUpdate(BaseModel):
     status: str
 
 @router.put("/{order_id}/status")
-def update_order_status(order_id: int, status_update: OrderStatusUpdate):
-    success = order_service.update_order_status(order_id, status_update.status)
+async def update_order_status(order_id: int, status_update: OrderStatusUpdate):
+    success = await order_service.update_order_status(order_id, status_update.status)
     if not success:
         raise HTTPException(status_code=404, detail="Order not found")
     return {"message": "Order status updated successfully"}
@@ -117,9 +191,9 @@ class OrderUpdate(BaseModel):
     total_price: Optional[float] = None
 
 @router.put("/{order_id}")
-def update_order(order_id: int, order_update: OrderUpdate):
+async def update_order(order_id: int, order_update: OrderUpdate):
     try:
-        success = order_service.update_order(order_id, order_update.dict(exclude_unset=True))
+        success = await order_service.update_order(order_id, order_update.dict(exclude_unset=True))
         if not success:
             raise HTTPException(status_code=404, detail="Order not found")
         return {"message": "Order updated successfully"}
@@ -127,9 +201,9 @@ def update_order(order_id: int, order_update: OrderUpdate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{order_id}/items")
-def add_order_item(order_id: int, item: OrderItem):
+async def add_order_item(order_id: int, item: OrderItem):
     try:
-        success = order_service.add_order_item(order_id, item.dict())
+        success = await order_service.add_order_item(order_id, item.dict())
         if not success:
             raise HTTPException(status_code=404, detail="Order not found")
         return {"message": "Item added successfully"}
@@ -137,9 +211,9 @@ def add_order_item(order_id: int, item: OrderItem):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{order_id}/items/{item_id}")
-def update_order_item(order_id: int, item_id: int, item: OrderItem):
+async def update_order_item(order_id: int, item_id: int, item: OrderItem):
     try:
-        success = order_service.update_order_item(order_id, item_id, item.dict())
+        success = await order_service.update_order_item(order_id, item_id, item.dict())
         if not success:
             raise HTTPException(status_code=404, detail="Order item not found")
         return {"message": "Item updated successfully"}
@@ -147,9 +221,9 @@ def update_order_item(order_id: int, item_id: int, item: OrderItem):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{order_id}/items/{item_id}")
-def delete_order_item(order_id: int, item_id: int):
+async def delete_order_item(order_id: int, item_id: int):
     try:
-        success = order_service.delete_order_item(order_id, item_id)
+        success = await order_service.delete_order_item(order_id, item_id)
         if not success:
             raise HTTPException(status_code=404, detail="Order item not found")
         return {"message": "Item deleted successfully"}
@@ -163,9 +237,9 @@ class PaymentCreate(BaseModel):
     transaction_id: Optional[str] = None
 
 @router.post("/payments")
-def process_payment(payment: PaymentCreate):
+async def process_payment(payment: PaymentCreate):
     try:
-        success = order_service.process_payment(payment.dict())
+        success = await order_service.process_payment(payment.dict())
         if not success:
             raise HTTPException(status_code=400, detail="Payment processing failed")
         return {"message": "Payment processed successfully"}
@@ -173,9 +247,9 @@ def process_payment(payment: PaymentCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/tables")
-def get_all_tables():
+async def get_all_tables():
     try:
-        tables = order_service.get_all_tables()
+        tables = await order_service.get_all_tables()
         return {"tables": tables}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -184,9 +258,9 @@ class TableStatusUpdate(BaseModel):
     table_status: str
 
 @router.put("/tables/{table_id}")
-def update_table_status(table_id: int, status_update: TableStatusUpdate):
+async def update_table_status(table_id: int, status_update: TableStatusUpdate):
     try:
-        success = order_service.update_table_status(table_id, status_update.table_status)
+        success = await order_service.update_table_status(table_id, status_update.table_status)
         if not success:
             raise HTTPException(status_code=404, detail="Table not found")
         return {"message": "Table status updated successfully"}
@@ -194,10 +268,13 @@ def update_table_status(table_id: int, status_update: TableStatusUpdate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/table/{table_id}")
-def get_table_orders(table_id: int):
-    """Get all orders for a specific table"""
+async def get_table_orders(table_id: int, response: Response, page: PageParams = Depends()):
+    """Get orders for a specific table, one page at a time"""
     try:
-        orders = order_service.get_table_orders(table_id)
+        orders, next_cursor = await order_service.get_table_orders(table_id, page)
+        set_next_cursor(response, next_cursor)
         return orders
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
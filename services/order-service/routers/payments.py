@@ -1,20 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
-from database_orders import SessionLocal
-from models import Payment, Order, OrderCompleted, Table
+from database_orders import get_async_db
+from models import Payment, Order, OrderCompleted
 from datetime import datetime
-from services.order_service import migrate_to_completed_order
+from services import settlement_service
+from services.table_registry import table_registry
+from pagination import PageParams, paginate, set_next_cursor
+from idempotency import idempotency_store
 from typing import Optional, Literal, List
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = get_async_db
 
 class PaymentCreate(BaseModel):
     table_id: int
@@ -60,239 +60,180 @@ class ReceiptResponse(BaseModel):
     payment_date: datetime
 
 @router.post("/", response_model=PaymentHistory)
-def create_payment(payment: PaymentCreate, db: Session = Depends(get_db)):
-    try:
-        # 1. Get all pending/preparing/ready_to_serve orders for the table
-        orders = db.query(Order).filter(
-            Order.table_id == payment.table_id,
-            Order.order_status.in_(['pending', 'preparing', 'ready_to_serve', 'completed'])
-        ).all()
-        
-        if not orders:
-            raise HTTPException(
-                status_code=404, 
-                detail="No active orders found for this table"
-            )
+async def create_payment(payment: PaymentCreate, response: Response, idempotency_key: Optional[str] = Header(None),
+                         authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    """
+    Settle a table. A retry with the same Idempotency-Key gets the first
+    payment instead of settling again
+    """
+    return await idempotency_store.run(
+        "POST /payments", idempotency_key, payment.dict(), lambda: _create_payment(payment, db), response,
+        authorization
+    )
 
-        # Update customer information and status for all orders
-        for order in orders:
-            order.customer_name = payment.customer_name
-            order.customer_phone = payment.phone_number
-            order.order_status = 'paid'
-
-        # Calculate total amount for all orders
-        total_amount = sum(order.total_price for order in orders)
-
-        # 2. Create a single completed order that combines all orders
-        first_order = orders[0]
-        order_ids = [order.order_id for order in orders]
-        combined_order_data = {
-            "customer_name": payment.customer_name,
-            "customer_phone": payment.phone_number,
-            "amount_paid": total_amount,
-            "combined_orders": order_ids
-        }
-        
-        completed_order_id = migrate_to_completed_order(
-            first_order.order_id,
-            combined_order_data
-        )
-        
-        # Create a single payment record for all orders
-        new_payment = Payment(
-            order_completed_id=completed_order_id,
-            payment_status='completed',
-            amount_paid=total_amount,
-            payment_date=datetime.now()
+async def _create_payment(payment: PaymentCreate, db: AsyncSession):
+    try:
+        # Settle all unpaid orders of the table in one transaction
+        new_payment, completed_order, order_ids = await settlement_service.settle_table(
+            db,
+            table_id=payment.table_id,
+            customer_name=payment.customer_name,
+            customer_phone=payment.phone_number
         )
-        
-        db.add(new_payment)
-        db.commit()
-        
-        # Get the completed order and its mappings for response
-        completed_order = db.query(OrderCompleted).filter(
-            OrderCompleted.order_completed_id == completed_order_id
-        ).first()
-
-        # Get original order IDs from mapping
-        original_order_ids = [
-            mapping.original_order_id 
-            for mapping in completed_order.original_orders
-        ]
+        await db.commit()
 
         return PaymentHistory(
             payment_id=new_payment.payment_id,
-            order_completed_id=completed_order_id,
-            original_order_ids=original_order_ids,
-            amount=total_amount,
+            order_completed_id=completed_order.order_completed_id,
+            original_order_ids=order_ids,
+            amount=new_payment.amount_paid,
             payment_date=new_payment.payment_date,
             customer_name=completed_order.customer_name,
             customer_phone=completed_order.customer_phone
         )
-            
+
+    except settlement_service.NothingToSettle as e:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-def get_completed_orders_by_phone(phone_number: str, db: Session):
-    """Helper function to get completed orders by phone number"""
-    return db.query(OrderCompleted).filter(
-        OrderCompleted.customer_phone == phone_number
-    ).order_by(OrderCompleted.completed_at.desc()).all()
+def _payments_with_details():
+    """
+    (Payment, OrderCompleted) rows with mappings and items loaded up front
+    (one SELECT ... IN each), so serializing N receipts costs 3 queries
+    """
+    return select(Payment, OrderCompleted).join(
+        OrderCompleted, OrderCompleted.order_completed_id == Payment.order_completed_id
+    ).options(
+        selectinload(OrderCompleted.original_orders),
+        selectinload(OrderCompleted.items)
+    )
 
-def get_payment_for_completed_order(completed_order: OrderCompleted, db: Session):
-    """Helper function to get payment for a completed order"""
-    return db.query(Payment).filter(
-        Payment.order_completed_id == completed_order.order_completed_id
-    ).first()
+async def get_payments_by_phone(phone_number: str, db: AsyncSession):
+    """Helper function to get payments and completed orders by phone number"""
+    result = await db.execute(
+        _payments_with_details().where(
+            OrderCompleted.customer_phone == phone_number
+        ).order_by(OrderCompleted.completed_at.desc())
+    )
+    return result.all()
 
-def create_payment_history(completed_order: OrderCompleted, payment: Payment) -> PaymentHistory:
+def create_payment_history(completed_order: OrderCompleted, payment: Payment) -> dict:
     """Helper function to create payment history object"""
-    original_order_ids = [
-        mapping.original_order_id 
-        for mapping in completed_order.original_orders
-    ]
-    
-    return PaymentHistory(
-        payment_id=payment.payment_id,
-        order_completed_id=completed_order.order_completed_id,
-        original_order_ids=original_order_ids,
-        amount=payment.amount_paid,
-        payment_date=payment.payment_date,
-        customer_name=completed_order.customer_name,
-        customer_phone=completed_order.customer_phone
-    )
+    return {
+        "payment_id": payment.payment_id,
+        "order_completed_id": completed_order.order_completed_id,
+        "original_order_ids": [mapping.original_order_id for mapping in completed_order.original_orders],
+        "amount": payment.amount_paid,
+        "payment_date": payment.payment_date,
+        "customer_name": completed_order.customer_name,
+        "customer_phone": completed_order.customer_phone
+    }
 
 @router.get("/customer/{phone_number}", response_model=List[PaymentHistory])
-def get_customer_payments(phone_number: str, db: Session = Depends(get_db)):
+async def get_customer_payments(phone_number: str, db: AsyncSession = Depends(get_db)):
     """Get all payments for a given customer phone number"""
     try:
-        completed_orders = get_completed_orders_by_phone(phone_number, db)
+        rows = await get_payments_by_phone(phone_number, db)
 
-        if not completed_orders:
+        if not rows:
             raise HTTPException(
                 status_code=404, 
                 detail=f"No payments found for phone number {phone_number}"
             )
 
-        payments = []
-        for completed_order in completed_orders:
-            payment = get_payment_for_completed_order(completed_order, db)
-            if payment:
-                payment_history = create_payment_history(completed_order, payment)
-                payments.append(payment_history)
-
-        return payments
+        return [create_payment_history(completed_order, payment) for payment, completed_order in rows]
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/history", response_model=List[PaymentHistory])
-def get_paid_orders_history(db: Session = Depends(get_db)):
-    """Get all paid orders history"""
+async def get_paid_orders_history(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    """
+    Get paid orders history, newest first, one page at a time (see
+    pagination.py for the cursor and time window parameters)
+    """
     try:
-        # Get all completed orders with their payments
-        completed_orders = db.query(OrderCompleted).join(
-            Payment, OrderCompleted.order_completed_id == Payment.order_completed_id
-        ).order_by(Payment.payment_date.desc()).all()
+        rows, next_cursor = await paginate(
+            db, _payments_with_details(), Payment.payment_date, Payment.payment_id, page,
+            key=lambda row: (row[0].payment_date, row[0].payment_id), scalars=False
+        )
 
-        if not completed_orders:
+        if not rows and page.cursor is None:
             raise HTTPException(status_code=404, detail="No paid orders found")
 
-        payments = []
-        for completed_order in completed_orders:
-            payment = get_payment_for_completed_order(completed_order, db)
-            if payment:
-                payment_history = create_payment_history(completed_order, payment)
-                payments.append(payment_history)
-
-        return payments
+        set_next_cursor(response, next_cursor)
+        return [create_payment_history(completed_order, payment) for payment, completed_order in rows]
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-def generate_receipt(completed_order: OrderCompleted, payment: Payment) -> ReceiptResponse:
+def generate_receipt(completed_order: OrderCompleted, payment: Payment) -> dict:
     """Helper function to generate receipt in a consistent format"""
     # Get original order IDs from mapping
     original_order_ids = [
         mapping.original_order_id 
         for mapping in completed_order.original_orders
     ]
-    
-    return ReceiptResponse(
-        receipt_id=f"RCP-{completed_order.order_completed_id}-{payment.payment_date.strftime('%Y%m%d')}",
-        order_details=TableOrderDetails(
-            table_id=completed_order.table_id,
-            orders=[
-                OrderDetail(
-                    order_id=original_order_id,  # Use the original order ID
-                    items=[
-                        OrderItemDetail(
-                            food_id=item.food_id,
-                            quantity=item.quantity,
-                            note=item.note
-                        )
-                        for item in completed_order.items
-                    ],
-                    subtotal=completed_order.total_price / len(original_order_ids)  # Split total evenly among original orders
-                )
+    items = [
+        {"food_id": item.food_id, "quantity": item.quantity, "note": item.note}
+        for item in completed_order.items
+    ]
+    # Split total evenly among original orders
+    subtotal = completed_order.total_price / len(original_order_ids) if original_order_ids else 0
+
+    return {
+        "receipt_id": f"RCP-{completed_order.order_completed_id}-{payment.payment_date.strftime('%Y%m%d')}",
+        "order_details": {
+            "table_id": completed_order.table_id,
+            "orders": [
+                {"order_id": original_order_id, "items": items, "subtotal": subtotal}
                 for original_order_id in original_order_ids
             ]
-        ),
-        customer_info=CustomerInfo(
-            name=completed_order.customer_name,
-            phone=completed_order.customer_phone
-        ),
-        employee_info=EmployeeInfo(
-            employee_id=completed_order.employee_id
-        ),
-        total_amount=payment.amount_paid,
-        payment_date=payment.payment_date
-    )
+        },
+        "customer_info": {
+            "name": completed_order.customer_name,
+            "phone": completed_order.customer_phone
+        },
+        "employee_info": {
+            "employee_id": completed_order.employee_id
+        },
+        "total_amount": payment.amount_paid,
+        "payment_date": payment.payment_date
+    }
 
 @router.get("/receipt/phone/{phone_number}", response_model=List[ReceiptResponse])
-def get_receipts_by_phone(phone_number: str, db: Session = Depends(get_db)):
+async def get_receipts_by_phone(phone_number: str, db: AsyncSession = Depends(get_db)):
     """Get all receipts for a given customer phone number"""
     try:
-        completed_orders = get_completed_orders_by_phone(phone_number, db)
+        rows = await get_payments_by_phone(phone_number, db)
 
-        if not completed_orders:
+        if not rows:
             raise HTTPException(
                 status_code=404, 
                 detail=f"No receipts found for phone number {phone_number}"
             )
 
-        receipts = []
-        for completed_order in completed_orders:
-            payment = get_payment_for_completed_order(completed_order, db)
-            if payment:
-                receipt = generate_receipt(completed_order, payment)
-                receipts.append(receipt)
-
-        return receipts
+        return [generate_receipt(completed_order, payment) for payment, completed_order in rows]
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/receipt/{payment_id}", response_model=ReceiptResponse)
-def get_receipt(payment_id: int, db: Session = Depends(get_db)):
+async def get_receipt(payment_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific receipt by payment ID"""
     try:
-        # Get the payment record
-        payment = db.query(Payment).filter(Payment.payment_id == payment_id).first()
-        if not payment:
+        result = await db.execute(_payments_with_details().where(Payment.payment_id == payment_id))
+        row = result.first()
+        if not row:
             raise HTTPException(status_code=404, detail="Payment not found")
 
-        # Get the completed order
-        completed_order = db.query(OrderCompleted).filter(
-            OrderCompleted.order_completed_id == payment.order_completed_id
-        ).first()
-        
-        if not completed_order:
-            raise HTTPException(status_code=404, detail="Completed order not found")
-
-        receipt = generate_receipt(completed_order, payment)
-        return receipt
+        payment, completed_order = row
+        return generate_receipt(completed_order, payment)
 
     except HTTPException as e:
         raise e
@@ -300,10 +241,10 @@ def get_receipt(payment_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/tables")
-def get_all_tables(db: Session = Depends(get_db)):
+async def get_all_tables():
     """Get all tables regardless of their status"""
     try:
-        tables = db.query(Table).all()
+        tables = await table_registry.all()
         if not tables:
             raise HTTPException(status_code=404, detail="No tables found")
             
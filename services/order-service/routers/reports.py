@@ -1,51 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, date
 import calendar
-from typing import Literal
-from database_orders import get_db_connection
-from models import OrderCompleted, CompletedOrderItem
+from typing import Literal, Dict
+from database_orders import get_async_db
+from models import CompletedOrderItem, OrderCompleted, RevenueDaily, RevenueHourly, EmployeeRevenue, Customer, DailyCustomer
+from services import sketch_service
+from services.reporting_service import ReportingService
 
 router = APIRouter(
     tags=["Reports"]
 )
 
+get_db = get_async_db
+
+async def get_daily_revenue(db: AsyncSession, start_day: date, end_day: date) -> Dict[date, float]:
+    """Revenue per day from the daily rollup, for start_day..end_day inclusive"""
+    rows = (await db.execute(select(RevenueDaily.day, RevenueDaily.revenue).where(
+        RevenueDaily.day >= start_day,
+        RevenueDaily.day <= end_day
+    ))).all()
+    return {row.day: float(row.revenue or 0) for row in rows}
+
+async def get_totals(db: AsyncSession, sketches: sketch_service.Sketches = None) -> Dict[str, float]:
+    """All-time totals from the rollups; distinct customers from the sketches"""
+    totals = (await db.execute(select(
+        func.coalesce(func.sum(RevenueDaily.revenue), 0).label('total_sales'),
+        func.coalesce(func.sum(RevenueDaily.order_count), 0).label('total_orders')
+    ))).first()
+    total_customers = (sketches or await sketch_service.load(db)).distinct_customers()
+    return {
+        "total_sales": float(totals.total_sales or 0),
+        "total_customers": int(total_customers or 0),
+        "total_orders": int(totals.total_orders or 0)
+    }
+
 @router.get("/revenue/{time_range}")
 async def get_revenue(
-    time_range: Literal["week", "month", "year"], 
-    db: Session = Depends(get_db_connection)
+    time_range: Literal["day", "week", "month", "year"], 
+    db: AsyncSession = Depends(get_db)
 ):
     """Get revenue data for the specified time range"""
     try:
         now = datetime.now()
         
-        if time_range == "week":
+        if time_range == "day":
+            # Hourly revenue for today
+            start_hour = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            results = (await db.execute(select(RevenueHourly.hour, RevenueHourly.revenue).where(
+                RevenueHourly.hour >= start_hour,
+                RevenueHourly.hour < start_hour + timedelta(days=1)
+            ))).all()
+            hourly = {r.hour: float(r.revenue or 0) for r in results}
+            
+            revenue_data = []
+            for i in range(24):
+                hour = start_hour + timedelta(hours=i)
+                revenue_data.append({
+                    "date": hour.strftime("%H:00"),
+                    "revenue": hourly.get(hour, 0.0)
+                })
+            
+            return revenue_data
+
+        elif time_range == "week":
             # Get start of current week (Monday)
             start_date = now - timedelta(days=now.weekday())
             start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # Query daily revenue for the week
-            results = db.query(
-                func.date(OrderCompleted.completed_at).label('date'),
-                func.coalesce(func.sum(OrderCompleted.total_price), 0).label('revenue')
-            ).filter(
-                OrderCompleted.completed_at >= start_date
-            ).group_by(
-                func.date(OrderCompleted.completed_at)
-            ).all()
+            # Daily revenue for the week
+            daily = await get_daily_revenue(db, start_date.date(), (start_date + timedelta(days=6)).date())
             
             # Create a list for all 7 days
             revenue_data = []
             for i in range(7):
                 date = start_date + timedelta(days=i)
-                revenue = next(
-                    (r.revenue for r in results if r.date == date.date()),
-                    0
-                )
                 revenue_data.append({
                     "date": date.strftime("%d/%m"),
-                    "revenue": float(revenue or 0)
+                    "revenue": daily.get(date.date(), 0.0)
                 })
             
             return revenue_data
@@ -53,36 +86,25 @@ async def get_revenue(
         elif time_range == "month":
             # Get start of current month
             start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            month_end = start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
             
-            # Get weekly revenue for the month using MySQL's YEARWEEK function
-            results = db.query(
-                func.yearweek(OrderCompleted.completed_at).label('week'),
-                func.coalesce(func.sum(OrderCompleted.total_price), 0).label('revenue')
-            ).filter(
-                OrderCompleted.completed_at >= start_date
-            ).group_by(
-                func.yearweek(OrderCompleted.completed_at)
-            ).all()
+            daily = await get_daily_revenue(db, start_date.date(), month_end.date())
             
             # Create weekly ranges
             revenue_data = []
             current_date = start_date
             while current_date.month == start_date.month:
-                week_end = min(
-                    current_date + timedelta(days=6),
-                    start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
-                )
+                week_end = min(current_date + timedelta(days=6), month_end)
                 
-                # Find revenue for the current week
-                week_number = int(current_date.strftime('%Y%W'))
-                revenue = next(
-                    (r.revenue for r in results if r.week == week_number),
-                    0
+                # Sum daily revenue for the current week
+                revenue = sum(
+                    amount for day, amount in daily.items()
+                    if current_date.date() <= day <= week_end.date()
                 )
                 
                 revenue_data.append({
                     "date": f"{current_date.strftime('%d/%m')}-{week_end.strftime('%d/%m')}",
-                    "revenue": float(revenue or 0)
+                    "revenue": float(revenue)
                 })
                 
                 current_date += timedelta(days=7)
@@ -95,101 +117,119 @@ async def get_revenue(
             # Get start of current year
             start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
             
-            # Query monthly revenue for the year using MySQL's MONTH and YEAR functions
-            results = db.query(
-                func.month(OrderCompleted.completed_at).label('month'),
-                func.coalesce(func.sum(OrderCompleted.total_price), 0).label('revenue')
-            ).filter(
-                OrderCompleted.completed_at >= start_date
-            ).group_by(
-                func.month(OrderCompleted.completed_at)
-            ).all()
+            daily = await get_daily_revenue(db, start_date.date(), start_date.replace(month=12, day=31).date())
+            monthly = {}
+            for day, amount in daily.items():
+                monthly[day.month] = monthly.get(day.month, 0.0) + amount
             
             # Create a list for all 12 months
             revenue_data = []
             for month in range(1, 13):
                 date = start_date.replace(month=month)
-                revenue = next(
-                    (r.revenue for r in results if r.month == month),
-                    0
-                )
                 revenue_data.append({
                     "date": date.strftime("%m/%Y"),
-                    "revenue": float(revenue or 0)
+                    "revenue": monthly.get(month, 0.0)
                 })
             
             return revenue_data
 
-        raise HTTPException(status_code=422, detail="Invalid time range. Must be 'week', 'month', or 'year'.")
+        raise HTTPException(status_code=422, detail="Invalid time range. Must be 'day', 'week', 'month', or 'year'.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/statistics/total-sales")
-async def get_total_sales(db: Session = Depends(get_db_connection)):
+async def get_total_sales(db: AsyncSession = Depends(get_db)):
     """Get the total sales (revenue) from all completed orders"""
     try:
-        total_sales = db.query(
-            func.coalesce(func.sum(OrderCompleted.total_price), 0)
-        ).scalar()
-        
         return {
-            "total_sales": float(total_sales or 0)
+            "total_sales": (await get_totals(db))["total_sales"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def get_exact_customer_count(db: AsyncSession, start: date = None, end: date = None) -> int:
+    """Exact distinct customers from the customer rollups (scans them)"""
+    if start is None and end is None:
+        return int(await db.scalar(select(func.count(Customer.customer_phone))) or 0)
+    stmt = select(func.count(func.distinct(DailyCustomer.customer_phone)))
+    if start is not None:
+        stmt = stmt.where(DailyCustomer.day >= start)
+    if end is not None:
+        stmt = stmt.where(DailyCustomer.day <= end)
+    return int(await db.scalar(stmt) or 0)
+
 @router.get("/statistics/total-customers")
-async def get_total_customers(db: Session = Depends(get_db_connection)):
-    """Get the total number of unique customers based on their phone numbers"""
+async def get_total_customers(
+    start: date = Query(None, description="First day (inclusive); all time without start and end"),
+    end: date = Query(None, description="Last day (inclusive)"),
+    exact: bool = Query(False, description="Count exactly instead of estimating (about 1.6% error)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the number of unique customers based on their phone numbers"""
     try:
-        total_customers = db.query(
-            func.count(func.distinct(OrderCompleted.customer_phone))
-        ).scalar()
-        
+        if exact:
+            total_customers = await get_exact_customer_count(db, start, end)
+        else:
+            total_customers = (await sketch_service.load(db, start, end)).distinct_customers()
         return {
-            "total_customers": int(total_customers or 0)
+            "total_customers": total_customers
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/statistics/total-orders")
-async def get_total_orders(db: Session = Depends(get_db_connection)):
+async def get_total_orders(db: AsyncSession = Depends(get_db)):
     """Get the total number of completed orders"""
     try:
-        total_orders = db.query(
-            func.count(OrderCompleted.order_completed_id)
-        ).scalar()
-        
         return {
-            "total_orders": int(total_orders or 0)
+            "total_orders": (await get_totals(db))["total_orders"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def get_exact_top_foods(db: AsyncSession, start: date = None, end: date = None, limit: int = 5):
+    """Exact top foods by total quantity (GROUP BY over completed_order_items)"""
+    stmt = select(
+        CompletedOrderItem.food_id,
+        func.sum(CompletedOrderItem.quantity).label('total_quantity'),
+        func.count(CompletedOrderItem.completed_order_item_id).label('order_count')
+    )
+    if start is not None or end is not None:
+        stmt = stmt.join(
+            OrderCompleted, OrderCompleted.order_completed_id == CompletedOrderItem.order_completed_id
+        )
+        if start is not None:
+            stmt = stmt.where(OrderCompleted.completed_at >= datetime.combine(start, datetime.min.time()))
+        if end is not None:
+            stmt = stmt.where(OrderCompleted.completed_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    results = (await db.execute(stmt.group_by(
+        CompletedOrderItem.food_id
+    ).order_by(
+        func.sum(CompletedOrderItem.quantity).desc()
+    ).limit(limit))).all()
+
+    return [
+        {
+            "food_id": result.food_id,
+            "total_quantity": int(result.total_quantity),
+            "order_count": int(result.order_count)
+        }
+        for result in results
+    ]
+
 @router.get("/statistics/top-foods")
-async def get_top_foods(db: Session = Depends(get_db_connection)):
+async def get_top_foods(
+    start: date = Query(None, description="First day (inclusive); all time without start and end"),
+    end: date = Query(None, description="Last day (inclusive)"),
+    exact: bool = Query(False, description="Aggregate exactly instead of estimating from the sketches"),
+    db: AsyncSession = Depends(get_db)
+):
     """Get the top 5 most ordered foods based on total quantity"""
     try:
-        # Query to get top 5 foods by total quantity ordered
-        results = db.query(
-            CompletedOrderItem.food_id,
-            func.sum(CompletedOrderItem.quantity).label('total_quantity'),
-            func.count(CompletedOrderItem.completed_order_item_id).label('order_count')
-        ).group_by(
-            CompletedOrderItem.food_id
-        ).order_by(
-            func.sum(CompletedOrderItem.quantity).desc()
-        ).limit(5).all()
-        
-        # Format the results with just food_id
-        top_foods = [
-            {
-                "food_id": result.food_id,
-                "total_quantity": int(result.total_quantity),
-                "order_count": int(result.order_count)
-            }
-            for result in results
-        ]
+        if exact:
+            top_foods = await get_exact_top_foods(db, start, end)
+        else:
+            top_foods = (await sketch_service.load(db, start, end)).top_foods(5)
         
         return {
             "top_foods": top_foods
@@ -198,68 +238,36 @@ async def get_top_foods(db: Session = Depends(get_db_connection)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/statistics/dashboard-summary")
-async def get_dashboard_summary(db: Session = Depends(get_db_connection)):
+async def get_dashboard_summary(db: AsyncSession = Depends(get_db)):
     """Get a complete dashboard summary including statistics and top foods"""
     try:
-        # Get basic statistics
-        stats = db.query(
-            func.coalesce(func.sum(OrderCompleted.total_price), 0).label('total_sales'),
-            func.count(func.distinct(OrderCompleted.customer_phone)).label('total_customers'),
-            func.count(OrderCompleted.order_completed_id).label('total_orders')
-        ).first()
-        
-        # Get top 5 foods
-        top_foods_query = db.query(
-            CompletedOrderItem.food_id,
-            func.sum(CompletedOrderItem.quantity).label('total_quantity'),
-            func.count(CompletedOrderItem.completed_order_item_id).label('order_count')
-        ).group_by(
-            CompletedOrderItem.food_id
-        ).order_by(
-            func.sum(CompletedOrderItem.quantity).desc()
-        ).limit(5).all()
+        # All-time sketches serve both the customer count and the top foods
+        sketches = await sketch_service.load(db)
+        stats = await get_totals(db, sketches)
         
         return {
-            "statistics": {
-                "total_sales": float(stats.total_sales or 0),
-                "total_customers": int(stats.total_customers or 0),
-                "total_orders": int(stats.total_orders or 0)
-            },
-            "top_foods": [
-                {
-                    "food_id": food.food_id,
-                    "total_quantity": int(food.total_quantity),
-                    "order_count": int(food.order_count)
-                }
-                for food in top_foods_query
-            ]
+            "statistics": stats,
+            "top_foods": sketches.top_foods(5)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/statistics/employee-summary")
-async def get_employee_summary(db: Session = Depends(get_db_connection)):
+async def get_employee_summary(db: AsyncSession = Depends(get_db)):
     """Get a summary of receipts/orders created by each employee"""
     try:
-        # Query to get summary statistics for each employee
-        results = db.query(
-            OrderCompleted.employee_id,
-            func.count(OrderCompleted.order_completed_id).label('total_orders'),
-            func.coalesce(func.sum(OrderCompleted.total_price), 0).label('total_revenue'),
-            func.coalesce(func.avg(OrderCompleted.total_price), 0).label('average_order_value')
-        ).group_by(
-            OrderCompleted.employee_id
-        ).order_by(
-            func.count(OrderCompleted.order_completed_id).desc()
-        ).all()
+        # Per-employee totals from the rollup
+        results = (await db.scalars(select(EmployeeRevenue).order_by(
+            EmployeeRevenue.order_count.desc()
+        ))).all()
         
         # Format the results
         employee_summaries = [
             {
                 "employee_id": result.employee_id,
-                "total_orders": int(result.total_orders),
-                "total_revenue": float(result.total_revenue),
-                "average_order_value": round(float(result.average_order_value), 2)
+                "total_orders": int(result.order_count),
+                "total_revenue": float(result.revenue),
+                "average_order_value": round(float(result.revenue) / result.order_count, 2) if result.order_count else 0.0
             }
             for result in results
         ]
@@ -269,3 +277,44 @@ async def get_employee_summary(db: Session = Depends(get_db_connection)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# <------------------------Receipt reports------------------------>
+@router.get("/receipts/shift/{employee_id}")
+async def get_shift_receipts(
+    employee_id: int,
+    shift_date: date = Query(None, description="Defaults to today"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sum all receipts created by an employee in their shift on a date"""
+    try:
+        return await ReportingService.get_shift_receipts(db, employee_id, shift_date or date.today())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/daily/{target_date}")
+async def get_daily_receipts(target_date: date, db: AsyncSession = Depends(get_db)):
+    """Receipt summary of a day, by payment method and by employee"""
+    try:
+        return await ReportingService.get_daily_receipts(db, target_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/monthly/{year}/{month}")
+async def get_monthly_receipts(
+    year: int = Path(..., ge=1, le=9998),
+    month: int = Path(..., ge=1, le=12),
+    db: AsyncSession = Depends(get_db)
+):
+    """Receipt summary of a month with a daily breakdown"""
+    try:
+        return await ReportingService.get_monthly_receipts(db, year, month)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/receipts/yearly/{year}")
+async def get_yearly_receipts(year: int = Path(..., ge=1, le=9998), db: AsyncSession = Depends(get_db)):
+    """Receipt summary of a year with a monthly breakdown"""
+    try:
+        return await ReportingService.get_yearly_receipts(db, year)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
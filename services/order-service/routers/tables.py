@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
-from database_orders import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database_orders import get_async_db
 from models import Table
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
-from sqlalchemy import text
+from services.table_registry import TableNotFound, VersionConflict, set_status, table_registry
 
 router = APIRouter()
 
@@ -17,59 +17,95 @@ class TableCreate(TableBase):
 class TableResponse(TableBase):
     table_id: int
     table_status: str
+    version: int
 
     class Config:
         orm_mode = True
 
-def get_db():
-    db = SessionLocal()
+get_db = get_async_db
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Table version from an If-Match header ("3", W/"3" or 3); None for * or no header"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
     try:
-        yield db
-    finally:
-        db.close()
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a table version")
 
 @router.get("/")
-def get_all_tables(db: Session = Depends(get_db)):
-    """Get all tables regardless of their status"""
+async def get_all_tables():
+    """Get all tables regardless of their status (served from memory)"""
     try:
-        tables = db.query(Table).all()
+        tables = await table_registry.all()
         if not tables:
             raise HTTPException(status_code=404, detail="No tables found")
-            
-        return [{"table_id": table.table_id, "table_status": table.table_status} for table in tables]
+
+        return [state.to_dict() for state in tables]
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/available")
-def get_available_tables(db: Session = Depends(get_db)):
-    """Get only available tables"""
+async def get_available_tables():
+    """Get only available tables (served from memory)"""
     try:
-        tables = db.query(Table).filter(Table.table_status == 'available').all()
+        tables = [state for state in await table_registry.all() if state.table_status == 'available']
         if not tables:
             raise HTTPException(status_code=404, detail="No available tables found")
-            
-        return [{"table_id": table.table_id, "table_status": table.table_status} for table in tables]
+
+        return [state.to_dict() for state in tables]
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{table_id}", response_model=TableResponse)
+async def get_table(table_id: int, response: Response):
+    """Get one table; the ETag is its version, for use with If-Match"""
+    state = await table_registry.get(table_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Table not found")
+    response.headers["ETag"] = state.etag
+    return state
+
 @router.put("/{table_id}", response_model=TableResponse)
-def update_table_status(table_id: int, table_data: TableBase, db: Session = Depends(get_db)):
-    table = db.query(Table).filter(Table.table_id == table_id).first()
-    if not table:
+async def update_table_status(table_id: int, table_data: TableBase, response: Response,
+                              if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    """
+    Update a table's status. With If-Match the update only succeeds if the
+    table is still at that version (412 otherwise)
+    """
+    try:
+        state = await set_status(db, table_id, table_data.table_status, expected_version=parse_if_match(if_match))
+    except TableNotFound:
         raise HTTPException(status_code=404, detail="Table not found")
-    
-    table.table_status = table_data.table_status
-    db.commit()
-    db.refresh(table)
-    return table
+    except VersionConflict as e:
+        await db.rollback()
+        table_registry.apply([e.current])
+        raise HTTPException(
+            status_code=412,
+            detail={"message": str(e), "current": e.current.to_dict()},
+            headers={"ETag": e.current.etag}
+        )
+
+    await db.commit()
+    table_registry.apply([state])
+    response.headers["ETag"] = state.etag
+    return state
 
 # Initialize tables if they don't exist or if count < 10
 @router.post("/init", response_model=List[TableResponse])
-def initialize_tables(db: Session = Depends(get_db), _: None = Body(None, include_in_schema=False)):
+async def initialize_tables(db: AsyncSession = Depends(get_db), _: None = Body(None, include_in_schema=False)):
     # Create 10 fresh tables
     tables = [Table(table_status='available') for _ in range(10)]
-    db.bulk_save_objects(tables)
-    db.commit()
-    
-    # Fetch all tables in one query
-    return db.query(Table).all() 
\ No newline at end of file
+    db.add_all(tables)
+    await db.commit()
+
+    # Reload the registry in one query
+    await table_registry.load()
+    return await table_registry.all()
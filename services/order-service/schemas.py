@@ -14,6 +14,9 @@ class OrderCreate(BaseModel):
     total_price: float
     items: List[OrderItemCreate]
 
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate]
+
 class OrderItem(OrderItemCreate):
     order_item_id: int
     order_id: int
@@ -0,0 +1,122 @@
+# order-service/services/connection_manager.py
+"""
+WebSocket connections of the order service.
+
+Every client has a bounded queue of outgoing messages, drained by its
+own sender task. A broadcast encodes the message once and only enqueues
+it, so a slow client never holds up the others. A client whose queue is
+full, or whose send takes longer than WS_SEND_TIMEOUT seconds, is
+evicted (slow consumer); a client whose send fails is removed.
+"""
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional, Set
+from fastapi import WebSocket, status
+
+# Messages queued per client before it is evicted as a slow consumer
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+# Seconds a single send may take before the client is evicted
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+
+class Client:
+    __slots__ = ("websocket", "queue", "sender")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+
+class ConnectionManager:
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, send_timeout: float = WS_SEND_TIMEOUT):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._clients: Dict[WebSocket, Client] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self.connected = 0
+        self.disconnected = 0
+        self.messages_sent = 0
+        self.send_errors = 0
+        self.slow_consumers_evicted = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = Client(websocket, self.queue_size)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self._clients[websocket] = client
+        self.connected += 1
+
+    def disconnect(self, websocket: WebSocket):
+        """Forget a client (e.g. after it disconnected) and stop its sender"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        self.disconnected += 1
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+
+    async def _close(self, websocket: WebSocket, reason: str):
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=reason), self.send_timeout
+            )
+        except Exception:
+            pass  # Already gone
+        finally:
+            self._closing.discard(asyncio.current_task())
+
+    def _evict(self, client: Client, reason: str):
+        """Drop a slow consumer now and close its socket in the background"""
+        self.slow_consumers_evicted += 1
+        print(f"⚠️ Evicting WebSocket client: {reason}")
+        self.disconnect(client.websocket)
+        self._closing.add(asyncio.create_task(self._close(client.websocket, reason)))
+
+    async def _send_loop(self, client: Client):
+        while True:
+            text = await client.queue.get()
+            try:
+                await asyncio.wait_for(client.websocket.send_text(text), self.send_timeout)
+                self.messages_sent += 1
+            except asyncio.TimeoutError:
+                self._evict(client, "Send timeout")
+                return
+            except Exception as e:
+                self.send_errors += 1
+                print(f"⚠️ Removing WebSocket client after send error: {str(e)}")
+                self.disconnect(client.websocket)
+                return
+
+    def _enqueue(self, client: Client, text: str):
+        try:
+            client.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self._evict(client, "Too many queued messages")
+
+    def send(self, websocket: WebSocket, message: Dict[str, Any]):
+        """Queue a message for one client"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._enqueue(client, json.dumps(message))
+
+    def broadcast(self, message: Dict[str, Any]):
+        """Queue a message for every client; never waits on a client"""
+        text = json.dumps(message)
+        for client in list(self._clients.values()):
+            self._enqueue(client, text)
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [client.queue.qsize() for client in self._clients.values()]
+        return {
+            "clients": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.queue_size,
+            "connected": self.connected,
+            "disconnected": self.disconnected,
+            "messages_sent": self.messages_sent,
+            "send_errors": self.send_errors,
+            "slow_consumers_evicted": self.slow_consumers_evicted
+        }
+
+connection_manager = ConnectionManager()
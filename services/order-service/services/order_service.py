@@ -1,122 +1,183 @@
 # order-service/services/order_service.py
 from datetime import datetime
-from database_orders import get_db_connection
-import json
+from database_orders import AsyncSessionLocal
+from models import Order, OrderItem, Table
+from pagination import PageParams, TimeWindow, paginate
+from services import outbox
+from services.outbox import outbox_dispatcher
+from services.table_registry import (
+    TableNotFound, TableState, VersionConflict, set_status, set_statuses, table_registry
+)
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, Any, List, Tuple
 
-from datetime import datetime
-from database_orders import get_db_connection
-from models import Order, OrderItem, Table, OrderCompleted, CompletedOrderMapping, CompletedOrderItem
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+def serialize_order(order: Order, include_customer: bool = False) -> Dict[str, Any]:
+    """
+    Convert an Order (with items and table already loaded) to a dictionary
+    """
+    order_dict = {
+        "order_id": order.order_id,
+        "employee_id": order.employee_id,
+        "table_id": order.table_id,
+        "order_status": order.order_status,
+        "total_price": order.total_price,
+        "created_at": order.created_at.isoformat()
+    }
+    if include_customer:
+        order_dict["customer_name"] = order.customer_name
+        order_dict["customer_phone"] = order.customer_phone
+
+    order_dict['items'] = [{
+        "food_id": item.food_id,
+        "quantity": item.quantity,
+        "note": item.note
+    } for item in order.items]
+
+    if order.table:
+        order_dict['table_status'] = order.table.table_status
+
+    return order_dict
+
+def _orders_with_details():
+    """
+    Order select that loads items and table in the same statement (LEFT
+    JOINs), so serializing N orders costs one query however large N is.
+    A selectin load would add one SELECT ... IN per 500 orders.
+    Results need .unique(): each order comes back once per item
+    """
+    return select(Order).options(
+        joinedload(Order.items),
+        joinedload(Order.table)
+    )
 
-def create_order(order_data: Dict[str, Any]):
-    session: Session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
+VALID_NEW_ORDER_STATUSES = ['pending', 'preparing', 'ready_to_serve', 'completed', 'cancelled']
 
-    try:
+async def _insert_orders(session: AsyncSession, orders_data: List[Dict[str, Any]]) -> Tuple[List[int], list]:
+    """
+    Insert orders and their items without committing: one INSERT per order
+    (to get its ID), one multi-row INSERT for all items and one UPDATE for
+    the tables' status, plus one outbox event per order for the kitchen.
+    Returns the order IDs and the new table states
+    """
+    now = datetime.now()
+    order_ids = []
+    item_rows = []
+    events = []
+    for order_data in orders_data:
         # Create order with explicit order_status validation
         order_status = order_data.get("order_status", "pending")
-        if order_status not in ['pending', 'preparing', 'ready_to_serve', 'completed', 'cancelled']:
+        if order_status not in VALID_NEW_ORDER_STATUSES:
             raise ValueError(f"Invalid order status: {order_status}")
 
-        new_order = Order(
+        result = await session.execute(insert(Order).values(
             employee_id=order_data["employee_id"],
             table_id=order_data["table_id"],
             order_status=order_status,
             total_price=order_data["total_price"],
-            created_at=datetime.now()
-        )
-        session.add(new_order)
-        session.commit()
-        session.refresh(new_order)  # Get ID after insert
-
-        # Add food items to the order
-        if "items" in order_data:
-            for item in order_data["items"]:
-                order_item = OrderItem(
-                    order_id=new_order.order_id,
-                    food_id=str(item["food_id"]),  # Ensure food_id is string
-                    quantity=item["quantity"],
-                    note=item.get("note", "")
-                )
-                session.add(order_item)
+            created_at=now
+        ))
+        order_id = result.inserted_primary_key[0]
+        order_ids.append(order_id)
+        events.append((f"{outbox.ORDER_CREATED}:{order_id}", outbox.order_created_payload(order_id, order_data, now)))
+
+        item_rows.extend({
+            "order_id": order_id,
+            "food_id": str(item["food_id"]),  # Ensure food_id is string
+            "quantity": item["quantity"],
+            "note": item.get("note", "")
+        } for item in order_data.get("items") or [])
+
+    # Add food items to all orders in one statement
+    if item_rows:
+        await session.execute(insert(OrderItem), item_rows)
+
+    # Committed with the orders; delivered to the kitchen by the dispatcher
+    await outbox.add_events(session, outbox.ORDER_CREATED, events)
 
-        # Update table status
-        table = session.query(Table).filter_by(table_id=order_data["table_id"]).first()
-        if table:
-            table.table_status = "occupied"
-        
-        session.commit()
-        return new_order.order_id
+    # Mark the tables occupied
+    table_ids = {order_data["table_id"] for order_data in orders_data}
+    table_states = await set_statuses(session, table_ids, "occupied")
+    return order_ids, table_states
 
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+async def create_orders(orders_data: List[Dict[str, Any]]) -> List[int]:
+    """
+    Create several orders in a single transaction: either all of them
+    are created or none are
+    """
+    async with AsyncSessionLocal() as session:
+        try:
+            order_ids, table_states = await _insert_orders(session, orders_data)
+            await session.commit()
+            table_registry.apply(table_states)
+            outbox_dispatcher.notify()
+            return order_ids
+
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+async def create_order(order_data: Dict[str, Any]):
+    return (await create_orders([order_data]))[0]
 
 
-def update_order_status(order_id: int, status: str):
+async def update_order_status(order_id: int, status: str):
     """
     Update order status with proper status flow:
     pending -> preparing -> ready_to_serve -> completed
     Any status can go to cancelled
     """
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        order = session.query(Order).filter(Order.order_id == order_id).first()
-        if not order:
-            return False
+    async with AsyncSessionLocal() as session:
+        try:
+            order = await session.get(Order, order_id)
+            if not order:
+                return False
 
-        # Validate status transition
-        valid_transitions = {
-            'pending': ['preparing', 'cancelled'],
-            'preparing': ['ready_to_serve', 'cancelled'],
-            'ready_to_serve': ['completed', 'cancelled'],
-            'completed': [],  # No transitions from completed
-            'cancelled': []   # No transitions from cancelled
-        }
+            # Validate status transition
+            valid_transitions = {
+                'pending': ['preparing', 'cancelled'],
+                'preparing': ['ready_to_serve', 'cancelled'],
+                'ready_to_serve': ['completed', 'cancelled'],
+                'completed': [],  # No transitions from completed
+                'cancelled': []   # No transitions from cancelled
+            }
 
-        if status not in valid_transitions.get(order.order_status, []):
-            raise Exception(f"Invalid status transition from {order.order_status} to {status}")
+            if status not in valid_transitions.get(order.order_status, []):
+                raise Exception(f"Invalid status transition from {order.order_status} to {status}")
 
-        # Update order status
-        order.order_status = status
-        
-        # If order is completed or cancelled, update table status if no other active orders
-        if status in ['completed', 'cancelled']:
-            table = session.query(Table).filter(Table.table_id == order.table_id).first()
-            if table:
+            # Update order status
+            order.order_status = status
+            await session.flush()
+
+            # If order is completed or cancelled, update table status if no other active orders
+            table_states = []
+            if status in ['completed', 'cancelled'] and order.table_id is not None:
                 # Check if there are any other active orders for this table
-                active_orders = session.query(Order).filter(
-                    Order.table_id == table.table_id,
-                    Order.order_status.in_(['pending', 'preparing', 'ready_to_serve'])
-                ).count()
-                
+                active_orders = await session.scalar(
+                    select(func.count(Order.order_id)).where(
+                        Order.table_id == order.table_id,
+                        Order.order_status.in_(['pending', 'preparing', 'ready_to_serve'])
+                    )
+                )
+
                 if active_orders == 0:
-                    table.table_status = 'available'
+                    table_states = await set_statuses(session, [order.table_id], 'available')
+
+            await session.commit()
+            table_registry.apply(table_states)
+            return True
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+async def get_order_details(order_id: int):
+    async with AsyncSessionLocal() as session:
+        # Get order with its items
+        order = await session.scalar(
+            select(Order).options(selectinload(Order.items)).where(Order.order_id == order_id)
+        )
 
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def get_order_details(order_id: int):
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        # Get order with table information
-        order = session.query(Order).filter(Order.order_id == order_id).first()
-        
         if not order:
             return None
 
@@ -130,270 +191,123 @@ def get_order_details(order_id: int):
             "created_at": order.created_at
         }
 
-        # Get order items
-        items = session.query(OrderItem).filter(OrderItem.order_id == order_id).all()
         order_dict['items'] = [{
             "food_id": item.food_id,
             "quantity": item.quantity,
             "note": item.note
-        } for item in items]
-        
+        } for item in order.items]
+
         return order_dict
-    finally:
-        session.close()
-
-
-def get_available_tables():
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        tables = session.query(Table).filter_by(table_status='available').all()
-        return [{"table_id": table.table_id, "status": table.table_status} for table in tables]
-    finally:
-        session.close()
-
-def reserve_table(table_id: int):
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        table = session.query(Table).filter_by(table_id=table_id).first()
-        if table and table.table_status == 'available':
-            table.table_status = 'occupied'
-            session.commit()
-            return True
-        return False
-    finally:
-        session.close()
-
-
-def create_table(table_data: dict):
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        new_table = Table(
-            table_id=table_data["table_id"],
-            table_status=table_data["table_status"]
-        )
-        session.add(new_table)
-        session.commit()
-        return {"table_id": new_table.table_id, "status": new_table.table_status}
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def update_table_status(table_id: int, status: str):
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        table = session.query(Table).filter_by(table_id=table_id).first()
-        if table:
-            table.table_status = status
-            session.commit()
-            return True
+
+
+async def get_available_tables():
+    return [
+        {"table_id": state.table_id, "status": state.table_status}
+        for state in await table_registry.all() if state.table_status == 'available'
+    ]
+
+async def reserve_table(table_id: int):
+    state = await table_registry.get(table_id)
+    if not state or state.table_status != 'available':
         return False
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def update_order(order_id: int, order_data: dict):
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        order = session.query(Order).filter(Order.order_id == order_id).first()
-        if not order:
+    async with AsyncSessionLocal() as session:
+        try:
+            # Only succeeds if the table is still available in the database
+            state = await set_status(session, table_id, 'occupied', expected_status='available')
+        except (TableNotFound, VersionConflict):
+            table_registry.invalidate()
             return False
-        if "employee_id" in order_data:
-            order.employee_id = order_data["employee_id"]
-        if "table_id" in order_data:
-            order.table_id = order_data["table_id"]
-        if "total_price" in order_data:
-            order.total_price = order_data["total_price"]
-            
-        session.commit()
+        await session.commit()
+        table_registry.apply([state])
         return True
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def get_active_orders():
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        # Get orders that are pending, preparing, or ready to serve
-        active_orders = session.query(Order).filter(
-            Order.order_status.in_(['pending', 'preparing', 'ready_to_serve'])
-        ).order_by(Order.created_at.desc()).all()
-        
-        # Convert to list of dictionaries with items
-        result = []
-        for order in active_orders:
-            order_dict = {
-                "order_id": order.order_id,
-                "employee_id": order.employee_id,
-                "table_id": order.table_id,
-                "order_status": order.order_status,
-                "total_price": order.total_price,
-                "created_at": order.created_at.isoformat()
-            }
-            
-            # Get items for this order
-            items = session.query(OrderItem).filter(OrderItem.order_id == order.order_id).all()
-            order_dict['items'] = [{
-                "food_id": item.food_id,
-                "quantity": item.quantity,
-                "note": item.note
-            } for item in items]
-            
-            # Get table information
-            table = session.query(Table).filter(Table.table_id == order.table_id).first()
-            if table:
-                order_dict['table_status'] = table.table_status
-            
-            result.append(order_dict)
-            
-        return result
-    except Exception as e:
-        raise e
-    finally:
-        session.close()
-
-def migrate_to_completed_order(order_id: int, payment_data: dict):
+
+
+async def create_table(table_data: dict):
+    async with AsyncSessionLocal() as session:
+        try:
+            new_table = Table(
+                table_id=table_data["table_id"],
+                table_status=table_data["table_status"]
+            )
+            session.add(new_table)
+            await session.commit()
+            table_registry.apply([TableState(new_table.table_id, new_table.table_status, new_table.version)])
+            return {"table_id": new_table.table_id, "status": new_table.table_status}
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+async def update_table_status(table_id: int, status: str, expected_version: int = None):
     """
-    Migrate an order to completed_orders table with payment information
-    If payment_data contains combined_orders, it will combine multiple orders into one completed order
+    Set a table's status. With expected_version the update is rejected
+    (VersionConflict) if the table changed since that version
     """
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        # Get the main order
-        order = session.query(Order).filter(Order.order_id == order_id).first()
-        if not order:
-            raise Exception(f"Order {order_id} not found")
-
-        # Create completed order
-        completed_order = OrderCompleted(
-            employee_id=order.employee_id,
-            customer_name=payment_data["customer_name"],
-            customer_phone=payment_data["customer_phone"],
-            table_id=order.table_id,
-            total_price=payment_data["amount_paid"],
-            completed_at=datetime.now()
+    async with AsyncSessionLocal() as session:
+        try:
+            state = await set_status(session, table_id, status, expected_version=expected_version)
+            await session.commit()
+            table_registry.apply([state])
+            return state
+        except TableNotFound:
+            await session.rollback()
+            return None
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+async def update_order(order_id: int, order_data: dict):
+    async with AsyncSessionLocal() as session:
+        try:
+            order = await session.get(Order, order_id)
+            if not order:
+                return False
+            if "employee_id" in order_data:
+                order.employee_id = order_data["employee_id"]
+            if "table_id" in order_data:
+                order.table_id = order_data["table_id"]
+            if "total_price" in order_data:
+                order.total_price = order_data["total_price"]
+
+            await session.commit()
+            return True
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+def _order_key(order: Order):
+    return order.created_at, order.order_id
+
+async def get_active_orders(window: TimeWindow):
+    """
+    Get all active orders, newest first. Not paged: the waiter and kitchen
+    screens need every active order, and only orders still in progress
+    are active
+    """
+    async with AsyncSessionLocal() as session:
+        # Get orders that are pending, preparing, or ready to serve
+        stmt = window.apply(
+            _orders_with_details().where(
+                Order.order_status.in_(['pending', 'preparing', 'ready_to_serve'])
+            ),
+            Order.created_at
         )
-        session.add(completed_order)
-        session.flush()  # Get the ID without committing
-
-        # Get all order IDs that are being combined
-        order_ids = payment_data.get("combined_orders", [order_id])
-        
-        # Create mappings for all original orders
-        for original_order_id in order_ids:
-            mapping = CompletedOrderMapping(
-                completed_order_id=completed_order.order_completed_id,
-                original_order_id=original_order_id
-            )
-            session.add(mapping)
-
-        # If this is a combined order, get items from all orders
-        if "combined_orders" in payment_data:
-            all_orders = session.query(Order).filter(
-                Order.order_id.in_(payment_data["combined_orders"])
-            ).all()
-            
-            # Copy items from all orders
-            for source_order in all_orders:
-                for item in source_order.items:
-                    # Create new completed order item
-                    completed_item = CompletedOrderItem(
-                        order_completed_id=completed_order.order_completed_id,
-                        food_id=item.food_id,
-                        quantity=item.quantity,
-                        note=item.note
-                    )
-                    session.add(completed_item)
-        else:
-            # Copy items from single order
-            for item in order.items:
-                completed_item = CompletedOrderItem(
-                    order_completed_id=completed_order.order_completed_id,
-                    food_id=item.food_id,
-                    quantity=item.quantity,
-                    note=item.note
-                )
-                session.add(completed_item)
+        active_orders = (await session.scalars(
+            stmt.order_by(Order.created_at.desc(), Order.order_id.desc())
+        )).unique().all()
 
-        session.commit()
-        return completed_order.order_completed_id
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+        return [serialize_order(order) for order in active_orders]
 
-def get_table_orders(table_id: int):
+async def get_table_orders(table_id: int, page: PageParams):
     """
-    Get all orders for a specific table, including completed and paid orders
+    Get one page of orders for a specific table, including completed and
+    paid orders, newest first. Returns the orders and the next page cursor
     """
-    session = get_db_connection()
-    if not session:
-        raise Exception("Database connection failed")
-    
-    try:
-        # Get all orders for the specified table
-        table_orders = session.query(Order).filter(
-            Order.table_id == table_id
-        ).order_by(Order.created_at.desc()).all()
-        
-        # Convert to list of dictionaries with items
-        result = []
-        for order in table_orders:
-            order_dict = {
-                "order_id": order.order_id,
-                "employee_id": order.employee_id,
-                "table_id": order.table_id,
-                "order_status": order.order_status,
-                "total_price": order.total_price,
-                "created_at": order.created_at.isoformat(),
-                "customer_name": order.customer_name,
-                "customer_phone": order.customer_phone
-            }
-            
-            # Get items for this order
-            items = session.query(OrderItem).filter(OrderItem.order_id == order.order_id).all()
-            order_dict['items'] = [{
-                "food_id": item.food_id,
-                "quantity": item.quantity,
-                "note": item.note
-            } for item in items]
-            
-            # Get table information
-            table = session.query(Table).filter(Table.table_id == order.table_id).first()
-            if table:
-                order_dict['table_status'] = table.table_status
-            
-            result.append(order_dict)
-            
-        return result
-    except Exception as e:
-        raise e
-    finally:
-        session.close()
\ No newline at end of file
+    async with AsyncSessionLocal() as session:
+        # Get orders for the specified table
+        table_orders, next_cursor = await paginate(
+            session,
+            _orders_with_details().where(Order.table_id == table_id),
+            Order.created_at, Order.order_id, page, key=_order_key
+        )
+
+        return [serialize_order(order, include_customer=True) for order in table_orders], next_cursor
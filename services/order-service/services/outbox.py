@@ -0,0 +1,234 @@
+# order-service/services/outbox.py
+"""
+Transactional outbox for events other services must see.
+
+Events are inserted into the outbox table in the same transaction as
+the change they describe, so an order exists if and only if its
+"order_created" event does. A background dispatcher delivers pending
+events to kitchen-service in batches and marks them dispatched; a
+failed batch is retried with exponential backoff. Delivery is at least
+once: every event carries an idempotency key and the receiver ignores
+keys it has already seen.
+
+Replicas share the table. A dispatcher claims a batch in a short
+transaction (SELECT ... FOR UPDATE SKIP LOCKED, then next_attempt_at is
+pushed OUTBOX_CLAIM_SECONDS ahead as a lease and committed), delivers it
+with no transaction or row lock held, and records the outcome in a
+second short transaction. A dispatcher that dies mid-delivery leaves
+its rows to be picked up again when the lease runs out.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database_orders import AsyncSessionLocal
+from models import OutboxEvent
+
+KITCHEN_SERVICE_URL = os.getenv("KITCHEN_SERVICE_URL", "http://kitchen-service:8000")
+
+# Events delivered per request
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+# Seconds between polls when nothing wakes the dispatcher
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+# Retry backoff of a failed batch (seconds)
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "1"))
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "60"))
+# Seconds a delivery request may take
+OUTBOX_DELIVERY_TIMEOUT = float(os.getenv("OUTBOX_DELIVERY_TIMEOUT", "5"))
+# Seconds a claimed batch is reserved for its dispatcher; longer than a delivery
+OUTBOX_CLAIM_SECONDS = float(os.getenv("OUTBOX_CLAIM_SECONDS", "30"))
+# Dispatched events are deleted after this many hours
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+ORDER_CREATED = "order_created"
+
+# Event type -> kitchen-service endpoint taking {"events": [...]}
+DELIVERY_PATHS = {
+    ORDER_CREATED: "/kitchen_orders/batch",
+}
+
+async def add_events(session: AsyncSession, event_type: str, events: List[Tuple[str, Dict[str, Any]]]):
+    """
+    Queue (idempotency key, payload) events in the caller's transaction,
+    in one INSERT (does not commit)
+    """
+    if not events:
+        return
+    now = datetime.utcnow()
+    await session.execute(insert(OutboxEvent), [{
+        "event_type": event_type,
+        "idempotency_key": key,
+        "payload": json.dumps(payload, default=str),
+        "created_at": now,
+        "next_attempt_at": now
+    } for key, payload in events])
+
+def order_created_payload(order_id: int, order_data: Dict[str, Any], created_at: datetime) -> Dict[str, Any]:
+    """The kitchen's view of a new order"""
+    return {
+        "order_id": str(order_id),
+        "table_id": str(order_data["table_id"]),
+        "items": [{
+            "item_id": str(item["food_id"]),
+            "quantity": item["quantity"],
+            "notes": item.get("note") or None
+        } for item in order_data.get("items") or []],
+        "priority": "normal",
+        "status": "pending",
+        "created_at": created_at.isoformat()
+    }
+
+def retry_delay(attempts: int) -> float:
+    return min(OUTBOX_RETRY_MAX_DELAY, OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+class OutboxDispatcher:
+    """Background task delivering pending outbox events"""
+
+    def __init__(self, base_url: str = KITCHEN_SERVICE_URL, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._purged_at = 0.0
+        self.delivered = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_error: Optional[str] = None
+
+    def notify(self):
+        """Deliver new events now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _deliver(self, rows: List[OutboxEvent]):
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_type.setdefault(row.event_type, []).append(
+                {"idempotency_key": row.idempotency_key, **json.loads(row.payload)}
+            )
+        for event_type, events in by_type.items():
+            response = await self._client.post(DELIVERY_PATHS[event_type], json={"events": events})
+            response.raise_for_status()
+
+    async def _claim(self) -> Tuple[List[OutboxEvent], datetime]:
+        """
+        Lease a batch of due events to this dispatcher and commit; returns the
+        rows and the lease's end, which also identifies the claim
+        """
+        async with AsyncSessionLocal() as session:
+            now = datetime.utcnow()
+            rows = (await session.scalars(
+                select(OutboxEvent).where(
+                    OutboxEvent.dispatched_at.is_(None),
+                    OutboxEvent.next_attempt_at <= now
+                ).order_by(OutboxEvent.id).limit(self.batch_size).with_for_update(skip_locked=True)
+            )).all()
+            # Whole seconds: MySQL DATETIME columns drop the fraction
+            lease_until = (now + timedelta(seconds=OUTBOX_CLAIM_SECONDS)).replace(microsecond=0)
+            for row in rows:
+                row.attempts += 1
+                row.next_attempt_at = lease_until
+            await session.commit()
+            return rows, lease_until
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of due events; returns how many were delivered"""
+        rows, lease_until = await self._claim()
+        if not rows:
+            return 0
+        ids = [row.id for row in rows]
+
+        try:
+            await self._deliver(rows)
+        except Exception as e:
+            # The whole batch is retried; the receiver drops the events it already has
+            self.failed_batches += 1
+            self.last_error = str(e)
+            async with AsyncSessionLocal() as session:
+                now = datetime.utcnow()
+                # Rows whose lease ran out may have been claimed by another dispatcher since
+                for row in (await session.scalars(select(OutboxEvent).where(
+                    OutboxEvent.id.in_(ids),
+                    OutboxEvent.dispatched_at.is_(None),
+                    OutboxEvent.next_attempt_at == lease_until
+                ))).all():
+                    row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+                    row.last_error = str(e)[:1000]
+                await session.commit()
+            print(f"⚠️ Outbox delivery of {len(rows)} events failed: {str(e)}")
+            return 0
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_(ids)).values(dispatched_at=datetime.utcnow())
+            )
+            await session.commit()
+        self.delivered += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    async def purge(self):
+        """Delete events dispatched longer ago than the retention period"""
+        cutoff = datetime.utcnow() - timedelta(hours=OUTBOX_RETENTION_HOURS)
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.dispatched_at < cutoff))
+            await session.commit()
+
+    async def _run(self):
+        while True:
+            # Cleared before draining, so events queued meanwhile wake the next round
+            self._wakeup.clear()
+            try:
+                # Drain everything due, then wait for new events or the next poll
+                while await self.dispatch_once() == self.batch_size:
+                    pass
+                if time.monotonic() - self._purged_at > 3600:
+                    self._purged_at = time.monotonic()
+                    await self.purge()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Outbox dispatcher error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=OUTBOX_DELIVERY_TIMEOUT)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stats(self) -> Dict[str, Any]:
+        async with AsyncSessionLocal() as session:
+            pending, oldest = (await session.execute(
+                select(func.count(), func.min(OutboxEvent.created_at)).where(OutboxEvent.dispatched_at.is_(None))
+            )).one()
+        return {
+            "pending": pending,
+            "oldest_pending_seconds": round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else None,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_error": self.last_error
+        }
+
+outbox_dispatcher = OutboxDispatcher()
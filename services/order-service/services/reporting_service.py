@@ -1,277 +1,237 @@
+# order-service/services/reporting_service.py
+"""
+Receipt reports per employee shift, day, month and year.
+
+Each report is a handful of GROUP BY queries over payments joined to
+orders_completed. Once a period has ended its payments can no longer
+change (payments are always dated now), so closed-period reports are
+kept in an in-process cache keyed by (report type, period) and never
+recomputed. Reports for a period that is still open are always computed
+from the database.
+"""
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
-from typing import Dict, Any, List, Optional
-from database_orders import get_db_connection
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from sqlalchemy import Date, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Payment, OrderCompleted, CompletedOrderMapping
+
+# Closed-period reports kept in memory (least recently used are dropped first)
+MAX_CACHED_REPORTS = 1024
+# A period counts as closed this long after it ends, so that checkouts
+# dated just before the end have committed
+CLOSE_GRACE = timedelta(minutes=5)
+
+_report_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+async def _cached(key: Tuple, period_end: datetime,
+                  compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Return the report for `key`, caching it if its period has ended"""
+    if key in _report_cache:
+        _report_cache.move_to_end(key)
+        return _report_cache[key]
+
+    report = await compute()
+    if period_end + CLOSE_GRACE <= datetime.now():
+        _report_cache[key] = report
+        if len(_report_cache) > MAX_CACHED_REPORTS:
+            _report_cache.popitem(last=False)
+    return report
+
+def clear_cache():
+    """Drop all cached reports (e.g. after backfilling or correcting payments)"""
+    _report_cache.clear()
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def _in_period(stmt, start: datetime, end: datetime):
+    return stmt.where(Payment.payment_date >= start, Payment.payment_date < end)
+
+def _payments():
+    return select().select_from(Payment).join(
+        OrderCompleted, OrderCompleted.order_completed_id == Payment.order_completed_id
+    )
+
+async def _summary(session: AsyncSession, start: datetime, end: datetime, *filters) -> Dict[str, Any]:
+    """Receipt count, amount and number of original orders in [start, end)"""
+    totals = (await session.execute(
+        _in_period(_payments(), start, end).add_columns(
+            func.count(Payment.payment_id).label('total_receipts'),
+            func.coalesce(func.sum(Payment.amount_paid), 0).label('total_amount'),
+            func.count(func.distinct(OrderCompleted.employee_id)).label('total_employees')
+        ).where(*filters)
+    )).one()
+    # Counted separately: joining the mappings above would repeat each payment
+    total_orders = await session.scalar(
+        _in_period(_payments(), start, end).join(
+            CompletedOrderMapping,
+            CompletedOrderMapping.completed_order_id == OrderCompleted.order_completed_id
+        ).add_columns(func.count(CompletedOrderMapping.id)).where(*filters)
+    )
+    return {
+        "total_receipts": int(totals.total_receipts),
+        "total_amount": float(totals.total_amount),
+        "total_orders": int(total_orders or 0),
+        "total_employees": int(totals.total_employees)
+    }
+
+async def _daily_totals(session: AsyncSession, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Receipt count and amount per calendar day in [start, end)"""
+    day = func.date(Payment.payment_date, type_=Date).label('day')
+    rows = (await session.execute(
+        _in_period(select(
+            day,
+            func.count(Payment.payment_id).label('receipt_count'),
+            func.coalesce(func.sum(Payment.amount_paid), 0).label('total')
+        ), start, end).group_by(day).order_by(day)
+    )).all()
+    return [
+        {"day": row.day, "receipt_count": int(row.receipt_count), "total": float(row.total)}
+        for row in rows
+    ]
 
 class ReportingService:
     @staticmethod
-    def get_shift_receipts(employee_id: int, shift_date: date) -> Dict[str, Any]:
+    async def get_shift_receipts(session: AsyncSession, employee_id: int, shift_date: date) -> Dict[str, Any]:
         """
         Sum all receipts created by an employee in their shift on a specific date
         """
-        connection = get_db_connection()
-        if not connection:
-            raise Exception("Database connection failed")
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            
-            # Calculate shift start and end (default to full day if shift info not provided)
-            shift_start = datetime.combine(shift_date, datetime.min.time())
-            shift_end = datetime.combine(shift_date, datetime.max.time())
-            
-            query = """
-            SELECT 
-                COUNT(p.payment_id) as total_receipts,
-                SUM(p.amount) as total_amount,
-                COUNT(DISTINCT o.order_id) as total_orders
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                o.employee_id = %s
-                AND p.created_at BETWEEN %s AND %s
-            """
-            
-            cursor.execute(query, (employee_id, shift_start, shift_end))
-            summary = cursor.fetchone()
-            
-            # Get detailed list of receipts
-            detail_query = """
-            SELECT 
-                p.payment_id,
-                p.order_id,
-                p.amount,
-                p.payment_type,
-                p.created_at,
-                o.total_price
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                o.employee_id = %s
-                AND p.created_at BETWEEN %s AND %s
-            ORDER BY 
-                p.created_at DESC
-            """
-            
-            cursor.execute(detail_query, (employee_id, shift_start, shift_end))
-            receipts = cursor.fetchall()
-            
+        # Shifts are not recorded, so a shift covers the whole day
+        shift_start, shift_end = _day_bounds(shift_date)
+
+        async def compute():
+            by_employee = OrderCompleted.employee_id == employee_id
+            summary = await _summary(session, shift_start, shift_end, by_employee)
+            del summary["total_employees"]
+
+            rows = (await session.execute(
+                _in_period(_payments(), shift_start, shift_end).add_columns(
+                    Payment.payment_id,
+                    Payment.order_completed_id,
+                    Payment.amount_paid,
+                    Payment.payment_method,
+                    Payment.payment_date,
+                    OrderCompleted.table_id,
+                    OrderCompleted.total_price
+                ).where(by_employee).order_by(Payment.payment_date.desc(), Payment.payment_id.desc())
+            )).all()
+
             return {
                 "summary": summary,
-                "receipts": receipts,
+                "receipts": [
+                    {
+                        "payment_id": row.payment_id,
+                        "order_completed_id": row.order_completed_id,
+                        "amount": row.amount_paid,
+                        "payment_method": row.payment_method,
+                        "payment_date": row.payment_date,
+                        "table_id": row.table_id,
+                        "total_price": row.total_price
+                    }
+                    for row in rows
+                ],
                 "shift_date": shift_date.isoformat(),
                 "employee_id": employee_id
             }
-        finally:
-            connection.close()
-    
+
+        return await _cached(("shift", employee_id, shift_date), shift_end, compute)
+
     @staticmethod
-    def get_daily_receipts(target_date: date) -> Dict[str, Any]:
+    async def get_daily_receipts(session: AsyncSession, target_date: date) -> Dict[str, Any]:
         """
         Get receipt summary for a specific date
         """
-        connection = get_db_connection()
-        if not connection:
-            raise Exception("Database connection failed")
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            
-            # Set day start and end
-            day_start = datetime.combine(target_date, datetime.min.time())
-            day_end = datetime.combine(target_date, datetime.max.time())
-            
-            # Get summary of receipts for the day
-            query = """
-            SELECT 
-                COUNT(p.payment_id) as total_receipts,
-                SUM(p.amount) as total_amount,
-                COUNT(DISTINCT o.order_id) as total_orders,
-                COUNT(DISTINCT o.employee_id) as total_employees
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            """
-            
-            cursor.execute(query, (day_start, day_end))
-            summary = cursor.fetchone()
-            
-            # Get receipts grouped by payment type
-            payment_type_query = """
-            SELECT 
-                p.payment_type,
-                COUNT(p.payment_id) as count,
-                SUM(p.amount) as total
-            FROM 
-                payments p
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            GROUP BY 
-                p.payment_type
-            """
-            
-            cursor.execute(payment_type_query, (day_start, day_end))
-            payment_types = cursor.fetchall()
-            
-            # Get receipts grouped by employee
-            employee_query = """
-            SELECT 
-                o.employee_id,
-                COUNT(p.payment_id) as receipt_count,
-                SUM(p.amount) as total_amount
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            GROUP BY 
-                o.employee_id
-            ORDER BY 
-                total_amount DESC
-            """
-            
-            cursor.execute(employee_query, (day_start, day_end))
-            employees = cursor.fetchall()
-            
+        day_start, day_end = _day_bounds(target_date)
+
+        async def compute():
+            summary = await _summary(session, day_start, day_end)
+
+            # Receipts grouped by payment method
+            payment_types = (await session.execute(
+                _in_period(select(
+                    Payment.payment_method,
+                    func.count(Payment.payment_id).label('count'),
+                    func.coalesce(func.sum(Payment.amount_paid), 0).label('total')
+                ), day_start, day_end).group_by(Payment.payment_method)
+            )).all()
+
+            # Receipts grouped by employee
+            total_amount = func.coalesce(func.sum(Payment.amount_paid), 0).label('total_amount')
+            employees = (await session.execute(
+                _in_period(_payments(), day_start, day_end).add_columns(
+                    OrderCompleted.employee_id,
+                    func.count(Payment.payment_id).label('receipt_count'),
+                    total_amount
+                ).group_by(OrderCompleted.employee_id).order_by(total_amount.desc())
+            )).all()
+
             return {
                 "date": target_date.isoformat(),
                 "summary": summary,
-                "payment_types": payment_types,
-                "employees": employees
+                "payment_types": [
+                    {"payment_type": row.payment_method, "count": int(row.count), "total": float(row.total)}
+                    for row in payment_types
+                ],
+                "employees": [
+                    {
+                        "employee_id": row.employee_id,
+                        "receipt_count": int(row.receipt_count),
+                        "total_amount": float(row.total_amount)
+                    }
+                    for row in employees
+                ]
             }
-        finally:
-            connection.close()
-    
+
+        return await _cached(("daily", target_date), day_end, compute)
+
     @staticmethod
-    def get_monthly_receipts(year: int, month: int) -> Dict[str, Any]:
+    async def get_monthly_receipts(session: AsyncSession, year: int, month: int) -> Dict[str, Any]:
         """
         Get receipt summary for a specific month
         """
-        connection = get_db_connection()
-        if not connection:
-            raise Exception("Database connection failed")
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            
-            # Calculate first and last day of month
-            first_day = date(year, month, 1)
-            if month == 12:
-                last_day = date(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                last_day = date(year, month + 1, 1) - timedelta(days=1)
-            
-            month_start = datetime.combine(first_day, datetime.min.time())
-            month_end = datetime.combine(last_day, datetime.max.time())
-            
-            # Get monthly summary
-            query = """
-            SELECT 
-                COUNT(p.payment_id) as total_receipts,
-                SUM(p.amount) as total_amount,
-                COUNT(DISTINCT o.order_id) as total_orders
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            """
-            
-            cursor.execute(query, (month_start, month_end))
-            summary = cursor.fetchone()
-            
-            # Get daily breakdown
-            daily_query = """
-            SELECT 
-                DATE(p.created_at) as day,
-                COUNT(p.payment_id) as receipt_count,
-                SUM(p.amount) as daily_total
-            FROM 
-                payments p
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            GROUP BY 
-                DATE(p.created_at)
-            ORDER BY 
-                day
-            """
-            
-            cursor.execute(daily_query, (month_start, month_end))
-            daily_breakdown = cursor.fetchall()
-            
+        month_start = datetime(year, month, 1)
+        month_end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+        async def compute():
+            summary = await _summary(session, month_start, month_end)
+            daily = await _daily_totals(session, month_start, month_end)
             return {
                 "year": year,
                 "month": month,
                 "summary": summary,
-                "daily_breakdown": daily_breakdown
+                "daily_breakdown": [
+                    {"day": row["day"], "receipt_count": row["receipt_count"], "daily_total": row["total"]}
+                    for row in daily
+                ]
             }
-        finally:
-            connection.close()
-    
+
+        return await _cached(("monthly", year, month), month_end, compute)
+
     @staticmethod
-    def get_yearly_receipts(year: int) -> Dict[str, Any]:
+    async def get_yearly_receipts(session: AsyncSession, year: int) -> Dict[str, Any]:
         """
         Get receipt summary for a specific year
         """
-        connection = get_db_connection()
-        if not connection:
-            raise Exception("Database connection failed")
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            
-            # Calculate year start and end
-            year_start = datetime(year, 1, 1)
-            year_end = datetime(year, 12, 31, 23, 59, 59)
-            
-            # Get yearly summary
-            query = """
-            SELECT 
-                COUNT(p.payment_id) as total_receipts,
-                SUM(p.amount) as total_amount,
-                COUNT(DISTINCT o.order_id) as total_orders
-            FROM 
-                payments p
-            JOIN 
-                orders o ON p.order_id = o.order_id
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            """
-            
-            cursor.execute(query, (year_start, year_end))
-            summary = cursor.fetchone()
-            
-            # Get monthly breakdown
-            monthly_query = """
-            SELECT 
-                MONTH(p.created_at) as month,
-                COUNT(p.payment_id) as receipt_count,
-                SUM(p.amount) as monthly_total
-            FROM 
-                payments p
-            WHERE 
-                p.created_at BETWEEN %s AND %s
-            GROUP BY 
-                MONTH(p.created_at)
-            ORDER BY 
-                month
-            """
-            
-            cursor.execute(monthly_query, (year_start, year_end))
-            monthly_breakdown = cursor.fetchall()
-            
+        year_start, year_end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+        async def compute():
+            summary = await _summary(session, year_start, year_end)
+
+            # Fold the (at most 366) daily groups into months; MONTH() is MySQL-only
+            monthly: Dict[int, Dict[str, Any]] = {}
+            for row in await _daily_totals(session, year_start, year_end):
+                totals = monthly.setdefault(
+                    row["day"].month, {"month": row["day"].month, "receipt_count": 0, "monthly_total": 0.0}
+                )
+                totals["receipt_count"] += row["receipt_count"]
+                totals["monthly_total"] += row["total"]
+
             return {
                 "year": year,
                 "summary": summary,
-                "monthly_breakdown": monthly_breakdown
+                "monthly_breakdown": [monthly[month] for month in sorted(monthly)]
             }
-        finally:
-            connection.close() 
\ No newline at end of file
+
+        return await _cached(("yearly", year), year_end, compute)
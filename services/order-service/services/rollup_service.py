@@ -0,0 +1,185 @@
+# order-service/services/rollup_service.py
+"""
+Incrementally maintained report rollups.
+
+Every settled payment adds its completed order to per-day, per-hour and
+per-employee revenue totals and to the customer tables, in the same
+transaction as the payment. Reports read these small tables instead of
+scanning orders_completed.
+
+Backfill existing history with:
+    python -m services.rollup_service
+"""
+from datetime import datetime
+from typing import Dict, Any, Iterable
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database_orders import SessionLocal
+from models import (
+    OrderCompleted, RevenueDaily, RevenueHourly, EmployeeRevenue,
+    DailyCustomer, Customer
+)
+
+ROLLUP_MODELS = [RevenueDaily, RevenueHourly, EmployeeRevenue, DailyCustomer, Customer]
+
+def _insert(session, model):
+    """Dialect-specific INSERT supporting upserts"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "mysql":
+        return mysql.insert(model.__table__)
+    if dialect == "sqlite":
+        return sqlite.insert(model.__table__)
+    raise Exception(f"Rollups are not supported on {dialect}")
+
+async def _upsert(session: AsyncSession, model, values: Dict[str, Any],
+            increment: Iterable[str] = (), replace: Iterable[str] = ()):
+    """
+    Insert a rollup row, or on primary key conflict add the `increment`
+    columns to the existing row and overwrite the `replace` columns.
+    Runs as a single atomic statement.
+    """
+    table = model.__table__
+    stmt = _insert(session, model).values(**values)
+    if session.get_bind().dialect.name == "mysql":
+        new = stmt.inserted
+    else:
+        new = stmt.excluded
+
+    updates = {col: table.c[col] + new[col] for col in increment}
+    updates.update({col: new[col] for col in replace})
+
+    if session.get_bind().dialect.name == "mysql":
+        stmt = stmt.on_duplicate_key_update(updates)
+    else:
+        keys = [col.name for col in table.primary_key.columns]
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=updates)
+    await session.execute(stmt)
+
+async def insert_ignore(session: AsyncSession, model, values: Dict[str, Any]) -> bool:
+    """Insert a row unless it already exists; return True if it was inserted"""
+    stmt = _insert(session, model).values(**values)
+    if session.get_bind().dialect.name == "mysql":
+        stmt = stmt.prefix_with("IGNORE")
+    else:
+        stmt = stmt.on_conflict_do_nothing()
+    return (await session.execute(stmt)).rowcount == 1
+
+async def record_completed_order(session: AsyncSession, completed_order: OrderCompleted):
+    """
+    Add a completed order to all rollups. Does not commit: call it inside
+    the transaction that settles the payment.
+    """
+    completed_at = completed_order.completed_at or datetime.now()
+    day = completed_at.date()
+    hour = completed_at.replace(minute=0, second=0, microsecond=0)
+    revenue = float(completed_order.total_price or 0)
+    phone = completed_order.customer_phone
+
+    # A customer counts once per day
+    new_daily_customer = bool(phone) and await insert_ignore(
+        session, DailyCustomer, {"day": day, "customer_phone": phone}
+    )
+
+    await _upsert(
+        session, RevenueDaily,
+        {"day": day, "revenue": revenue, "order_count": 1,
+         "customer_count": 1 if new_daily_customer else 0},
+        increment=("revenue", "order_count", "customer_count")
+    )
+    await _upsert(
+        session, RevenueHourly,
+        {"hour": hour, "revenue": revenue, "order_count": 1},
+        increment=("revenue", "order_count")
+    )
+    if completed_order.employee_id is not None:
+        await _upsert(
+            session, EmployeeRevenue,
+            {"employee_id": completed_order.employee_id, "revenue": revenue, "order_count": 1},
+            increment=("revenue", "order_count")
+        )
+    if phone:
+        await _upsert(
+            session, Customer,
+            {"customer_phone": phone, "first_seen_at": completed_at,
+             "last_seen_at": completed_at, "order_count": 1},
+            increment=("order_count",),
+            replace=("last_seen_at",)
+        )
+
+def backfill(batch_size: int = 1000):
+    """
+    Rebuild all rollups from orders_completed. Run while no payments are
+    being taken, e.g. right after deploying the rollup tables.
+    """
+    session = SessionLocal()
+    try:
+        daily: Dict[Any, Dict[str, Any]] = {}
+        hourly: Dict[Any, Dict[str, Any]] = {}
+        employees: Dict[int, Dict[str, Any]] = {}
+        daily_customers = set()
+        customers: Dict[str, Dict[str, Any]] = {}
+
+        rows = session.query(
+            OrderCompleted.employee_id,
+            OrderCompleted.customer_phone,
+            OrderCompleted.total_price,
+            OrderCompleted.completed_at
+        ).filter(
+            OrderCompleted.completed_at.isnot(None)
+        ).order_by(OrderCompleted.completed_at).yield_per(batch_size)
+
+        for employee_id, phone, total_price, completed_at in rows:
+            revenue = float(total_price or 0)
+            day = completed_at.date()
+            hour = completed_at.replace(minute=0, second=0, microsecond=0)
+
+            day_row = daily.setdefault(day, {"day": day, "revenue": 0.0, "order_count": 0, "customer_count": 0})
+            day_row["revenue"] += revenue
+            day_row["order_count"] += 1
+
+            hour_row = hourly.setdefault(hour, {"hour": hour, "revenue": 0.0, "order_count": 0})
+            hour_row["revenue"] += revenue
+            hour_row["order_count"] += 1
+
+            if employee_id is not None:
+                employee_row = employees.setdefault(
+                    employee_id, {"employee_id": employee_id, "revenue": 0.0, "order_count": 0}
+                )
+                employee_row["revenue"] += revenue
+                employee_row["order_count"] += 1
+
+            if phone:
+                if (day, phone) not in daily_customers:
+                    daily_customers.add((day, phone))
+                    day_row["customer_count"] += 1
+                customer_row = customers.setdefault(
+                    phone, {"customer_phone": phone, "first_seen_at": completed_at,
+                            "last_seen_at": completed_at, "order_count": 0}
+                )
+                customer_row["last_seen_at"] = completed_at
+                customer_row["order_count"] += 1
+
+        for model in ROLLUP_MODELS:
+            session.query(model).delete(synchronize_session=False)
+
+        session.bulk_insert_mappings(RevenueDaily, list(daily.values()))
+        session.bulk_insert_mappings(RevenueHourly, list(hourly.values()))
+        session.bulk_insert_mappings(EmployeeRevenue, list(employees.values()))
+        session.bulk_insert_mappings(
+            DailyCustomer, [{"day": day, "customer_phone": phone} for day, phone in daily_customers]
+        )
+        session.bulk_insert_mappings(Customer, list(customers.values()))
+        session.commit()
+
+        total_orders = sum(row["order_count"] for row in daily.values())
+        print(f"✅ Rollups rebuilt from {total_orders} completed orders across {len(daily)} days")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Failed to backfill rollups: {str(e)}")
+        raise e
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    backfill()
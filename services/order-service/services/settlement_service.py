@@ -0,0 +1,104 @@
+# order-service/services/settlement_service.py
+"""
+Table checkout in a single transaction.
+
+The table row is locked first (SELECT ... FOR UPDATE), so two concurrent
+checkouts of the same table run one after the other and the second one
+finds no unpaid orders. Every step is a set-based statement, so the
+number of statements does not depend on how many orders or items the
+table has.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import (
+    Order, OrderItem, Table, OrderCompleted, CompletedOrderMapping,
+    CompletedOrderItem, Payment
+)
+from services import rollup_service, sketch_service
+
+# Orders that are settled when a table pays
+PAYABLE_STATUSES = ['pending', 'preparing', 'ready_to_serve', 'completed']
+
+class NothingToSettle(Exception):
+    """The table has no unpaid orders"""
+
+async def settle_table(session: AsyncSession, table_id: int, customer_name: str, customer_phone: str,
+                       payment_method: Optional[str] = None) -> Tuple[Payment, OrderCompleted, List[int]]:
+    """
+    Pay all unpaid orders of a table: mark them paid, combine them into one
+    OrderCompleted with its items and mappings, record the payment and
+    update the report rollups. Does not commit.
+    """
+    # Serialize checkouts of this table
+    await session.execute(
+        select(Table.table_id).where(Table.table_id == table_id).with_for_update()
+    )
+
+    orders = (await session.execute(
+        select(Order.order_id, Order.employee_id, Order.total_price)
+        .where(Order.table_id == table_id, Order.order_status.in_(PAYABLE_STATUSES))
+        .order_by(Order.order_id)
+        .with_for_update()
+    )).all()
+    if not orders:
+        raise NothingToSettle("No active orders found for this table")
+
+    order_ids = [order.order_id for order in orders]
+    total_amount = sum(order.total_price or 0 for order in orders)
+    now = datetime.now()
+
+    await session.execute(
+        update(Order)
+        .where(Order.order_id.in_(order_ids))
+        .values(customer_name=customer_name, customer_phone=customer_phone, order_status='paid')
+        .execution_options(synchronize_session=False)
+    )
+
+    # One completed order combining all of the table's orders
+    completed_order = OrderCompleted(
+        employee_id=orders[0].employee_id,
+        customer_name=customer_name,
+        customer_phone=customer_phone,
+        table_id=table_id,
+        total_price=total_amount,
+        completed_at=now
+    )
+    session.add(completed_order)
+    await session.flush()
+    completed_order_id = completed_order.order_completed_id
+
+    await session.execute(insert(CompletedOrderMapping), [
+        {"completed_order_id": completed_order_id, "original_order_id": order_id}
+        for order_id in order_ids
+    ])
+
+    # Copy all items server-side: INSERT ... SELECT
+    await session.execute(
+        insert(CompletedOrderItem).from_select(
+            ["order_completed_id", "food_id", "quantity", "note"],
+            select(
+                literal(completed_order_id), OrderItem.food_id, OrderItem.quantity, OrderItem.note
+            ).where(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.order_item_id)
+        )
+    )
+
+    payment = Payment(
+        order_completed_id=completed_order_id,
+        payment_method=payment_method,
+        payment_status='completed',
+        amount_paid=total_amount,
+        payment_date=now
+    )
+    session.add(payment)
+    await session.flush()
+
+    # Update report rollups and sketches in the same transaction as the payment
+    await rollup_service.record_completed_order(session, completed_order)
+    items = (await session.execute(
+        select(OrderItem.food_id, OrderItem.quantity).where(OrderItem.order_id.in_(order_ids))
+    )).all()
+    await sketch_service.record_settlement(session, now, items, customer_phone)
+
+    return payment, completed_order, order_ids
@@ -0,0 +1,297 @@
+# order-service/services/sketch_service.py
+"""
+Approximate top foods and distinct customers from mergeable sketches.
+
+Every settled payment inserts one stat_sketch_deltas row (its items and
+customer) in the same transaction as the payment: no row is locked or
+updated, so concurrent checkouts never wait on each other. Reads merge
+the day rows of stat_sketches with the pending deltas of those days,
+in one transaction, so a read sees each settlement exactly once. Once
+more than SKETCH_COMPACT_AFTER deltas are pending, a background
+compaction folds them into their day rows and deletes them; only
+compactions lock day rows.
+
+A date range merges one row per day plus its pending deltas; all time
+reads today's rows live and a cached merge of every earlier day, rebuilt
+once a day (or after SKETCH_CACHE_TTL seconds). Error bounds are
+documented in sketches.py.
+
+Backfill existing history, or compare the sketches with the exact SQL:
+    python -m services.sketch_service
+    python -m services.sketch_service compare
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database_orders import AsyncSessionLocal, SessionLocal
+from models import CompletedOrderItem, OrderCompleted, StatSketch, StatSketchDelta
+from services import rollup_service
+from sketches import CountMinSketch, HyperLogLog
+
+# Seconds the merged sketches of past days are reused by all-time reads
+# (a backfill run in another process shows up after at most this long)
+SKETCH_CACHE_TTL = float(os.getenv("SKETCH_CACHE_TTL", "3600"))
+# Pending settlement deltas that trigger a compaction into the day rows
+SKETCH_COMPACT_AFTER = int(os.getenv("SKETCH_COMPACT_AFTER", "500"))
+# Deltas folded per compaction transaction
+SKETCH_COMPACT_BATCH = int(os.getenv("SKETCH_COMPACT_BATCH", "1000"))
+
+class Sketches:
+    """The sketches stored in one stat_sketches row"""
+
+    def __init__(self, food_quantity: CountMinSketch = None, food_orders: CountMinSketch = None,
+                 customers: HyperLogLog = None):
+        self.food_quantity = food_quantity or CountMinSketch()
+        self.food_orders = food_orders or CountMinSketch()
+        self.customers = customers or HyperLogLog()
+
+    def add(self, items: Iterable[Tuple[str, int]], customer_phone: Optional[str]):
+        for food_id, quantity in items:
+            self.food_quantity.add(food_id, int(quantity or 0))
+            self.food_orders.add(food_id)
+        if customer_phone:
+            self.customers.add(customer_phone)
+
+    def apply(self, deltas: Iterable[StatSketchDelta]):
+        """Add settlement deltas (stat_sketch_deltas rows)"""
+        for delta in deltas:
+            self.add(json.loads(delta.items), delta.customer_phone)
+
+    def merge(self, *others: "Sketches"):
+        self.food_quantity.merge(*(other.food_quantity for other in others))
+        self.food_orders.merge(*(other.food_orders for other in others))
+        self.customers.merge(*(other.customers for other in others))
+
+    def top_foods(self, k: int = 5) -> List[Dict[str, Any]]:
+        return [
+            {"food_id": food_id, "total_quantity": quantity, "order_count": self.food_orders.estimate(food_id)}
+            for food_id, quantity in self.food_quantity.top(k)
+        ]
+
+    def distinct_customers(self) -> int:
+        return self.customers.count()
+
+    def values(self) -> Dict[str, Any]:
+        return {
+            "food_quantity": self.food_quantity.to_bytes(),
+            "food_orders": self.food_orders.to_bytes(),
+            "customers": self.customers.to_bytes(),
+            "updated_at": datetime.now()
+        }
+
+    @classmethod
+    def from_row(cls, row: StatSketch) -> "Sketches":
+        return cls(
+            CountMinSketch.from_bytes(row.food_quantity) if row.food_quantity else None,
+            CountMinSketch.from_bytes(row.food_orders) if row.food_orders else None,
+            HyperLogLog.from_bytes(row.customers) if row.customers else None
+        )
+
+async def record_settlement(session: AsyncSession, completed_at: datetime,
+                            items: List[Tuple[str, int]], customer_phone: Optional[str]):
+    """
+    Queue a settled order's items and customer for the sketches of its day
+    (one INSERT, no lock). Does not commit: call it inside the settling
+    transaction.
+    """
+    await session.execute(insert(StatSketchDelta).values(
+        period=completed_at.date().isoformat(),
+        items=json.dumps([[str(food_id), int(quantity or 0)] for food_id, quantity in items]),
+        customer_phone=customer_phone,
+        created_at=completed_at
+    ))
+
+def _day_range(column, start: date, end: date):
+    # ISO days sort as strings (rows of other periods, e.g. a legacy 'all', sort after them)
+    return column >= start.isoformat(), column <= end.isoformat()
+
+def merge_rows(rows: Iterable[StatSketch], deltas: Iterable[StatSketchDelta] = ()) -> Sketches:
+    merged = Sketches()
+    merged.merge(*(Sketches.from_row(row) for row in rows))
+    merged.apply(deltas)
+    return merged
+
+async def _load_days(session: AsyncSession, start: date, end: date) -> Tuple[Sketches, int]:
+    """Merged day rows and pending deltas of start..end, and how many deltas there were"""
+    rows = (await session.scalars(select(StatSketch).where(*_day_range(StatSketch.period, start, end)))).all()
+    deltas = (await session.scalars(
+        select(StatSketchDelta).where(*_day_range(StatSketchDelta.period, start, end))
+    )).all()
+    return merge_rows(rows, deltas), len(deltas)
+
+async def compact(session: AsyncSession, batch_size: int = SKETCH_COMPACT_BATCH) -> int:
+    """
+    Fold up to batch_size pending deltas into their day rows and delete
+    them, in one transaction; returns how many were folded. Commits.
+    """
+    deltas = (await session.scalars(
+        select(StatSketchDelta).order_by(StatSketchDelta.id).limit(batch_size).with_for_update()
+    )).all()
+    by_day: Dict[str, List[StatSketchDelta]] = {}
+    for delta in deltas:
+        by_day.setdefault(delta.period, []).append(delta)
+
+    for period, day_deltas in by_day.items():
+        await rollup_service.insert_ignore(session, StatSketch, {"period": period})
+        row = (await session.execute(
+            select(StatSketch).where(StatSketch.period == period).with_for_update()
+        )).scalar_one()
+        sketches = Sketches.from_row(row)
+        sketches.apply(day_deltas)
+        await session.execute(
+            update(StatSketch).where(StatSketch.period == period).values(**sketches.values())
+            .execution_options(synchronize_session=False)
+        )
+    if deltas:
+        await session.execute(
+            delete(StatSketchDelta).where(StatSketchDelta.id.in_([delta.id for delta in deltas]))
+            .execution_options(synchronize_session=False)
+        )
+    await session.commit()
+    return len(deltas)
+
+_compaction: Optional[asyncio.Task] = None
+
+def schedule_compaction():
+    """Compact pending deltas in the background, once at a time"""
+    global _compaction
+    if _compaction is not None and not _compaction.done():
+        return
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as session:
+                while await compact(session) == SKETCH_COMPACT_BATCH:
+                    pass
+        except Exception as e:
+            print(f"❌ Failed to compact sketch deltas: {str(e)}")
+
+    _compaction = asyncio.create_task(run())
+
+class PastDaysCache:
+    """Merged sketches of every day before today"""
+
+    def __init__(self, ttl: float = SKETCH_CACHE_TTL):
+        self.ttl = ttl
+        self._sketches: Optional[Sketches] = None
+        self._today: Optional[date] = None
+        self._loaded_at = 0.0
+
+    async def get(self, session: AsyncSession, today: date) -> Sketches:
+        if self._sketches is None or self._today != today or time.monotonic() - self._loaded_at > self.ttl:
+            self._sketches, _ = await _load_days(session, date.min, today - timedelta(days=1))
+            self._today = today
+            self._loaded_at = time.monotonic()
+        return self._sketches
+
+    def clear(self):
+        self._sketches = None
+
+past_days_cache = PastDaysCache()
+
+async def load(session: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> Sketches:
+    """Merged sketches of start..end inclusive, or of all time without a range"""
+    if start is not None or end is not None:
+        merged, pending = await _load_days(session, start or date.min, end or date.max)
+    else:
+        # Today's rows (and any later one) live, earlier days from the cache
+        today = date.today()
+        merged, pending = await _load_days(session, today, date.max)
+        merged.merge(await past_days_cache.get(session, today))
+
+    if pending > SKETCH_COMPACT_AFTER:
+        schedule_compaction()
+    return merged
+
+def _completed_items(session, batch_size: int = 1000):
+    """(day, food_id, quantity) of every completed item"""
+    return session.query(
+        func.date(OrderCompleted.completed_at),
+        CompletedOrderItem.food_id,
+        CompletedOrderItem.quantity
+    ).join(
+        OrderCompleted, OrderCompleted.order_completed_id == CompletedOrderItem.order_completed_id
+    ).filter(
+        OrderCompleted.completed_at.isnot(None)
+    ).yield_per(batch_size)
+
+def backfill(batch_size: int = 1000):
+    """
+    Rebuild all sketches from orders_completed. Run while no payments are
+    being taken, e.g. right after deploying the stat_sketches table.
+    """
+    session = SessionLocal()
+    try:
+        days: Dict[str, Sketches] = {}
+        for day, food_id, quantity in _completed_items(session, batch_size):
+            days.setdefault(str(day), Sketches()).add([(food_id, quantity)], None)
+
+        # Customers are added per order, so orders without items count too
+        for day, phone in session.query(
+            func.date(OrderCompleted.completed_at), OrderCompleted.customer_phone
+        ).filter(
+            OrderCompleted.completed_at.isnot(None), OrderCompleted.customer_phone.isnot(None)
+        ).distinct().yield_per(batch_size):
+            days.setdefault(str(day), Sketches()).customers.add(phone)
+
+        session.query(StatSketchDelta).delete(synchronize_session=False)
+        session.query(StatSketch).delete(synchronize_session=False)
+        session.bulk_insert_mappings(StatSketch, [
+            {"period": period, **sketches.values()} for period, sketches in days.items()
+        ])
+        session.commit()
+        past_days_cache.clear()
+        print(f"✅ Sketches rebuilt for {len(days)} days")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Failed to backfill sketches: {str(e)}")
+        raise e
+    finally:
+        session.close()
+
+def compare(k: int = 5):
+    """
+    Print the all-time sketch statistics (merged from every day and the
+    pending deltas, uncached)
+    next to the exact SQL and their timings
+    """
+    session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        exact_foods = session.query(
+            CompletedOrderItem.food_id,
+            func.sum(CompletedOrderItem.quantity).label('total_quantity')
+        ).group_by(CompletedOrderItem.food_id).order_by(
+            func.sum(CompletedOrderItem.quantity).desc()
+        ).limit(k).all()
+        exact_customers = session.query(func.count(func.distinct(OrderCompleted.customer_phone))).scalar()
+        exact_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        sketches = merge_rows(
+            session.query(StatSketch).filter(*_day_range(StatSketch.period, date.min, date.max)),
+            session.query(StatSketchDelta)
+        )
+        approx_foods = sketches.top_foods(k)
+        approx_customers = sketches.distinct_customers()
+        sketch_ms = (time.perf_counter() - started) * 1000
+
+        print(f"exact SQL: {exact_ms:.1f} ms, sketches: {sketch_ms:.1f} ms")
+        print(f"distinct customers: exact {exact_customers}, estimated {approx_customers}")
+        for rank, (exact, approx) in enumerate(zip(exact_foods, approx_foods), start=1):
+            print(f"#{rank}: exact {exact.food_id}={exact.total_quantity}, "
+                  f"estimated {approx['food_id']}={approx['total_quantity']}")
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["compare"]:
+        compare()
+    else:
+        backfill()
@@ -0,0 +1,152 @@
+# order-service/services/table_registry.py
+"""
+In-memory registry of table status.
+
+Reads (table grid, available tables) are served from memory. Every
+status change goes to the database as a conditional UPDATE that bumps
+tables.version, and is applied to the registry after its transaction
+commits (write-through). Callers can pass the version they last saw
+(If-Match) and the update is rejected if the table changed since.
+
+Other replicas write to the same database, so the registry is reloaded
+once it is older than TABLE_REGISTRY_MAX_STALENESS seconds.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database_orders import AsyncSessionLocal
+from models import Table
+
+TABLE_REGISTRY_MAX_STALENESS = float(os.getenv("TABLE_REGISTRY_MAX_STALENESS", "5"))
+
+class TableNotFound(Exception):
+    """No table with this ID"""
+
+class VersionConflict(Exception):
+    """The table changed since the version the caller last saw"""
+
+    def __init__(self, current: Optional["TableState"]):
+        super().__init__("Table was modified by another request")
+        self.current = current
+
+class TableState:
+    __slots__ = ("table_id", "table_status", "version")
+
+    def __init__(self, table_id: int, table_status: str, version: int):
+        self.table_id = table_id
+        self.table_status = table_status
+        self.version = version
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"table_id": self.table_id, "table_status": self.table_status, "version": self.version}
+
+async def _select_states(session: AsyncSession, table_ids: Iterable[int] = None) -> List[TableState]:
+    stmt = select(Table.table_id, Table.table_status, Table.version).order_by(Table.table_id)
+    if table_ids is not None:
+        stmt = stmt.where(Table.table_id.in_(list(table_ids)))
+    return [TableState(*row) for row in (await session.execute(stmt)).all()]
+
+async def set_status(session: AsyncSession, table_id: int, status: str,
+                     expected_version: Optional[int] = None,
+                     expected_status: Optional[str] = None) -> TableState:
+    """
+    Change a table's status and bump its version in one conditional
+    UPDATE. Does not commit: pass the result to table_registry.apply()
+    after the transaction commits. Raises TableNotFound, or VersionConflict
+    if the version or status no longer matches.
+    """
+    stmt = update(Table).where(Table.table_id == table_id).values(
+        table_status=status, version=Table.version + 1
+    ).execution_options(synchronize_session=False)
+    if expected_version is not None:
+        stmt = stmt.where(Table.version == expected_version)
+    if expected_status is not None:
+        stmt = stmt.where(Table.table_status == expected_status)
+
+    updated = (await session.execute(stmt)).rowcount
+    states = await _select_states(session, [table_id])
+    if not states:
+        raise TableNotFound(f"Table {table_id} not found")
+    if not updated:
+        raise VersionConflict(states[0])
+    return states[0]
+
+async def set_statuses(session: AsyncSession, table_ids: Iterable[int], status: str) -> List[TableState]:
+    """Unconditionally set the status of several tables; same contract as set_status"""
+    table_ids = list(table_ids)
+    await session.execute(
+        update(Table).where(Table.table_id.in_(table_ids)).values(
+            table_status=status, version=Table.version + 1
+        ).execution_options(synchronize_session=False)
+    )
+    return await _select_states(session, table_ids)
+
+class TableRegistry:
+    """Table ID -> TableState, reloaded from the database when stale"""
+
+    def __init__(self, max_staleness: float = TABLE_REGISTRY_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._tables: Dict[int, TableState] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.reloads = 0
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_staleness
+
+    async def load(self):
+        """Replace the registry with the tables in the database"""
+        async with AsyncSessionLocal() as session:
+            states = await _select_states(session)
+        self._tables = {state.table_id: state for state in states}
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def _ensure_fresh(self):
+        if self._is_fresh():
+            self.hits += 1
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have reloaded while we waited
+            if not self._is_fresh():
+                await self.load()
+
+    async def all(self) -> List[TableState]:
+        await self._ensure_fresh()
+        return sorted(self._tables.values(), key=lambda state: state.table_id)
+
+    async def get(self, table_id: int) -> Optional[TableState]:
+        await self._ensure_fresh()
+        return self._tables.get(table_id)
+
+    def apply(self, states: Iterable[TableState]):
+        """Record committed table states (older versions are ignored)"""
+        for state in states:
+            current = self._tables.get(state.table_id)
+            if current is None or state.version >= current.version:
+                self._tables[state.table_id] = state
+
+    def invalidate(self):
+        """Force a reload on the next read (e.g. after bulk changes)"""
+        self._loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tables": len(self._tables),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at else None,
+            "max_staleness": self.max_staleness,
+            "hits": self.hits,
+            "reloads": self.reloads
+        }
+
+table_registry = TableRegistry()
@@ -0,0 +1,93 @@
+"""
+Test setup: a migrated SQLite database in a temporary directory, emptied
+before each test.
+
+Run from services/order-service:
+    pip install -r requirements-test.txt
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Must be set before database_orders creates its engines
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "orders.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, text
+from database_orders import Base, SessionLocal, async_engine, engine, run_migrations
+from models import Order, OrderItem, Table
+from services import sketch_service
+from services.table_registry import table_registry
+
+run_migrations()
+
+def run(coro):
+    """Run a coroutine on a new event loop, closing the async engine's connections after it"""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+class StatementLog:
+    """Records the SQL statements (and parameters) the async engine executes"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self._record)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def selects(self):
+        return [(statement, parameters) for statement, parameters in self.statements
+                if statement.lstrip().upper().startswith("SELECT")]
+
+def add_orders(table_id: int, count: int, status: str = "pending", items_per_order: int = 2,
+               created_at: datetime = None) -> list:
+    """Insert orders with items for a table; returns their IDs"""
+    created_at = created_at or datetime.now()
+    session = SessionLocal()
+    try:
+        orders = [
+            Order(employee_id=1, table_id=table_id, order_status=status, total_price=10.0,
+                  created_at=created_at + timedelta(seconds=i))
+            for i in range(count)
+        ]
+        session.add_all(orders)
+        session.flush()
+        session.add_all([
+            OrderItem(order_id=order.order_id, food_id=f"food-{n}", quantity=n + 1, note="")
+            for order in orders for n in range(items_per_order)
+        ])
+        session.commit()
+        return [order.order_id for order in orders]
+    finally:
+        session.close()
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    """Every test starts with tables 1..10 and nothing else"""
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+        connection.execute(Table.__table__.insert(), [
+            {"table_id": table_id, "table_status": "available"} for table_id in range(1, 11)
+        ])
+    table_registry.invalidate()
+    sketch_service.past_days_cache.clear()
+    yield
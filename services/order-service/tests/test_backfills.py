@@ -0,0 +1,35 @@
+"""
+Startup warns about every report table that still needs its backfill
+while there is payment history.
+"""
+from conftest import add_orders, engine, run
+from database_orders import warn_missing_backfills
+from test_query_counts import settle
+
+def test_no_warning_without_history(capsys):
+    warn_missing_backfills()
+
+    assert capsys.readouterr().out == ""
+
+def test_no_warning_when_settlements_filled_the_tables(capsys):
+    add_orders(table_id=1, count=2, status="completed")
+    run(settle(1, "0900000001"))
+
+    warn_missing_backfills()
+
+    assert capsys.readouterr().out == ""
+
+def test_warns_about_rollups_and_sketches(capsys):
+    add_orders(table_id=1, count=2, status="completed")
+    run(settle(1, "0900000001"))
+    # History from before the report tables existed
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM revenue_daily")
+        connection.exec_driver_sql("DELETE FROM stat_sketches")
+        connection.exec_driver_sql("DELETE FROM stat_sketch_deltas")
+
+    warn_missing_backfills()
+    warnings = capsys.readouterr().out
+
+    assert "python -m services.rollup_service" in warnings
+    assert "python -m services.sketch_service" in warnings
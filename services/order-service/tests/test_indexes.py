@@ -0,0 +1,82 @@
+"""
+The hot queries use the indexes from the migrations: each query is
+captured while the real code runs, then EXPLAIN QUERY PLAN'd on the
+migrated SQLite database.
+"""
+from datetime import date
+import pytest
+from fastapi import Response
+from conftest import StatementLog, add_orders, engine, run
+from database_orders import AsyncSessionLocal
+from pagination import PageParams, TimeWindow
+from routers import payments, reports
+from services import order_service, reporting_service
+from services.reporting_service import ReportingService
+from test_query_counts import settle
+
+PAGE = PageParams(cursor=None, limit=100, since=None, until=None)
+
+@pytest.fixture(autouse=True)
+def history():
+    """Ten tables with settled and active orders"""
+    for table_id in range(1, 11):
+        add_orders(table_id, count=20, status="completed")
+        run(settle(table_id, f"09000000{table_id:02d}"))
+        add_orders(table_id, count=5)
+    reporting_service.clear_cache()
+
+async def with_session(call):
+    async with AsyncSessionLocal() as session:
+        return await call(session)
+
+def query_plans(call) -> list:
+    """The EXPLAIN QUERY PLAN details of every SELECT run by call(), one string per statement"""
+    with StatementLog() as log:
+        run(call())
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in log.selects():
+            rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            plans.append(" | ".join(row[-1] for row in rows))
+    assert plans
+    return plans
+
+def assert_uses(plans: list, *indexes: str):
+    for index in indexes:
+        assert any(f"INDEX {index}" in plan for plan in plans), f"{index} not used: {plans}"
+
+def test_active_orders_use_status_created_at_index():
+    plans = query_plans(lambda: order_service.get_active_orders(TimeWindow(since=None, until=None)))
+    assert_uses(plans, "ix_orders_order_status_created_at", "ix_order_items_order_id")
+
+def test_table_orders_use_table_status_index():
+    plans = query_plans(lambda: order_service.get_table_orders(3, PAGE))
+    assert_uses(plans, "ix_orders_table_id_order_status", "ix_order_items_order_id")
+
+def test_payment_history_uses_payment_date_index():
+    plans = query_plans(lambda: with_session(
+        lambda session: payments.get_paid_orders_history(Response(), PAGE, db=session)
+    ))
+    assert_uses(plans, "ix_payments_payment_date", "ix_completed_order_mappings_completed_order_id",
+                "ix_completed_order_items_order_completed_id")
+
+def test_customer_payments_use_phone_index():
+    plans = query_plans(lambda: with_session(
+        lambda session: payments.get_payments_by_phone("0900000003", session)
+    ))
+    assert_uses(plans, "ix_orders_completed_customer_phone_completed_at", "ix_payments_order_completed_id")
+
+def test_daily_receipts_use_payment_date_index():
+    plans = query_plans(lambda: with_session(
+        lambda session: ReportingService.get_daily_receipts(session, date.today())
+    ))
+    assert all("ix_payments_payment_date" in plan for plan in plans), plans
+
+def test_top_foods_use_covering_index():
+    plans = query_plans(lambda: with_session(reports.get_exact_top_foods))
+    assert_uses(plans, "ix_completed_order_items_food_id_quantity")
+
+    plans = query_plans(lambda: with_session(
+        lambda session: reports.get_exact_top_foods(session, date.today(), date.today())
+    ))
+    assert_uses(plans, "ix_orders_completed_completed_at", "ix_completed_order_items_order_completed_id")
@@ -0,0 +1,105 @@
+"""
+The outbox dispatcher holds no transaction while it delivers: the batch
+is leased and committed first, and the outcome recorded afterwards.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, update
+from conftest import run
+from database_orders import AsyncSessionLocal, SessionLocal
+from models import OutboxEvent
+from services import outbox
+from services.outbox import OutboxDispatcher
+
+class Kitchen:
+    """Stands in for the kitchen-service client; calls during(events) on every delivery"""
+
+    def __init__(self, during=None, fail: bool = False):
+        self.during = during
+        self.fail = fail
+        self.delivered = []
+
+    async def post(self, path, json):
+        if self.during:
+            await self.during(json["events"])
+        if self.fail:
+            raise RuntimeError("kitchen down")
+        self.delivered.extend(json["events"])
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+def dispatcher(kitchen: Kitchen) -> OutboxDispatcher:
+    dispatcher = OutboxDispatcher()
+    dispatcher._client = kitchen
+    return dispatcher
+
+def queue_events(count: int):
+    async def main():
+        async with AsyncSessionLocal() as session:
+            await outbox.add_events(session, outbox.ORDER_CREATED, [
+                (f"order-{n}", {"order_id": str(n)}) for n in range(count)
+            ])
+            await session.commit()
+    run(main())
+
+def outbox_rows() -> list:
+    session = SessionLocal()
+    try:
+        return session.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    finally:
+        session.close()
+
+def test_batch_is_leased_and_committed_before_delivery():
+    queue_events(3)
+    seen = []
+
+    async def during(events):
+        # A separate session sees the claim, and can write to the rows
+        async with AsyncSessionLocal() as session:
+            rows = (await session.scalars(select(OutboxEvent))).all()
+            seen.extend((row.attempts, row.next_attempt_at > datetime.utcnow()) for row in rows)
+            await session.execute(update(OutboxEvent).values(last_error=None))
+            await session.commit()
+
+    kitchen = Kitchen(during)
+    assert run(dispatcher(kitchen).dispatch_once()) == 3
+
+    assert seen == [(1, True)] * 3
+    assert [event["idempotency_key"] for event in kitchen.delivered] == ["order-0", "order-1", "order-2"]
+    assert all(row.dispatched_at is not None for row in outbox_rows())
+
+def test_leased_events_are_not_claimed_twice():
+    queue_events(2)
+    second = []
+
+    async def during(events):
+        second.append(await dispatcher(Kitchen()).dispatch_once())
+
+    run(dispatcher(Kitchen(during)).dispatch_once())
+
+    assert second == [0]
+
+def test_failed_delivery_releases_the_lease_with_backoff():
+    queue_events(2)
+    before = datetime.utcnow()
+
+    assert run(dispatcher(Kitchen(fail=True)).dispatch_once()) == 0
+
+    for row in outbox_rows():
+        assert row.dispatched_at is None and row.attempts == 1
+        assert row.last_error == "kitchen down"
+        assert row.next_attempt_at <= before + timedelta(seconds=outbox.retry_delay(1) + 1)
+
+def test_failure_keeps_a_lease_taken_over_by_another_dispatcher():
+    queue_events(1)
+    taken_over = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+
+    async def during(events):
+        # The lease ran out and another dispatcher claimed the row
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(OutboxEvent).values(next_attempt_at=taken_over, attempts=2))
+            await session.commit()
+
+    run(dispatcher(Kitchen(during, fail=True)).dispatch_once())
+
+    [row] = outbox_rows()
+    assert row.next_attempt_at == taken_over and row.last_error is None
@@ -0,0 +1,54 @@
+"""
+The order listings and table checkout run a fixed number of statements,
+however many orders (and items) a table has.
+"""
+from conftest import StatementLog, add_orders, run
+from database_orders import AsyncSessionLocal
+from pagination import PageParams, TimeWindow
+from services import order_service, settlement_service
+
+MANY = 5000
+
+def count_statements(call) -> int:
+    with StatementLog() as log:
+        run(call())
+    return len(log)
+
+def test_active_orders_query_count_is_constant():
+    add_orders(table_id=1, count=1)
+    one = count_statements(lambda: order_service.get_active_orders(TimeWindow(since=None, until=None)))
+
+    add_orders(table_id=2, count=MANY)
+    many = count_statements(lambda: order_service.get_active_orders(TimeWindow(since=None, until=None)))
+
+    assert one == many
+
+def test_table_orders_query_count_is_constant():
+    page = PageParams(cursor=None, limit=100, since=None, until=None)
+    add_orders(table_id=1, count=1)
+    add_orders(table_id=2, count=MANY)
+
+    one = count_statements(lambda: order_service.get_table_orders(1, page))
+    many = count_statements(lambda: order_service.get_table_orders(2, page))
+
+    assert one == many
+
+async def settle(table_id: int, phone: str):
+    async with AsyncSessionLocal() as session:
+        payment, completed_order, order_ids = await settlement_service.settle_table(
+            session, table_id=table_id, customer_name="Guest", customer_phone=phone
+        )
+        await session.commit()
+        return order_ids
+
+def test_settlement_query_count_is_constant():
+    add_orders(table_id=1, count=1, status="completed")
+    add_orders(table_id=2, count=MANY, status="completed", items_per_order=3)
+
+    with StatementLog() as one:
+        settled_one = run(settle(1, "0900000001"))
+    with StatementLog() as many:
+        settled_many = run(settle(2, "0900000002"))
+
+    assert len(settled_one) == 1 and len(settled_many) == MANY
+    assert len(one) == len(many)
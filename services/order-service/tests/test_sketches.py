@@ -0,0 +1,84 @@
+"""
+Checkouts only insert sketch deltas; reads merge them with the day rows,
+before and after compaction. Merged Count-Min sketches rank heavy-hitter
+candidates by their merged estimates.
+"""
+from datetime import date
+from conftest import StatementLog, add_orders, engine, run
+from database_orders import AsyncSessionLocal
+from services import sketch_service
+from sketches import CountMinSketch
+from test_query_counts import settle
+
+def settle_tables(count: int):
+    for table_id in range(1, count + 1):
+        add_orders(table_id, count=2, status="completed", items_per_order=table_id)
+        run(settle(table_id, f"09000000{table_id:02d}"))
+
+async def load(*days):
+    async with AsyncSessionLocal() as session:
+        sketches = await sketch_service.load(session, *days)
+        # Every food, in food_id order (ties in the ranking come in any order)
+        return sorted(sketches.top_foods(10), key=lambda food: food["food_id"]), sketches.distinct_customers()
+
+async def compact():
+    async with AsyncSessionLocal() as session:
+        return await sketch_service.compact(session)
+
+def row_count(table: str) -> int:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+
+def test_settlement_inserts_a_delta_without_touching_the_day_row():
+    add_orders(table_id=1, count=2, status="completed")
+
+    with StatementLog() as log:
+        run(settle(1, "0900000001"))
+
+    sketch_statements = [statement for statement, _ in log.statements if "stat_sketch" in statement]
+    assert len(sketch_statements) == 1
+    assert sketch_statements[0].startswith("INSERT INTO stat_sketch_deltas")
+
+def test_reads_are_the_same_before_and_after_compaction():
+    settle_tables(4)
+    sketch_service.past_days_cache.clear()
+    today = date.today()
+    before = run(load()), run(load(today, today))
+
+    assert run(compact()) == 4
+    assert row_count("stat_sketch_deltas") == 0 and row_count("stat_sketches") == 1
+    sketch_service.past_days_cache.clear()
+    after = run(load()), run(load(today, today))
+
+    assert before == after
+    foods, customers = after[0]
+    assert customers == 4
+    # Table N orders foods 0..N-1, food-n with quantity n + 1, twice
+    assert [(food["food_id"], food["total_quantity"], food["order_count"]) for food in foods] == [
+        ("food-0", 8, 8), ("food-1", 12, 6), ("food-2", 12, 4), ("food-3", 8, 2)
+    ]
+
+def test_compaction_adds_to_an_existing_day_row():
+    settle_tables(2)
+    run(compact())
+    add_orders(table_id=3, count=2, status="completed", items_per_order=3)
+    run(settle(3, "0900000003"))
+
+    run(compact())
+
+    sketch_service.past_days_cache.clear()
+    assert run(load())[1] == 3
+
+def test_merge_keeps_a_key_that_is_second_tier_every_day():
+    days = []
+    for day in range(4):
+        sketch = CountMinSketch(max_candidates=3)
+        sketch.add(f"day-{day}-a", 10)
+        sketch.add(f"day-{day}-b", 10)
+        sketch.add("steady", 6)
+        days.append(sketch)
+
+    merged = CountMinSketch(max_candidates=3)
+    merged.merge(*days)
+
+    assert merged.top(1) == [("steady", 24)]
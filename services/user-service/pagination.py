@@ -0,0 +1,61 @@
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class PageParams:
+    """
+    Query parameters of a paginated list endpoint (use with Depends()).
+    When more rows exist, the X-Next-Cursor response header holds the
+    cursor to pass back as ?cursor= for the next page.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+def paginate(query, id_column, page: PageParams) -> Tuple[list, Optional[str]]:
+    """
+    Apply the cursor and limit to a query ordered by id_column ascending.
+    Returns the page and the cursor of the next page
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        try:
+            last_id = int(values[0])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(id_column > last_id)
+
+    rows = query.order_by(id_column).limit(page.limit).all()
+
+    next_cursor = None
+    if len(rows) == page.limit:
+        next_cursor = encode_cursor([getattr(rows[-1], id_column.key)])
+    return rows, next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
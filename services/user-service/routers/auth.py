@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Form
+from fastapi import APIRouter, Depends, HTTPException, Form, Response
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from services import user_service
+from pagination import PageParams, set_next_cursor
 from schemas import Token, TokenVerifyRequest
 from passlib.context import CryptContext
 import auth as auth_utils
@@ -56,11 +57,12 @@ def login(form_data: LoginForm, db: Session = Depends(get_db)):
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
+def get_all_users(response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
     """
-    Get all users (requires manager role)
+    Get users, one page at a time (requires manager role)
     """
-    users = user_service.get_all_users(db)
+    users, next_cursor = user_service.get_all_users(db, page)
+    set_next_cursor(response, next_cursor)
     return users
 
 @router.post("/verify")
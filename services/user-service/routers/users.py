@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 import database, models
 from database import SessionLocal
 from schemas import UserCreate, UserResponse, UserUpdate
 from services import user_service
+from pagination import PageParams, set_next_cursor
 from models import UserRole, ShiftType
 
 router = APIRouter()
@@ -18,9 +19,11 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    """Get all user accounts"""
-    return user_service.get_all_users(db)
+def list_users(response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    """Get user accounts, one page at a time"""
+    users, next_cursor = user_service.get_all_users(db, page)
+    set_next_cursor(response, next_cursor)
+    return users
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
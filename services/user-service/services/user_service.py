@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 from models import User
+from pagination import PageParams, paginate
 from schemas import UserCreate
 from passlib.context import CryptContext
 
@@ -29,8 +30,9 @@ def get_user_by_email(db: Session, email: str) -> User | None:
 def get_user_by_id(db: Session, user_id: int) -> User | None:
     return db.query(User).filter(User.user_id == user_id).first()
 
-def get_all_users(db: Session) -> List[User]:
-    return db.query(User).all()
+def get_all_users(db: Session, page: PageParams) -> Tuple[List[User], Optional[str]]:
+    """Get one page of users ordered by user_id, and the next page cursor"""
+    return paginate(db.query(User), User.user_id, page)
 
 def update_user(db: Session, user_id: int, user_update: dict) -> User | None:
     db_user = get_user_by_id(db, user_id)